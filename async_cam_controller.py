@@ -0,0 +1,315 @@
+"""
+asyncio twin of cam_controller.PTZController.
+Same commands and position handling, sent over a non-blocking aiohttp session so that
+status queries can run concurrently and moves can be fired without waiting on the camera.
+Fired moves keep to one in flight per axis, latest wins: a move waits for the previous one on its axis
+to be acknowledged, so its target is built from the position that move left, and a relative step or
+speed change is skipped once a newer command for its axis has been fired. Stops and absolute targets
+are always sent.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import aiohttp
+from yarl import URL
+
+import ptz_codec
+from cam_controller import BasePTZController
+from circuit_breaker import CircuitBreaker, CircuitState
+from command_scheduler import ControlAxis
+from models import PresetLocation, PTZPosition
+
+T = TypeVar("T")
+
+
+class AsyncPTZController(BasePTZController):
+    pool_size: int
+    _session: Optional[aiohttp.ClientSession]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _loop_thread: Optional[threading.Thread]
+    _loop_lock: threading.Lock  # submit and shutdown come from several threads (tracking control, Tk)
+    _axis_locks: Dict[ControlAxis, asyncio.Lock]
+    _axis_fired: Dict[ControlAxis, int]  # commands fired per axis, to tell whether a newer one is waiting
+
+    def __init__(
+        self,
+        ip_address: str,
+        pool_size: int = 4,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        reconcile_interval: float = 1.0,
+        command_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(ip_address, reconcile_interval, connect_timeout, read_timeout, command_timeouts, breaker)
+        self.pool_size = pool_size
+        self._session = None
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._axis_locks = {axis: asyncio.Lock() for axis in ControlAxis}
+        self._axis_fired = {axis: 0 for axis in ControlAxis}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # ClientSession binds to the running loop, so it is created on first use
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _get(self, path: str, command_type: str, cmd: Optional[str] = None) -> Optional[Tuple[int, str]]:
+        """
+        GET a cgi-bin path with command_type's deadlines, recording its latency under command_type.
+        cmd's response is checked if given. Returns (status, text), None on a timeout or connection error.
+        """
+        url = URL(f"http://{self.ip_address}/cgi-bin/{path}", encoded=True)
+        connect_timeout, read_timeout = self._timeouts(command_type)
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        start = time.perf_counter()
+        try:
+            async with self._get_session().get(url, timeout=timeout) as response:
+                status, text = response.status, await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.metrics.record(command_type, time.perf_counter() - start, False)
+            return None
+        ok = status == 200 and (cmd is None or ptz_codec.valid_response(cmd, text))
+        self.metrics.record(command_type, time.perf_counter() - start, ok)
+        return status, text
+
+    async def _camera_responds(self, command_type: str = "getinfo") -> bool:
+        response = await self._get("getinfo?file=1", command_type)
+        return response is not None and response[0] == 200
+
+    async def _aw_ptz(self, cmd: str) -> Optional[str]:
+        """Response text, None if the request failed, timed out or the circuit breaker is open"""
+        state = self.breaker.before_request()
+        if state is CircuitState.OPEN:
+            return None
+        if state is CircuitState.HALF_OPEN:
+            # Probe with the same request check_connection makes before trusting the camera again
+            probe_ok = await self._camera_responds("probe")
+            self.breaker.record(probe_ok)
+            if not probe_ok:
+                return None
+        self.commands_sent += 1
+        response = await self._get(f"aw_ptz?cmd=%23{cmd}&res=1", ptz_codec.command_type(cmd), cmd)
+        self.breaker.record(response is not None)
+        if response is None or response[0] != 200:
+            return None
+        return response[1]
+
+    async def _send_command(self, command: Optional[Tuple[str, Optional[PTZPosition]]]) -> bool:
+        """Send a built command and update the position model, returns False if it wasn't acknowledged"""
+        if command is None:
+            self.commands_skipped += 1
+            return True
+        cmd, target = command
+        text = await self._aw_ptz(cmd)
+        acknowledged = text is not None and ptz_codec.acknowledges(cmd, text)
+        self._record_command(cmd, target, acknowledged)
+        return acknowledged
+
+    async def _send_latest(
+        self,
+        axis: ControlAxis,
+        build: Callable[[], Optional[Tuple[str, Optional[PTZPosition]]]],
+        skippable: bool = True,
+    ) -> Optional[Tuple[Optional[Tuple[str, Optional[PTZPosition]]], bool]]:
+        """
+        Build and send a command once the previous one on axis is done, returns (command, acknowledged).
+        None if skippable and a newer command for the axis was fired while this one waited
+        """
+        self._axis_fired[axis] += 1
+        fired = self._axis_fired[axis]
+        async with self._axis_locks[axis]:
+            if skippable and fired != self._axis_fired[axis]:
+                self.commands_skipped += 1
+                return None
+            command = build()
+            return command, await self._send_command(command)
+
+    async def check_connection(self) -> bool:
+        self.connected = await self._camera_responds()
+        self.breaker.record(self.connected)
+        return self.connected
+
+    async def refresh_position(self):
+        """Query the camera for its actual position"""
+        if not self.connected:
+            return
+        pt_text, zoom_text = await asyncio.gather(self._aw_ptz("APC"), self._aw_ptz("GZ"))
+        pt_status = self._parse_pt_status(pt_text)
+        if pt_status is None:
+            return
+        zoom_pos = self._parse_zoom_status(zoom_text)
+        if zoom_pos is None:
+            return
+        self._mark_reconciled(pt_status[0], pt_status[1], zoom_pos)
+
+    async def sync_position(self):
+        """Refresh the position only if the optimistic model is due a reconcile"""
+        if self._needs_reconcile():
+            await self.refresh_position()
+
+    async def move_home(self):
+        if not self.connected:
+            return
+        fast_home_str = ptz_codec.encode_pan_tilt(0x8000, 0x8000)
+        home = PTZPosition(0x8000, 0x8000, self.current_position.zoom)
+        _, acknowledged = await self._send_latest(ControlAxis.PAN_TILT, lambda: (fast_home_str, home), skippable=False)
+        if not acknowledged:
+            print("Failed to Return Home")
+        await self.sync_position()
+
+    async def reset_zoom(self):
+        if not self.connected:
+            return
+        fast_zoom_reset_str = ptz_codec.encode_zoom_speed(1)
+        # Speed based zoom - no target to predict from
+        _, acknowledged = await self._send_latest(
+            ControlAxis.ZOOM, lambda: (fast_zoom_reset_str, None), skippable=False
+        )
+        if not acknowledged:
+            print("Failed to Reset Zoom")
+        await self.sync_position()
+
+    async def move_pan(self, direction: int, speed: float = 5.0):
+        """Move pan left (1) or right (-1)"""
+        if not self.connected:
+            return
+        sent = await self._send_latest(ControlAxis.PAN_TILT, lambda: self._pan_command(direction, speed))
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to take Pan Step to {command[0][3:7]}")
+        await self.sync_position()
+
+    async def move_tilt(self, direction: int, speed: float = 5.0):
+        """Move tilt down (1) or up (-1)"""
+        if not self.connected:
+            return
+        sent = await self._send_latest(ControlAxis.PAN_TILT, lambda: self._tilt_command(direction, speed))
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to take Tilt Step to {command[0][7:11]}")
+        await self.sync_position()
+
+    async def move_composite(self, pan_dir: int, tilt_dir: int, pan_amount: float, tilt_amount: float):
+        """Move some amount in both pan and tilt"""
+        if not self.connected:
+            return
+        sent = await self._send_latest(
+            ControlAxis.PAN_TILT, lambda: self._composite_command(pan_dir, tilt_dir, pan_amount, tilt_amount)
+        )
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to take composite move to Pan:{command[0][3:7]} Tilt:{command[0][7:11]}")
+        await self.sync_position()
+
+    async def move_zoom(self, direction: int, speed: float = 2.0):
+        """Zoom out (-1) or in (1)"""
+        if not self.connected:
+            return
+        sent = await self._send_latest(ControlAxis.ZOOM, lambda: self._zoom_command(direction, speed))
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to take Zoom Step to {command[0][3:]}")
+        await self.sync_position()
+
+    async def goto_preset(self, preset: PresetLocation):
+        """Move to preset location"""
+        if not self.connected:
+            return
+        location_str, zoom_str, target = self._preset_commands(preset)
+        # Moves both axes - newer commands on either wait for it, and it is never skipped
+        for axis in ControlAxis:
+            self._axis_fired[axis] += 1
+        async with self._axis_locks[ControlAxis.PAN_TILT], self._axis_locks[ControlAxis.ZOOM]:
+            zoom_text, move_text = await asyncio.gather(self._aw_ptz(zoom_str), self._aw_ptz(location_str))
+            acknowledged = (
+                move_text is not None and zoom_text is not None and
+                ptz_codec.acknowledges(location_str, move_text) and ptz_codec.acknowledges(zoom_str, zoom_text)
+            )
+            if not acknowledged:
+                print(f"Failed to Move to Preset {preset.name}")
+            self._record_command(location_str, target, acknowledged)
+            self._record_command(zoom_str, target, acknowledged)
+        await self.sync_position()
+
+    async def start_pan_tilt(self, pan_velocity: float, tilt_velocity: float):
+        """
+        Continuous pan/tilt until stopped or changed, velocities in [-1, 1]
+        pan: left (+) or right (-), tilt: down (+) or up (-)
+        """
+        if not self.connected:
+            return
+        stop = pan_velocity == 0.0 and tilt_velocity == 0.0
+        sent = await self._send_latest(
+            ControlAxis.PAN_TILT, lambda: self._pan_tilt_speed_command(pan_velocity, tilt_velocity), skippable=not stop
+        )
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to set Pan/Tilt speed {command[0][3:]}")
+
+    async def stop_pan_tilt(self):
+        await self.start_pan_tilt(0.0, 0.0)
+
+    async def start_zoom(self, velocity: float):
+        """Continuous zoom in (+) or out (-) until stopped or changed, velocity in [-1, 1]"""
+        if not self.connected:
+            return
+        sent = await self._send_latest(
+            ControlAxis.ZOOM, lambda: self._zoom_speed_command(velocity), skippable=velocity != 0.0
+        )
+        if sent is None:
+            return
+        command, acknowledged = sent
+        if not acknowledged:
+            print(f"Failed to set Zoom speed {command[0][1:]}")
+
+    async def stop_zoom(self):
+        await self.start_zoom(0.0)
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """
+        Schedule a controller coroutine from a non-async thread (e.g. a tracking loop) without waiting on it.
+        The controller's event loop is started in a background thread on first use - only one, since the
+        session is bound to the loop that created it.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._loop_thread.start()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def shutdown(self):
+        """Close the session and stop the background loop started by submit"""
+        with self._loop_lock:
+            loop, loop_thread = self._loop, self._loop_thread
+            if loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+            loop.close()
+            self._loop = None
+            self._loop_thread = None
@@ -1,171 +1,433 @@
 """
-For movement:
-each axis gets 4 sig fig hex value
-first 2 vals full 0-F range - changes to second val are very small steps
-For Zoom:
-gets 3 sig fig hex value
-first 2 vals full 0-F range - changes to second val are very small steps
-min zoom: hex 555 = 1365
-max zoom: hex FFF = 4095
+Control of Panasonic aw_ptz CGI cameras.
+Command payload formats and value limits live in ptz_codec.
 """
+import dataclasses
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
+import ptz_codec
+from circuit_breaker import CircuitBreaker, CircuitState
+from controller_metrics import ControllerMetrics
 from models import PTZPosition, PresetLocation
 
 
-class PTZController:
+# (connect, read) seconds per command type. Commands the tracking loop sends get short deadlines so a
+# stalled camera holds the loop up for about a second at most; anything not listed here (the getinfo
+# connection check) uses the controller's connect_timeout/read_timeout.
+DEFAULT_COMMAND_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "APS": (1.0, 1.0),
+    "AXZ": (1.0, 1.0),
+    "PTS": (1.0, 1.0),
+    "Z": (1.0, 1.0),
+    "APC": (1.0, 1.0),
+    "GZ": (1.0, 1.0),
+    "probe": (1.0, 1.0),
+}
+
+
+def create_session(pool_size: int = 4, pool_connections: int = 1) -> requests.Session:
+    """
+    Keep-alive session for talking to one or more cameras
+    :pool_size: max number of connections kept open per camera
+    :pool_connections: number of cameras (hosts) to keep connection pools for
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    return session
+
+
+class BasePTZController:
+    """
+    Command building, response parsing and position model shared by the blocking and asyncio controllers.
+    Subclasses provide the transport.
+
+    current_position is updated optimistically from the target of each acknowledged move and only
+    reconciled against the camera every reconcile_interval seconds, or sooner if drift is suspected
+    (unacknowledged command, speed based movement). A reconcile_interval of 0 queries after every move.
+
+    Speed (velocity mode) commands are only sent when the requested speed differs from the running one.
+
+    Every request's latency and outcome is recorded in metrics by command type.
+
+    Each request has a (connect, read) deadline by command type, see DEFAULT_COMMAND_TIMEOUTS.
+    Timeouts and connection errors feed a circuit breaker: while it is open commands fail immediately,
+    and once its reset timeout passes the next command first probes the camera's getinfo page.
+    """
     ip_address: str
     connected: bool
     current_position: PTZPosition
+    reconcile_interval: float
+    commands_sent: int
+    commands_skipped: int
+    connect_timeout: float
+    read_timeout: float
+    command_timeouts: Dict[str, Tuple[float, float]]
+    breaker: CircuitBreaker
+    metrics: ControllerMetrics
+    _last_reconciled_at: float
+    _drift_suspected: bool
+    _last_pan_tilt_speed: Optional[str]
+    _last_zoom_speed: Optional[str]
+    # The scheduler's worker, the status thread and the UI all drive the controller - updates to the
+    # position model and running speeds are applied whole
+    _model_lock: threading.Lock
 
-    def __init__(self, ip_address: str):
+    def __init__(
+        self,
+        ip_address: str,
+        reconcile_interval: float = 1.0,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        command_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        :command_timeouts: (connect, read) seconds by command type, overriding DEFAULT_COMMAND_TIMEOUTS
+        :breaker: defaults to opening after 3 consecutive failures and probing again after 2 seconds
+        """
         self.ip_address = ip_address
         self.connected = False
         self.current_position = PTZPosition()
+        self.reconcile_interval = reconcile_interval
+        self.commands_sent = 0
+        self.commands_skipped = 0
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.command_timeouts = {**DEFAULT_COMMAND_TIMEOUTS, **(command_timeouts or {})}
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.metrics = ControllerMetrics(ip_address)
+        self._last_reconciled_at = 0.0
+        self._drift_suspected = True
+        self._last_pan_tilt_speed = None
+        self._last_zoom_speed = None
+        self._model_lock = threading.Lock()
+
+    def position(self) -> PTZPosition:
+        """A consistent copy of current_position"""
+        with self._model_lock:
+            return dataclasses.replace(self.current_position)
+
+    def metrics_snapshot(self) -> dict:
+        """Latency/failure snapshot plus the command counters, see controller_metrics.to_json/to_prometheus"""
+        snapshot = self.metrics.snapshot()
+        snapshot["commands_sent"] = self.commands_sent
+        snapshot["commands_skipped"] = self.commands_skipped
+        snapshot["breaker"] = {
+            "state": self.breaker.state.value,
+            "trips": self.breaker.trips,
+            "rejected": self.breaker.rejected,
+        }
+        return snapshot
+
+    def _timeouts(self, command_type: str) -> Tuple[float, float]:
+        return self.command_timeouts.get(command_type, (self.connect_timeout, self.read_timeout))
+
+    def _needs_reconcile(self) -> bool:
+        return self._drift_suspected or time.monotonic() - self._last_reconciled_at >= self.reconcile_interval
+
+    def _set_position(self, pan: int, tilt: int, zoom: int):
+        # Update in place - the UI and trackers hold on to current_position
+        self.current_position.pan = pan
+        self.current_position.tilt = tilt
+        self.current_position.zoom = zoom
+
+    def _mark_reconciled(self, pan: int, tilt: int, zoom: int):
+        with self._model_lock:
+            self._set_position(pan, tilt, zoom)
+            self._last_reconciled_at = time.monotonic()
+            self._drift_suspected = False
+
+    def _apply_commanded(self, cmd: str, target: Optional[PTZPosition], acknowledged: bool):
+        if acknowledged and target is not None:
+            # Only the axes cmd moves - the other axis may have moved since the target was built
+            if cmd.startswith("AXZ"):
+                self._set_position(self.current_position.pan, self.current_position.tilt, target.zoom)
+            else:
+                self._set_position(target.pan, target.tilt, self.current_position.zoom)
+        else:
+            self._drift_suspected = True
+
+    def _record_command(self, cmd: str, target: Optional[PTZPosition], acknowledged: bool):
+        """Update the position model and running speeds after sending cmd"""
+        with self._model_lock:
+            if cmd.startswith("PTS"):
+                self._last_pan_tilt_speed = cmd if acknowledged else None
+            elif cmd.startswith("Z"):
+                self._last_zoom_speed = cmd if acknowledged else None
+            elif cmd.startswith("APS"):
+                self._last_pan_tilt_speed = None
+            elif cmd.startswith("AXZ"):
+                self._last_zoom_speed = None
+            self._apply_commanded(cmd, target, acknowledged)
+
+    @staticmethod
+    def _parse_pt_status(text: Optional[str]) -> Optional[Tuple[int, int]]:
+        try:
+            return ptz_codec.decode_pan_tilt_status(text or "")
+        except ValueError:
+            print("Failed to retrieve PT positions")
+            return None
+
+    @staticmethod
+    def _parse_zoom_status(text: Optional[str]) -> Optional[int]:
+        try:
+            return ptz_codec.decode_zoom_status(text or "")
+        except ValueError:
+            print("Failed to retrieve Zoom Status")
+            return None
+
+    def _pan_tilt_command(self, pan: float, tilt: float) -> Optional[Tuple[str, PTZPosition]]:
+        """Returns (command, commanded position) or None if the target is the current position"""
+        target_pan = ptz_codec.clamp_pan_tilt(pan)
+        target_tilt = ptz_codec.clamp_pan_tilt(tilt)
+        if target_pan == self.current_position.pan and target_tilt == self.current_position.tilt:
+            return None
+        target = PTZPosition(target_pan, target_tilt, self.current_position.zoom)
+        return ptz_codec.encode_pan_tilt(target_pan, target_tilt), target
+
+    def _pan_command(self, direction: int, speed: float) -> Optional[Tuple[str, PTZPosition]]:
+        # If Direction is 1, Take step Left.
+        # If Direction is -1, Take step Right
+        return self._pan_tilt_command(
+            self.current_position.pan + ((direction * 256) * speed), self.current_position.tilt
+        )
+
+    def _tilt_command(self, direction: int, speed: float) -> Optional[Tuple[str, PTZPosition]]:
+        # If Direction is 1, Take step Down.
+        # If Direction is -1, Take step Up
+        return self._pan_tilt_command(
+            self.current_position.pan, self.current_position.tilt + ((direction * 256) * speed)
+        )
+
+    def _composite_command(
+        self, pan_dir: int, tilt_dir: int, pan_amount: float, tilt_amount: float
+    ) -> Optional[Tuple[str, PTZPosition]]:
+        return self._pan_tilt_command(
+            self.current_position.pan + ((pan_dir * 256) * pan_amount),
+            self.current_position.tilt + ((tilt_dir * 256) * tilt_amount),
+        )
+
+    def _zoom_command(self, direction: int, speed: float) -> Optional[Tuple[str, PTZPosition]]:
+        """Returns (command, commanded position) or None if the target is the current zoom"""
+        target_zoom = ptz_codec.clamp_zoom(self.current_position.zoom + ((direction * 16) * speed))
+        if target_zoom == self.current_position.zoom:
+            return None
+        target = PTZPosition(self.current_position.pan, self.current_position.tilt, target_zoom)
+        return ptz_codec.encode_zoom(target_zoom), target
+
+    def _pan_tilt_speed_command(self, pan_velocity: float, tilt_velocity: float) -> Optional[Tuple[str, None]]:
+        """Returns (PTS command, no target) or None if already moving at that speed"""
+        # Controller directions - pan 1 is left, tilt 1 is down - are the low half of the PTS range
+        cmd = ptz_codec.encode_pan_tilt_speed(
+            ptz_codec.velocity_to_speed(-pan_velocity), ptz_codec.velocity_to_speed(-tilt_velocity)
+        )
+        return None if cmd == self._last_pan_tilt_speed else (cmd, None)
+
+    def _zoom_speed_command(self, velocity: float) -> Optional[Tuple[str, None]]:
+        """Returns (Z command, no target) or None if already zooming at that speed"""
+        cmd = ptz_codec.encode_zoom_speed(ptz_codec.velocity_to_speed(velocity))
+        return None if cmd == self._last_zoom_speed else (cmd, None)
+
+    @staticmethod
+    def _preset_commands(preset: PresetLocation) -> Tuple[str, str, PTZPosition]:
+        """Returns (location command, zoom command, commanded position)"""
+        target = PTZPosition(
+            ptz_codec.clamp_pan_tilt(preset.pan),
+            ptz_codec.clamp_pan_tilt(preset.tilt),
+            ptz_codec.clamp_zoom(preset.zoom),
+        )
+        return ptz_codec.encode_pan_tilt(target.pan, target.tilt), ptz_codec.encode_zoom(target.zoom), target
+
+
+class PTZController(BasePTZController):
+    _session: requests.Session
+
+    def __init__(
+        self,
+        ip_address: str,
+        session: Optional[requests.Session] = None,
+        pool_size: int = 4,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        reconcile_interval: float = 1.0,
+        command_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(ip_address, reconcile_interval, connect_timeout, read_timeout, command_timeouts, breaker)
+        self._session = session if session is not None else create_session(pool_size)
+
+    def close(self):
+        self._session.close()
+
+    def _get(self, path: str, command_type: str, cmd: Optional[str] = None) -> Optional[requests.Response]:
+        """
+        GET a cgi-bin path with command_type's deadlines, recording its latency under command_type.
+        cmd's response is checked if given. Returns None on a timeout or connection error.
+        """
+        start = time.perf_counter()
+        try:
+            response = self._session.get(
+                f"http://{self.ip_address}/cgi-bin/{path}",
+                timeout=self._timeouts(command_type),
+            )
+        except requests.RequestException:
+            self.metrics.record(command_type, time.perf_counter() - start, False)
+            return None
+        ok = response.status_code == 200 and (cmd is None or ptz_codec.valid_response(cmd, response.text))
+        self.metrics.record(command_type, time.perf_counter() - start, ok)
+        return response
+
+    def _camera_responds(self, command_type: str = "getinfo") -> bool:
+        response = self._get("getinfo?file=1", command_type)
+        return response is not None and response.status_code == 200
+
+    def _aw_ptz(self, cmd: str) -> Optional[str]:
+        """Response text, None if the request failed, timed out or the circuit breaker is open"""
+        state = self.breaker.before_request()
+        if state is CircuitState.OPEN:
+            return None
+        if state is CircuitState.HALF_OPEN:
+            # Probe with the same request check_connection makes before trusting the camera again
+            probe_ok = self._camera_responds("probe")
+            self.breaker.record(probe_ok)
+            if not probe_ok:
+                return None
+        self.commands_sent += 1
+        response = self._get(f"aw_ptz?cmd=%23{cmd}&res=1", ptz_codec.command_type(cmd), cmd)
+        self.breaker.record(response is not None)
+        if response is None or response.status_code != 200:
+            return None
+        return response.text
+
+    def _send_command(self, command: Optional[Tuple[str, Optional[PTZPosition]]]) -> bool:
+        """Send a built command and update the position model, returns False if it wasn't acknowledged"""
+        if command is None:
+            self.commands_skipped += 1
+            return True
+        cmd, target = command
+        text = self._aw_ptz(cmd)
+        acknowledged = text is not None and ptz_codec.acknowledges(cmd, text)
+        self._record_command(cmd, target, acknowledged)
+        return acknowledged
 
     def check_connection(self) -> bool:
-        response = requests.get(f"http://{self.ip_address}/cgi-bin/getinfo?file=1")
-        self.connected = response.status_code == 200
+        self.connected = self._camera_responds()
+        self.breaker.record(self.connected)
         return self.connected
 
     def refresh_position(self):
+        """Query the camera for its actual position"""
         if not self.connected:
             return
-        pt_status_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23APC&res=1")
-        if len(pt_status_response.text) != 11:
-            print("Failed to retrieve PT positions")
+        pt_status = self._parse_pt_status(self._aw_ptz("APC"))
+        if pt_status is None:
             return
-        position_hex_strings = pt_status_response.text.replace("aPC","")
-        pan_pos = int(position_hex_strings[0:4], 16)
-        tilt_pos = int(position_hex_strings[4:], 16)
-        z_status_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23GZ&res=1")
-        if len(z_status_response.text) != 5:
-            print("Failed to retrieve Zoom Status")
+        zoom_pos = self._parse_zoom_status(self._aw_ptz("GZ"))
+        if zoom_pos is None:
             return
-        zoom_hex_string = z_status_response.text.replace("gz", "")
-        zoom_pos = int(zoom_hex_string, 16)
-        self.current_position.pan = pan_pos
-        self.current_position.tilt = tilt_pos
-        self.current_position.zoom = zoom_pos
+        self._mark_reconciled(pt_status[0], pt_status[1], zoom_pos)
+
+    def sync_position(self):
+        """Refresh the position only if the optimistic model is due a reconcile"""
+        if self._needs_reconcile():
+            self.refresh_position()
 
     def move_home(self):
         if not self.connected:
             return
-        fast_home_str = "APS800080001D2"
-        move_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{fast_home_str}&res=1")
-        if move_response.status_code != 200 or move_response.text.upper() != fast_home_str:
+        fast_home_str = ptz_codec.encode_pan_tilt(0x8000, 0x8000)
+        home = PTZPosition(0x8000, 0x8000, self.current_position.zoom)
+        if not self._send_command((fast_home_str, home)):
             print("Failed to Return Home")
-        self.refresh_position()
+        self.sync_position()
 
     def reset_zoom(self):
         if not self.connected:
             return
-        fast_zoom_reset_str = "Z01"
-        zoom_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{fast_zoom_reset_str}&res=1")
-        if zoom_response.status_code != 200 or zoom_response.text.upper() != fast_zoom_reset_str:
+        fast_zoom_reset_str = ptz_codec.encode_zoom_speed(1)
+        # Speed based zoom - no target to predict from
+        if not self._send_command((fast_zoom_reset_str, None)):
             print("Failed to Reset Zoom")
-        self.refresh_position()
+        self.sync_position()
 
     def move_pan(self, direction: int, speed: float = 5.0):
         """Move pan left (1) or right (-1)"""
         if not self.connected:
             return
-        target_pan: str
-        # If Direction is 1, Take step Left.
-        # If Direction is -1, Take step Right
-        target_pos_base_10 = int(self.current_position.pan + ((direction * 256) * speed)) + 2
-        target_pos_base_10 = max(min(target_pos_base_10, 65535), 0)
-        raw_target_hex = hex(target_pos_base_10).replace("0x", "")
-        target_pan = (raw_target_hex[0:2] + "00").upper()
-        current_tilt_raw_hex = hex(self.current_position.tilt+1).replace("0x", "")
-        current_tilt = current_tilt_raw_hex.upper()
-
-        pan_str = f"APS{target_pan}{current_tilt}1D2"
-        move_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{pan_str}&res=1")
-        if move_response.status_code != 200 or move_response.text.upper() != pan_str:
-            print(f"Failed to take Pan Step to {target_pan}")
-        self.refresh_position()
+        command = self._pan_command(direction, speed)
+        if not self._send_command(command):
+            print(f"Failed to take Pan Step to {command[0][3:7]}")
+        self.sync_position()
 
     def move_tilt(self, direction: int, speed: float = 5.0):
         """Move tilt down (1) or up (-1)"""
         if not self.connected:
             return
-        target_tilt: str
-        # If Direction is 1, Take step Down.
-        # If Direction is -1, Take step Up
-        target_pos_base_10 = int(self.current_position.tilt + ((direction * 256) * speed)) + 2
-        target_pos_base_10 = max(min(target_pos_base_10, 65535), 0)
-        raw_target_hex = hex(target_pos_base_10).replace("0x", "")
-        target_tilt = (raw_target_hex[0:2] + "00").upper()
-        current_pan_raw_hex = hex(self.current_position.pan+1).replace("0x", "")
-        current_pan = current_pan_raw_hex.upper()
-
-        tilt_str = f"APS{current_pan}{target_tilt}1D2"
-        move_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{tilt_str}&res=1")
-        if move_response.status_code != 200 or move_response.text.upper() != tilt_str:
-            print(f"Failed to take Tilt Step to {target_tilt}")
-        self.refresh_position()
+        command = self._tilt_command(direction, speed)
+        if not self._send_command(command):
+            print(f"Failed to take Tilt Step to {command[0][7:11]}")
+        self.sync_position()
 
     def move_composite(self, pan_dir: int, tilt_dir: int, pan_amount: float, tilt_amount: float):
         """Move some amount in both pan and tilt"""
         if not self.connected:
             return
-        target_pan: str
-        target_tilt: str
-
-        target_pan_base_10 = int(self.current_position.pan + ((pan_dir * 256) * pan_amount)) + 2
-        target_pan_base_10 = max(min(target_pan_base_10, 65535), 0)
-        raw_pan_hex = hex(target_pan_base_10).replace("0x", "")
-        target_pan = (raw_pan_hex[0:2] + "00").upper()
-
-        target_tilt_base_10 = int(self.current_position.tilt + ((tilt_dir * 256) * tilt_amount)) + 2
-        target_tilt_base_10 = max(min(target_tilt_base_10, 65535), 0)
-        raw_tilt_hex = hex(target_tilt_base_10).replace("0x", "")
-        target_tilt = (raw_tilt_hex[0:2] + "00").upper()
-
-        composite_move_str = f"APS{target_pan}{target_tilt}1D2"
-        move_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{composite_move_str}&res=1")
-        if move_response.status_code != 200 or move_response.text.upper() != composite_move_str:
-            print(f"Failed to take composite move to Pan:{target_pan} Tilt:{target_tilt}")
-        self.refresh_position()
+        command = self._composite_command(pan_dir, tilt_dir, pan_amount, tilt_amount)
+        if not self._send_command(command):
+            print(f"Failed to take composite move to Pan:{command[0][3:7]} Tilt:{command[0][7:11]}")
+        self.sync_position()
 
     def move_zoom(self, direction: int, speed: float = 2.0):
         """Zoom out (-1) or in (1)"""
         if not self.connected:
             return
-        target_zoom: str
-        target_pos_base_10 = int(self.current_position.zoom + ((direction * 16) * speed)) + 2
-        target_pos_base_10 = max(min(target_pos_base_10, 4095), 1376)
-        raw_target_hex = hex(target_pos_base_10).replace("0x", "")
-        target_zoom = (raw_target_hex[0:2] + "0").upper()
-
-        zoom_str = f"AXZ{target_zoom}"
-        zoom_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{zoom_str}&res=1")
-        if zoom_response.status_code != 200 or zoom_response.text.upper() != zoom_str:
-            print(f"Failed to take Zoom Step to {target_zoom}")
-        self.refresh_position()
+        command = self._zoom_command(direction, speed)
+        if not self._send_command(command):
+            print(f"Failed to take Zoom Step to {command[0][3:]}")
+        self.sync_position()
 
     def goto_preset(self, preset: PresetLocation):
         """Move to preset location"""
         if not self.connected:
             return
-        target_pan: str
-        target_tilt: str
-        target_zoom: str
-        raw_pan_hex = hex(preset.pan+1).replace("0x","")
-        raw_tilt_hex = hex(preset.tilt+1).replace("0x","")
-        raw_zoom_hex = hex(preset.zoom+1).replace("0x","")
-
-        target_pan = (raw_pan_hex[0:2] + "00").upper()
-        target_tilt = (raw_tilt_hex[0:2] + "00").upper()
-        target_zoom = (raw_zoom_hex[0:2] + "5").upper()
-
-        location_str = f"APS{target_pan}{target_tilt}1D2"
-        zoom_str = f"AXZ{target_zoom}"
-        zoom_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{zoom_str}&res=1")
-        move_response = requests.get(f"http://{self.ip_address}/cgi-bin/aw_ptz?cmd=%23{location_str}&res=1")
-        if (move_response.status_code != 200 or zoom_response.status_code != 200 or
-                move_response.text.upper() != location_str or zoom_response.text.upper() != zoom_str):
+        location_str, zoom_str, target = self._preset_commands(preset)
+        zoom_text = self._aw_ptz(zoom_str)
+        move_text = self._aw_ptz(location_str)
+        acknowledged = (move_text is not None and zoom_text is not None and
+                        ptz_codec.acknowledges(location_str, move_text) and ptz_codec.acknowledges(zoom_str, zoom_text))
+        if not acknowledged:
             print(f"Failed to Move to Preset {preset.name}")
-        self.refresh_position()
+        self._record_command(location_str, target, acknowledged)
+        self._record_command(zoom_str, target, acknowledged)
+        self.sync_position()
+
+    def start_pan_tilt(self, pan_velocity: float, tilt_velocity: float):
+        """
+        Continuous pan/tilt until stopped or changed, velocities in [-1, 1]
+        pan: left (+) or right (-), tilt: down (+) or up (-)
+        """
+        if not self.connected:
+            return
+        command = self._pan_tilt_speed_command(pan_velocity, tilt_velocity)
+        if not self._send_command(command):
+            print(f"Failed to set Pan/Tilt speed {command[0][3:]}")
+
+    def stop_pan_tilt(self):
+        self.start_pan_tilt(0.0, 0.0)
+
+    def start_zoom(self, velocity: float):
+        """Continuous zoom in (+) or out (-) until stopped or changed, velocity in [-1, 1]"""
+        if not self.connected:
+            return
+        command = self._zoom_speed_command(velocity)
+        if not self._send_command(command):
+            print(f"Failed to set Zoom speed {command[0][1:]}")
+
+    def stop_zoom(self):
+        self.start_zoom(0.0)
@@ -0,0 +1,165 @@
+"""
+Several PTZ heads behind one shared keep-alive session, with commands fanned out concurrently.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Set, TypeVar
+
+import requests
+
+from cam_controller import PTZController, create_session
+from models import PresetLocation, PTZPosition
+
+T = TypeVar("T")
+
+
+@dataclass
+class CameraResult(Generic[T]):
+    name: str
+    ok: bool
+    value: Optional[T] = None
+    error: Optional[str] = None
+    elapsed_s: float = 0.0
+
+
+class CameraPool:
+    """
+    Named PTZControllers sharing one connection pool (one keep-alive pool per camera host).
+    Commands run on a thread pool, one task per camera, and results are returned per camera name.
+    """
+    controllers: Dict[str, PTZController]
+    groups: Dict[str, Set[str]]
+    _session: requests.Session
+    _executor: ThreadPoolExecutor
+    _controller_kwargs: Dict[str, Any]
+    _poll_thread: Optional[threading.Thread]
+    _stop_polling: threading.Event
+    _lock: threading.Lock  # cameras are added and removed while other threads iterate them
+
+    def __init__(self, max_workers: int = 32, max_cameras: int = 32, pool_size: int = 2, **controller_kwargs):
+        """
+        :max_workers: cameras commanded at the same time
+        :max_cameras: camera hosts to keep connection pools for
+        :pool_size: connections kept open per camera
+        :controller_kwargs: passed to each PTZController (timeouts, reconcile_interval)
+        """
+        self.controllers = {}
+        self.groups = {}
+        self._session = create_session(pool_size=pool_size, pool_connections=max_cameras)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="camera-pool")
+        self._controller_kwargs = controller_kwargs
+        self._poll_thread = None
+        self._stop_polling = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_camera(self, name: str, ip_address: str) -> PTZController:
+        controller = PTZController(ip_address, session=self._session, **self._controller_kwargs)
+        with self._lock:
+            self.controllers[name] = controller
+        return controller
+
+    def remove_camera(self, name: str):
+        with self._lock:
+            controller = self.controllers.pop(name, None)
+            for members in self.groups.values():
+                members.discard(name)
+        if controller is not None:
+            controller.connected = False
+
+    def add_to_group(self, group: str, *names: str):
+        with self._lock:
+            self.groups.setdefault(group, set()).update(names)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self.controllers)
+
+    def connected_names(self) -> List[str]:
+        """Cameras currently connected, a snapshot safe to use while others are added or removed"""
+        with self._lock:
+            return [name for name, controller in self.controllers.items() if controller.connected]
+
+    def close(self):
+        self.stop_polling()
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def broadcast(
+        self, command: Callable[[PTZController], T], names: Optional[Iterable[str]] = None
+    ) -> Dict[str, CameraResult[T]]:
+        """Run command(controller) on every camera (or just names) at once and wait for all of them"""
+        targets = self.names() if names is None else list(names)
+        return self._fan_out({name: command for name in targets})
+
+    def _fan_out(self, commands: Dict[str, Callable[[PTZController], T]]) -> Dict[str, CameraResult[T]]:
+        futures = {name: self._executor.submit(self._run, name, command) for name, command in commands.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def group_broadcast(self, group: str, command: Callable[[PTZController], T]) -> Dict[str, CameraResult[T]]:
+        with self._lock:
+            members = list(self.groups.get(group, set()))
+        return self.broadcast(command, members)
+
+    def _run(self, name: str, command: Callable[[PTZController], T]) -> CameraResult[T]:
+        start = time.perf_counter()
+        controller = self.controllers.get(name)
+        if controller is None:
+            return CameraResult(name, ok=False, error="Unknown camera")
+        try:
+            value = command(controller)
+        except Exception as e:
+            return CameraResult(name, ok=False, error=str(e), elapsed_s=time.perf_counter() - start)
+        return CameraResult(name, ok=True, value=value, elapsed_s=time.perf_counter() - start)
+
+    def check_connections(self, names: Optional[Iterable[str]] = None) -> Dict[str, CameraResult[bool]]:
+        return self.broadcast(lambda controller: controller.check_connection(), names)
+
+    def refresh_positions(self, names: Optional[Iterable[str]] = None) -> Dict[str, CameraResult[PTZPosition]]:
+        def _refresh(controller: PTZController) -> PTZPosition:
+            controller.refresh_position()
+            return controller.current_position
+        return self.broadcast(_refresh, names)
+
+    def goto_presets(self, presets: Dict[str, PresetLocation]) -> Dict[str, CameraResult[None]]:
+        """
+        Recall a preset on several cameras at once, keyed by camera name -
+        e.g. each camera's own "Center Ice" position
+        """
+        return self._fan_out({
+            name: lambda controller, preset=preset: controller.goto_preset(preset)
+            for name, preset in presets.items()
+        })
+
+    def start_polling(self, interval: float, on_positions: Optional[Callable[[Dict[str, CameraResult]], None]] = None):
+        """Refresh every camera's position concurrently every interval seconds in a background thread"""
+        if self._poll_thread is not None:
+            return
+        self._stop_polling.clear()
+
+        def _poll():
+            wait = 0.0
+            while not self._stop_polling.wait(wait):
+                started = time.perf_counter()
+                results = self.refresh_positions(self.connected_names())
+                if on_positions is not None:
+                    on_positions(results)
+                wait = max(0.0, interval - (time.perf_counter() - started))
+
+        self._poll_thread = threading.Thread(target=_poll, daemon=True)
+        self._poll_thread.start()
+
+    def stop_polling(self):
+        self._stop_polling.set()
+        if self._poll_thread is not None:
+            self._poll_thread.join()
+            self._poll_thread = None
+
+    def metrics_snapshots(self) -> List[dict]:
+        """Each camera's controller metrics, for controller_metrics.to_json/to_prometheus"""
+        return [controller.metrics_snapshot() for controller in list(self.controllers.values())]
+
+    @staticmethod
+    def failed(results: Dict[str, CameraResult]) -> List[str]:
+        return [name for name, result in results.items() if not result.ok]
@@ -0,0 +1,74 @@
+"""
+Circuit breaker for camera requests, so an unresponsive camera costs callers one timeout
+rather than one timeout per command.
+"""
+import threading
+import time
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"  # requests go through
+    OPEN = "OPEN"  # requests fail immediately
+    HALF_OPEN = "HALF_OPEN"  # one probe request decides whether to close again
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transport failures (timeouts, refused connections).
+    Once reset_timeout seconds have passed, the next caller gets HALF_OPEN from before_request and
+    must probe the camera and report the result with record. Everyone else keeps failing fast until
+    that probe succeeds.
+    """
+    failure_threshold: int
+    reset_timeout: float
+    state: CircuitState
+    consecutive_failures: int
+    trips: int
+    rejected: int
+    _opened_at: float
+    _lock: threading.Lock
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 2.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self) -> CircuitState:
+        """
+        CLOSED: send the request. HALF_OPEN: this caller is the probe.
+        OPEN: fail without sending anything.
+        """
+        with self._lock:
+            if self.state is CircuitState.CLOSED:
+                return CircuitState.CLOSED
+            if self.state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = CircuitState.HALF_OPEN
+                return CircuitState.HALF_OPEN
+            # Open, or another caller is already probing
+            self.rejected += 1
+            return CircuitState.OPEN
+
+    def record(self, ok: bool):
+        """Report the outcome of a request or probe"""
+        with self._lock:
+            if ok:
+                self.consecutive_failures = 0
+                self.state = CircuitState.CLOSED
+                return
+            self.consecutive_failures += 1
+            if self.state is CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state is CircuitState.CLOSED:
+                    self.trips += 1
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.consecutive_failures = 0
@@ -0,0 +1,285 @@
+"""
+Latest-wins command scheduling in front of a PTZController.
+Each axis (pan/tilt and zoom) has a single pending slot. A newer command replaces whatever is
+waiting in its slot, so a slow camera only ever executes the most recent correction.
+A pending pan-only move and a newer tilt-only move are merged into one composite move.
+Speed (velocity mode) commands share the slot of their axis, so a stop replaces a pending start.
+Absolute targets (home, preset recall, zoom reset) replace whatever is pending on the axes they move,
+and relative or speed commands submitted while one is still pending are dropped: they were computed
+against where the camera was, not where the target takes it.
+A stop is never dropped: a move that replaces a pending stop carries it, and sends it first.
+"""
+import dataclasses
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from cam_controller import PTZController
+from models import PresetLocation, PTZPosition
+
+
+class ControlAxis(str, Enum):
+    PAN_TILT = "PAN_TILT"
+    ZOOM = "ZOOM"
+
+
+@dataclass
+class SchedulerMetrics:
+    submitted: int = 0
+    executed: int = 0
+    dropped: int = 0  # superseded by a newer command before being sent
+    merged: int = 0  # pan and tilt moves combined into a single composite move
+    failed: int = 0
+    queue_latency_total_s: float = 0.0
+    queue_latency_max_s: float = 0.0
+
+    @property
+    def mean_queue_latency_s(self) -> float:
+        return self.queue_latency_total_s / self.executed if self.executed else 0.0
+
+
+@dataclass
+class _PendingMove:
+    submitted_at: float
+    pan: Optional[Tuple[int, float]] = None  # (direction, amount)
+    tilt: Optional[Tuple[int, float]] = None
+    zoom: Optional[Tuple[int, float]] = None
+    pan_tilt_velocity: Optional[Tuple[float, float]] = None
+    zoom_velocity: Optional[float] = None
+    home: bool = False
+    zoom_reset: bool = False
+    preset: Optional[PresetLocation] = None  # moves both axes, pending in the PAN_TILT slot
+    # Stops this move replaced, sent before it
+    stop_pan_tilt: bool = False
+    stop_zoom: bool = False
+
+    @property
+    def absolute(self) -> bool:
+        return self.home or self.zoom_reset or self.preset is not None
+
+    @property
+    def velocity(self) -> bool:
+        return self.pan_tilt_velocity is not None or self.zoom_velocity is not None
+
+    @property
+    def stops_pan_tilt(self) -> bool:
+        return self.stop_pan_tilt or self.pan_tilt_velocity == (0.0, 0.0)
+
+    @property
+    def stops_zoom(self) -> bool:
+        return self.stop_zoom or self.zoom_velocity == 0.0
+
+
+class CommandScheduler:
+    """
+    Exposes the controller's move_* methods, but they return immediately and are sent by a worker thread.
+    At most one request per axis is in flight.
+    """
+    cam_control: PTZController
+    _pending: Dict[ControlAxis, Optional[_PendingMove]]
+    _axis_order: List[ControlAxis]
+    _metrics: SchedulerMetrics
+    _condition: threading.Condition
+    _running: bool
+    _worker: Optional[threading.Thread]
+
+    def __init__(self, cam_controller: PTZController):
+        self.cam_control = cam_controller
+        self._pending = {axis: None for axis in ControlAxis}
+        self._axis_order = list(ControlAxis)
+        self._metrics = SchedulerMetrics()
+        self._condition = threading.Condition()
+        self._running = False
+        self._worker = None
+
+    @property
+    def current_position(self) -> PTZPosition:
+        return self.cam_control.current_position
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the worker, anything still pending is dropped"""
+        with self._condition:
+            self._running = False
+            for axis, move in self._pending.items():
+                if move is not None:
+                    self._metrics.dropped += 1
+                    self._pending[axis] = None
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._condition:
+            return dataclasses.replace(self._metrics)
+
+    def move_pan(self, direction: int, speed: float = 5.0):
+        self._submit_pan_tilt(pan=(direction, speed))
+
+    def move_tilt(self, direction: int, speed: float = 5.0):
+        self._submit_pan_tilt(tilt=(direction, speed))
+
+    def move_composite(self, pan_dir: int, tilt_dir: int, pan_amount: float, tilt_amount: float):
+        self._submit_pan_tilt(pan=(pan_dir, pan_amount), tilt=(tilt_dir, tilt_amount))
+
+    def move_zoom(self, direction: int, speed: float = 2.0):
+        self._replace(ControlAxis.ZOOM, _PendingMove(time.perf_counter(), zoom=(direction, speed)))
+
+    def start_pan_tilt(self, pan_velocity: float, tilt_velocity: float):
+        self._replace(
+            ControlAxis.PAN_TILT, _PendingMove(time.perf_counter(), pan_tilt_velocity=(pan_velocity, tilt_velocity))
+        )
+
+    def stop_pan_tilt(self):
+        self.start_pan_tilt(0.0, 0.0)
+
+    def start_zoom(self, velocity: float):
+        self._replace(ControlAxis.ZOOM, _PendingMove(time.perf_counter(), zoom_velocity=velocity))
+
+    def stop_zoom(self):
+        self.start_zoom(0.0)
+
+    def move_home(self):
+        self._replace(ControlAxis.PAN_TILT, _PendingMove(time.perf_counter(), home=True))
+
+    def reset_zoom(self):
+        self._replace(ControlAxis.ZOOM, _PendingMove(time.perf_counter(), zoom_reset=True))
+
+    def goto_preset(self, preset: PresetLocation):
+        move = _PendingMove(time.perf_counter(), preset=preset)
+        with self._condition:
+            pending_zoom = self._pending[ControlAxis.ZOOM]
+            if pending_zoom is not None:
+                self._metrics.dropped += int(not pending_zoom.stops_zoom)
+                self._metrics.merged += int(pending_zoom.stops_zoom)
+                move.stop_zoom = pending_zoom.stops_zoom
+                self._pending[ControlAxis.ZOOM] = None
+            self._replace(ControlAxis.PAN_TILT, move)
+
+    def _absolute_pending(self, axis: ControlAxis) -> bool:
+        """Whether an absolute target pending for axis makes a relative or speed command stale. Holds the lock"""
+        pan_tilt = self._pending[ControlAxis.PAN_TILT]
+        if axis == ControlAxis.ZOOM and pan_tilt is not None and pan_tilt.preset is not None:
+            return True
+        return self._pending[axis] is not None and self._pending[axis].absolute
+
+    def _carry_stops(self, axis: ControlAxis, move: _PendingMove) -> _PendingMove:
+        """
+        move, carrying any stop pending on axis that it replaces so the stop is still sent. A newer speed
+        command supersedes a stop. Counts the pending command as merged or dropped. Holds the lock
+        """
+        pending = self._pending[axis]
+        if pending is None:
+            return move
+        if not move.velocity and (pending.stops_pan_tilt or pending.stops_zoom):
+            move.stop_pan_tilt = move.stop_pan_tilt or pending.stops_pan_tilt
+            move.stop_zoom = move.stop_zoom or pending.stops_zoom
+            self._metrics.merged += 1
+        else:
+            self._metrics.dropped += 1
+        return move
+
+    def _replace(self, axis: ControlAxis, move: _PendingMove):
+        with self._condition:
+            self._metrics.submitted += 1
+            if not move.absolute and self._absolute_pending(axis):
+                target = self._pending[ControlAxis.PAN_TILT if self._pending[axis] is None else axis]
+                if move.stops_pan_tilt or move.stops_zoom:
+                    # Sent ahead of the target rather than dropped
+                    target.stop_pan_tilt = target.stop_pan_tilt or move.stops_pan_tilt
+                    target.stop_zoom = target.stop_zoom or move.stops_zoom
+                    self._metrics.merged += 1
+                else:
+                    self._metrics.dropped += 1
+                return
+            self._pending[axis] = self._carry_stops(axis, move)
+            self._condition.notify()
+
+    def _submit_pan_tilt(self, pan: Optional[Tuple[int, float]] = None, tilt: Optional[Tuple[int, float]] = None):
+        with self._condition:
+            self._metrics.submitted += 1
+            pending = self._pending[ControlAxis.PAN_TILT]
+            if self._absolute_pending(ControlAxis.PAN_TILT):
+                self._metrics.dropped += 1
+            elif pending is None or pending.pan_tilt_velocity is not None:
+                self._pending[ControlAxis.PAN_TILT] = self._carry_stops(
+                    ControlAxis.PAN_TILT, _PendingMove(time.perf_counter(), pan=pan, tilt=tilt)
+                )
+            elif (pan is None or pending.pan is None) and (tilt is None or pending.tilt is None):
+                # Axes don't overlap - combine into one composite move
+                self._metrics.merged += 1
+                pending.pan = pan if pan is not None else pending.pan
+                pending.tilt = tilt if tilt is not None else pending.tilt
+            else:
+                self._pending[ControlAxis.PAN_TILT] = self._carry_stops(ControlAxis.PAN_TILT, _PendingMove(
+                    time.perf_counter(),
+                    pan=pan if pan is not None else pending.pan,
+                    tilt=tilt if tilt is not None else pending.tilt,
+                ))
+            self._condition.notify()
+
+    def _next_move(self) -> Optional[Tuple[ControlAxis, _PendingMove]]:
+        # Alternate between axes so a busy pan/tilt slot can't starve zoom
+        with self._condition:
+            while self._running:
+                for axis in self._axis_order:
+                    move = self._pending[axis]
+                    if move is not None:
+                        self._pending[axis] = None
+                        self._axis_order = self._axis_order[1:] + self._axis_order[:1]
+                        return axis, move
+                self._condition.wait()
+            return None
+
+    def _run(self):
+        while True:
+            next_move = self._next_move()
+            if next_move is None:
+                return
+            axis, move = next_move
+            queue_latency = time.perf_counter() - move.submitted_at
+            try:
+                self._execute(axis, move)
+                failed = False
+            except Exception as e:
+                print(f"Failed to send scheduled {axis.value} command: {e}")
+                failed = True
+            with self._condition:
+                self._metrics.executed += 1
+                self._metrics.failed += int(failed)
+                self._metrics.queue_latency_total_s += queue_latency
+                self._metrics.queue_latency_max_s = max(self._metrics.queue_latency_max_s, queue_latency)
+
+    def _execute(self, axis: ControlAxis, move: _PendingMove):
+        if move.stop_pan_tilt:
+            self.cam_control.stop_pan_tilt()
+        if move.stop_zoom:
+            self.cam_control.stop_zoom()
+        if move.home:
+            self.cam_control.move_home()
+        elif move.zoom_reset:
+            self.cam_control.reset_zoom()
+        elif move.preset is not None:
+            self.cam_control.goto_preset(move.preset)
+        elif move.pan_tilt_velocity is not None:
+            self.cam_control.start_pan_tilt(*move.pan_tilt_velocity)
+        elif move.zoom_velocity is not None:
+            self.cam_control.start_zoom(move.zoom_velocity)
+        elif axis == ControlAxis.ZOOM:
+            self.cam_control.move_zoom(*move.zoom)
+        elif move.pan is not None and move.tilt is not None:
+            self.cam_control.move_composite(move.pan[0], move.tilt[0], move.pan[1], move.tilt[1])
+        elif move.pan is not None:
+            self.cam_control.move_pan(*move.pan)
+        else:
+            self.cam_control.move_tilt(*move.tilt)
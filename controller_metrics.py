@@ -0,0 +1,157 @@
+"""
+Per-command latency histograms and failure counts for the PTZ controllers.
+Recording is a bucket lookup and a few integer increments under a lock, cheap enough to stay on
+the control path. Snapshots are plain dicts that can be dumped as JSON or Prometheus text.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Coarser bounds for the Prometheus export
+PROMETHEUS_BOUNDS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Bucket upper bounds: log spaced from 0.25ms to ~16s, each 25% wider than the last, plus the
+# Prometheus bounds so the exported counts are exact
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(sorted({0.00025 * 1.25 ** i for i in range(50)} | set(PROMETHEUS_BOUNDS)))
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram - percentiles are the upper bound of the bucket they fall in"""
+    counts: List[int]
+    count: int
+    total_s: float
+    max_s: float
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total_s += seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+
+    def percentile(self, fraction: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Never report more than the slowest call actually seen
+                return min(BUCKET_BOUNDS[i], self.max_s) if i < len(BUCKET_BOUNDS) else self.max_s
+        return self.max_s
+
+    def cumulative(self, bounds: Iterable[float]) -> List[Tuple[float, int]]:
+        """(upper bound, calls at or below it) for each of bounds"""
+        result = []
+        seen = 0
+        i = 0
+        for bound in bounds:
+            while i < len(BUCKET_BOUNDS) and BUCKET_BOUNDS[i] <= bound:
+                seen += self.counts[i]
+                i += 1
+            result.append((bound, seen))
+        return result
+
+
+class CommandStats:
+    histogram: LatencyHistogram
+    failures: int
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.failures = 0
+
+
+class ControllerMetrics:
+    """
+    Per command type (APS, AXZ, APC, GZ, Z, PTS, getinfo) request counts, failures and latency.
+    A failure is a transport error, a non 200 status or a response that isn't the expected echo/status.
+    """
+    camera: str
+    started_at: float
+    _stats: Dict[str, CommandStats]
+    _lock: threading.Lock
+
+    def __init__(self, camera: str):
+        self.camera = camera
+        self.started_at = time.time()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, command_type: str, seconds: float, ok: bool):
+        with self._lock:
+            stats = self._stats.get(command_type)
+            if stats is None:
+                stats = self._stats[command_type] = CommandStats()
+            stats.histogram.record(seconds)
+            if not ok:
+                stats.failures += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            commands = {}
+            for command_type, stats in self._stats.items():
+                histogram = stats.histogram
+                commands[command_type] = {
+                    "count": histogram.count,
+                    "failures": stats.failures,
+                    "total_s": histogram.total_s,
+                    "max_s": histogram.max_s,
+                    "p50_s": histogram.percentile(0.50),
+                    "p95_s": histogram.percentile(0.95),
+                    "p99_s": histogram.percentile(0.99),
+                    "buckets": histogram.cumulative(PROMETHEUS_BOUNDS),
+                }
+        return {
+            "camera": self.camera,
+            "since": self.started_at,
+            # Time callers spent waiting on the camera
+            "blocked_s": sum(command["total_s"] for command in commands.values()),
+            "commands": commands,
+        }
+
+
+def to_json(snapshots: Iterable[dict], indent: int = 2) -> str:
+    """JSON dump of one or more snapshots, without the Prometheus buckets"""
+    return json.dumps([
+        {**snapshot, "commands": {
+            command_type: {key: value for key, value in command.items() if key != "buckets"}
+            for command_type, command in snapshot["commands"].items()
+        }}
+        for snapshot in snapshots
+    ], indent=indent)
+
+
+def to_prometheus(snapshots: Iterable[dict]) -> str:
+    """Prometheus text exposition of one or more snapshots"""
+    lines = [
+        "# HELP ptz_command_duration_seconds aw_ptz request latency by command type",
+        "# TYPE ptz_command_duration_seconds histogram",
+    ]
+    failure_lines = [
+        "# HELP ptz_command_failures_total aw_ptz requests that failed or were not acknowledged",
+        "# TYPE ptz_command_failures_total counter",
+    ]
+    for snapshot in snapshots:
+        for command_type, command in snapshot["commands"].items():
+            labels = f'camera="{snapshot["camera"]}",command="{command_type}"'
+            for bound, count in command["buckets"]:
+                lines.append(f'ptz_command_duration_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'ptz_command_duration_seconds_bucket{{{labels},le="+Inf"}} {command["count"]}')
+            lines.append(f"ptz_command_duration_seconds_sum{{{labels}}} {command['total_s']:.6f}")
+            lines.append(f"ptz_command_duration_seconds_count{{{labels}}} {command['count']}")
+            failure_lines.append(f"ptz_command_failures_total{{{labels}}} {command['failures']}")
+    return "\n".join(lines + failure_lines) + "\n"
@@ -0,0 +1,59 @@
+"""
+CameraPool scaling from 1 to 32 simulated cameras.
+Each camera is its own simulator with network-like latency. Compares polling positions and recalling a
+preset one camera after another against the pool's concurrent fan-out.
+
+Run from repo root: python -m experiments.benchmarks.camera_pool_scaling
+"""
+import time
+from contextlib import ExitStack
+
+from camera_pool import CameraPool
+from experiments.camera_simulator import CameraSimulator
+from models import PresetLocation
+
+CAMERA_COUNTS = (1, 2, 4, 8, 16, 32)
+LATENCY = 0.01
+JITTER = 0.005
+ROUNDS = 5
+CENTER_ICE = PresetLocation("Center Ice", pan=0x8000, tilt=0x7800, zoom=0x800)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    print(f"{'cameras':>8}{'poll seq':>12}{'poll pool':>12}{'preset seq':>12}{'preset pool':>13}")
+    for count in CAMERA_COUNTS:
+        with ExitStack() as stack:
+            simulators = [
+                stack.enter_context(CameraSimulator(latency=LATENCY, jitter=JITTER, seed=i)) for i in range(count)
+            ]
+            pool = CameraPool(reconcile_interval=0)
+            stack.callback(pool.close)
+            for i, simulator in enumerate(simulators):
+                pool.add_camera(f"cam{i}", simulator.address)
+            pool.check_connections()
+            presets = {name: CENTER_ICE for name in pool.controllers}
+
+            def poll_sequential():
+                for controller in pool.controllers.values():
+                    controller.refresh_position()
+
+            def preset_sequential():
+                for controller in pool.controllers.values():
+                    controller.goto_preset(CENTER_ICE)
+
+            poll_seq = timed(poll_sequential)
+            poll_pool = timed(pool.refresh_positions)
+            preset_seq = timed(preset_sequential)
+            preset_pool = timed(lambda: pool.goto_presets(presets))
+        print(f"{count:>8}{poll_seq:>10.1f}ms{poll_pool:>10.1f}ms{preset_seq:>10.1f}ms{preset_pool:>11.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Control loop latency while the camera stalls, with and without the circuit breaker.
+
+A 20Hz loop sends pan steps to the simulator. Part way through the simulator stops answering
+(connections accepted, no response) and later recovers. Reports the median and slowest move_pan call
+per phase and how long after recovery the controller trusts the camera again.
+
+Run from repo root: python -m experiments.benchmarks.camera_stall
+"""
+import time
+from typing import Dict, List, Tuple
+
+from cam_controller import PTZController
+from circuit_breaker import CircuitBreaker, CircuitState
+from experiments.camera_simulator import CameraSimulator
+
+LOOP_INTERVAL = 0.05
+PHASES = (("healthy", 2.0), ("stalled", 6.0), ("recovered", 4.0))
+
+
+def run(breaker: CircuitBreaker) -> Tuple[Dict[str, List[float]], float]:
+    """move_pan call durations per phase, seconds from recovery until the breaker closed"""
+    durations: Dict[str, List[float]] = {}
+    with CameraSimulator(latency=0.002, seed=0) as simulator:
+        controller = PTZController(simulator.address, breaker=breaker)
+        controller.check_connection()
+        controller.refresh_position()
+        step = 0
+        recovered_at = None
+        for phase, seconds in PHASES:
+            if phase == "stalled":
+                simulator.stall()
+            elif phase == "recovered":
+                simulator.resume()
+                resumed = time.perf_counter()
+            calls = durations[phase] = []
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                controller.move_pan(1 if step % 2 == 0 else -1, 1.0)
+                calls.append(time.perf_counter() - start)
+                step += 1
+                if phase == "recovered" and recovered_at is None and breaker.state is CircuitState.CLOSED:
+                    recovered_at = time.perf_counter() - resumed
+                time.sleep(max(0.0, LOOP_INTERVAL - calls[-1]))
+        controller.close()
+    return durations, recovered_at if recovered_at is not None else float("inf")
+
+
+def main():
+    print(f"{'breaker':<10}{'phase':<12}{'loops':>7}{'median':>10}{'max':>10}")
+    for label, breaker in (("on", CircuitBreaker()), ("off", CircuitBreaker(failure_threshold=10 ** 9))):
+        durations, recovery = run(breaker)
+        for phase, _ in PHASES:
+            calls = sorted(durations[phase])
+            median = calls[len(calls) // 2]
+            print(f"{label:<10}{phase:<12}{len(calls):>7}{median * 1000:>8.1f}ms{calls[-1] * 1000:>8.1f}ms")
+        print(f"{label:<10}breaker trips {breaker.trips}, closed {recovery:.2f}s after the camera recovered")
+
+
+if __name__ == '__main__':
+    main()
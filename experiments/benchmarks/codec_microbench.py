@@ -0,0 +1,52 @@
+"""
+Microbenchmarks for ptz_codec against the hand-rolled hex formatting it replaced,
+plus a count of how many small tracker steps the old byte truncation turned into no-ops.
+
+Run from repo root: python -m experiments.benchmarks.codec_microbench
+"""
+import timeit
+
+import ptz_codec
+
+NUMBER = 500_000
+PAN, TILT, ZOOM = 0x7F3A, 0x8123, 0x9A7
+
+
+def legacy_aps(pan: int, tilt: int) -> str:
+    target_pan = (hex(pan).replace("0x", "")[0:2] + "00").upper()
+    current_tilt = hex(tilt + 1).replace("0x", "").upper()
+    return f"APS{target_pan}{current_tilt}1D2"
+
+
+def legacy_axz(zoom: int) -> str:
+    return f"AXZ{(hex(zoom).replace('0x', '')[0:2] + '0').upper()}"
+
+
+def legacy_apc(text: str):
+    position_hex_strings = text.replace("aPC", "")
+    return int(position_hex_strings[0:4], 16), int(position_hex_strings[4:], 16)
+
+
+def report(label: str, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print(f"{label:<32} {seconds / NUMBER * 1e9:8.1f} ns/call")
+
+
+def main():
+    report("legacy APS encode", lambda: legacy_aps(PAN, TILT))
+    report("ptz_codec.encode_pan_tilt", lambda: ptz_codec.encode_pan_tilt(PAN, TILT))
+    report("legacy AXZ encode", lambda: legacy_axz(ZOOM))
+    report("ptz_codec.encode_zoom", lambda: ptz_codec.encode_zoom(ZOOM))
+    report("legacy APC decode", lambda: legacy_apc("aPC7F3A8123"))
+    report("ptz_codec.decode_pan_tilt_status", lambda: ptz_codec.decode_pan_tilt_status("aPC7F3A8123"))
+
+    # Steps a tracker sends with speed < 1.0 - how many actually move the camera
+    start = 0x7F3A
+    steps = [int(start + 256 * amount / 100) + 2 for amount in range(1, 100)]
+    legacy_moves = sum((hex(step)[2:4] + "00") != (hex(start)[2:4] + "00") for step in steps)
+    codec_moves = sum(ptz_codec.clamp_pan_tilt(step) != start for step in steps)
+    print(f"sub-step pan moves (speed 0.01-0.99): legacy {legacy_moves}/99 move, codec {codec_moves}/99 move")
+
+
+if __name__ == '__main__':
+    main()
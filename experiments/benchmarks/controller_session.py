@@ -0,0 +1,59 @@
+"""
+Per-command latency of PTZController with and without connection reuse.
+Runs against the local camera simulator, so no camera is needed.
+"Before" forces a fresh TCP connection per request (as the module-level requests.get did),
+"After" uses the controller's pooled keep-alive session.
+
+Run from repo root: python -m experiments.benchmarks.controller_session
+"""
+import statistics
+import time
+from typing import List
+
+import requests
+
+from cam_controller import PTZController
+from experiments.camera_simulator import CameraSimulator
+
+ITERATIONS = 300
+
+
+def time_move_pan(controller: PTZController) -> List[float]:
+    timings = []
+    for i in range(ITERATIONS):
+        start = time.perf_counter()
+        controller.move_pan(1 if i % 2 == 0 else -1, 1.0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: List[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{label:<28} mean={statistics.mean(timings):6.2f}ms  p50={statistics.median(timings):6.2f}ms  p95={p95:6.2f}ms")
+
+
+def main():
+    simulator = CameraSimulator()
+    address = simulator.start()
+
+    no_keep_alive = requests.Session()
+    no_keep_alive.headers["Connection"] = "close"
+    before = PTZController(address, session=no_keep_alive, reconcile_interval=0)
+    before.check_connection()
+    before.refresh_position()
+    after = PTZController(address, reconcile_interval=0)
+    after.check_connection()
+    after.refresh_position()
+
+    print(f"move_pan (1 move + APC + GZ) x {ITERATIONS}")
+    report("new connection per request", time_move_pan(before))
+    report("pooled keep-alive session", time_move_pan(after))
+
+    before.close()
+    after.close()
+    simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
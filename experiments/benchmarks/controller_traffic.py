@@ -0,0 +1,56 @@
+"""
+HTTP requests sent by PTZController under a tracker-like load of small pan/tilt/zoom corrections.
+Compares querying the camera after every move (reconcile_interval=0) with the optimistic position model.
+Before the position model every correction cost 3 requests (move + #APC + #GZ).
+
+Run from repo root: python -m experiments.benchmarks.controller_traffic
+"""
+import random
+import time
+
+from cam_controller import PTZController
+from experiments.camera_simulator import CameraSimulator
+
+CORRECTIONS = 200
+CORRECTION_INTERVAL = 0.05  # 20 fps tracker
+
+
+def run_corrections(controller: PTZController):
+    rng = random.Random(0)
+    for _ in range(CORRECTIONS):
+        axis = rng.choice(("pan", "tilt", "composite", "zoom"))
+        amount = rng.uniform(0.1, 5.0)
+        if axis == "pan":
+            controller.move_pan(rng.choice((-1, 1)), amount)
+        elif axis == "tilt":
+            controller.move_tilt(rng.choice((-1, 1)), amount)
+        elif axis == "composite":
+            controller.move_composite(rng.choice((-1, 1)), rng.choice((-1, 1)), amount, amount)
+        else:
+            controller.move_zoom(rng.choice((-1, 1)), int(amount))
+        time.sleep(CORRECTION_INTERVAL)
+
+
+def main():
+    simulator = CameraSimulator()
+    address = simulator.start()
+
+    print(f"{CORRECTIONS} tracker corrections at {1 / CORRECTION_INTERVAL:.0f}Hz")
+    print(f"{'refresh after every move (before)':<36} requests={CORRECTIONS * 3}")
+    for label, reconcile_interval in (("reconcile_interval=0", 0.0), ("reconcile_interval=1s", 1.0)):
+        controller = PTZController(address, reconcile_interval=reconcile_interval)
+        controller.check_connection()
+        controller.refresh_position()
+        baseline = controller.commands_sent
+        run_corrections(controller)
+        sent = controller.commands_sent - baseline
+        print(
+            f"{label:<36} requests={sent:<5} skipped={controller.commands_skipped:<4} "
+            f"reduction={CORRECTIONS * 3 / max(sent, 1):.1f}x"
+        )
+        controller.close()
+    simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
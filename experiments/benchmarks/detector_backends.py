@@ -0,0 +1,123 @@
+"""
+Latency and accuracy of the YOLO player detector on each inference backend, on the same clip.
+
+Each backend in tracking.detector_backends that is installed and exported detects on the first --frames
+frames of --clip, resized like the tracker's detect output, once per --threads setting. Reported: time
+to build the detector (a backend's first build includes importing its runtime), mean and p95 latency
+per frame, thread CPU per frame (the runtimes' own pools aren't counted), players per frame, and against
+the PyTorch backend's boxes on the same frames the share of its players found (recall) and of the
+detections that are its players (precision), both at IoU > 0.5, and the mean IoU of those found.
+
+Export the weights first: python -m experiments.yolo_finetune.export
+Run from repo root: python -m experiments.benchmarks.detector_backends --clip game.mp4 --threads 1 2 4
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from file_feed import PlaybackMode, VideoFileFeed
+from frame_preprocessing import FrameOutput
+from tracking.detector_backends import DETECT_SIZE, WEIGHTS_PATH, DetectorBackend, player_detector, weights_path
+from tracking.multi_object import iou_matrix
+from tracking.yolo_tracker import DETECT_OUTPUT
+
+WARM_UP = 5  # frames - the first inferences allocate and tune
+MATCH_IOU = 0.5
+
+
+def read_clip(clip: Path, frames: int) -> List[np.ndarray]:
+    """Up to frames frames of clip as the tracker's detector sees them"""
+    feed = VideoFileFeed(clip, mode=PlaybackMode.MAX_SPEED)
+    feed.add_output(FrameOutput(DETECT_OUTPUT, max_side=DETECT_SIZE))
+    feed.start()
+    images = []
+    last_seq = 0
+    while len(images) < frames:
+        frame = feed.wait_next(last_seq, timeout=5.0)
+        if frame is None:
+            break
+        last_seq = frame.seq
+        images.append(frame.output(DETECT_OUTPUT).copy())
+    feed.release()
+    return images
+
+
+def run(
+    backend: DetectorBackend, threads: Optional[int], weights: Path, images: List[np.ndarray]
+) -> Tuple[float, np.ndarray, float, List[np.ndarray]]:
+    """Build seconds, per frame latencies, CPU seconds per frame and boxes per frame"""
+    started = time.perf_counter()
+    detect = player_detector(backend, threads, weights)()
+    build_s = time.perf_counter() - started
+    for image in images[:WARM_UP]:
+        detect(image)
+    latencies = []
+    boxes = []
+    cpu = time.thread_time()
+    for image in images:
+        started = time.perf_counter()
+        frame_boxes, _ = detect(image)
+        latencies.append(time.perf_counter() - started)
+        boxes.append(np.asarray(frame_boxes, np.float64).reshape(-1, 4))
+    return build_s, np.array(latencies), (time.thread_time() - cpu) / len(images), boxes
+
+
+def agreement(boxes: List[np.ndarray], reference: List[np.ndarray]) -> Tuple[float, float, float]:
+    """Recall and precision against the reference boxes at MATCH_IOU, and the mean IoU of the players found"""
+    found = expected = correct = detected = 0
+    iou_sum = 0.0
+    for frame_boxes, frame_reference in zip(boxes, reference):
+        expected += len(frame_reference)
+        detected += len(frame_boxes)
+        if not len(frame_boxes) or not len(frame_reference):
+            continue
+        overlap = iou_matrix(frame_reference, frame_boxes)
+        best = overlap.max(axis=1)
+        found += (best > MATCH_IOU).sum()
+        iou_sum += best[best > MATCH_IOU].sum()
+        correct += (overlap.max(axis=0) > MATCH_IOU).sum()
+    return found / max(expected, 1), correct / max(detected, 1), iou_sum / max(found, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clip", type=Path, required=True, help="recording to detect on")
+    parser.add_argument("--frames", type=int, default=200, help="frames from the start of the clip")
+    parser.add_argument("--weights", type=Path, default=WEIGHTS_PATH, help="PyTorch weights the exports came from")
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[0], help="inference thread counts, 0 for the runtime's default"
+    )
+    args = parser.parse_args()
+
+    images = read_clip(args.clip, args.frames)
+    print(f"{len(images)} frames of {images[0].shape[1]}x{images[0].shape[0]}")
+    print(f"{'backend':<10}{'threads':>8}{'build':>8}{'mean':>9}{'p95':>9}{'CPU':>9}{'players':>9}"
+          f"{'recall':>8}{'precision':>10}{'IoU':>6}")
+    reference = None
+    for backend in DetectorBackend:
+        if not weights_path(backend, args.weights).exists():
+            print(f"{backend.value:<10}no weights at {weights_path(backend, args.weights)}")
+            continue
+        for threads in args.threads:
+            try:
+                build_s, latencies, cpu_s, boxes = run(backend, threads or None, args.weights, images)
+            except ImportError as e:
+                print(f"{backend.value:<10}not installed: {e}")
+                break
+            if reference is None and backend == DetectorBackend.PYTORCH:
+                reference = boxes
+            if reference is not None:
+                recall, precision, iou = agreement(boxes, reference)
+                accuracy = f"{recall * 100:>7.1f}%{precision * 100:>9.1f}%{iou:>6.2f}"
+            else:
+                accuracy = f"{'-':>8}{'-':>10}{'-':>6}"
+            print(f"{backend.value:<10}{threads or 'default':>8}{build_s:>7.1f}s{latencies.mean() * 1000:>7.1f}ms"
+                  f"{np.percentile(latencies, 95) * 1000:>7.1f}ms{cpu_s * 1000:>7.1f}ms"
+                  f"{np.mean([len(b) for b in boxes]):>9.1f}{accuracy}")
+
+
+if __name__ == '__main__':
+    main()
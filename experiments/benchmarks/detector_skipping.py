@@ -0,0 +1,183 @@
+"""
+Cost and accuracy of the YOLO tracker's inference stage with and without detector skipping.
+
+The recording is 720p at 20fps: a dozen textured red players skating smooth paths over a textured
+grey rink. The detector is a stand-in that finds the red players exactly, then keeps the CPU busy for
+--detect-ms like YOLO on a CPU-only host. Frames are released at the recording's rate and the real
+MotionTracker._next_tracks runs on each newest one, as in the inference thread.
+
+Reported per setting: tracked frames and detections per second, the mean number of frames between
+detections, inference thread CPU load (1.0 = one core busy), mean latency from capture to tracks, and
+against the players' true boxes on the tracked frame the mean IoU of the best track and the share of
+players covered (IoU > 0.5) by a confirmed track.
+
+Run from repo root: python -m experiments.benchmarks.detector_skipping --seconds 15
+"""
+import argparse
+import functools
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from file_feed import PlaybackMode, VideoFileFeed
+from models import TrackingMode
+from tracking.multi_object import iou_matrix
+from tracking.yolo_tracker import MotionTracker
+
+FPS = 20
+FRAME_SIZE = (1280, 720)
+PLAYERS = 12
+PLAYER_SIZE = (40, 90)
+WARM_UP = 3.0  # seconds - tracks are confirmed after a few detections
+
+
+class CountingController:
+    """Accepts any controller command and counts it"""
+    commands: int = 0
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands += 1
+        return command
+
+
+def player_boxes(index: int) -> np.ndarray:
+    """True (PLAYERS, 4) x1, y1, x2, y2 boxes on frame index, full frame pixels"""
+    t = index / FPS
+    k = np.arange(PLAYERS)
+    # Long loops across the rink at up to 180 px/s (about 4 m/s), crossing their neighbours' paths
+    speed = 0.5 + 0.05 * k
+    x = 200 + (k % 4) * 290 + 170 * np.sin(t * speed + k)
+    y = 150 + (k // 4) * 210 + 50 * np.cos(t * speed * 0.7 + 2 * k)
+    x1, y1 = np.round(x - PLAYER_SIZE[0] / 2), np.round(y - PLAYER_SIZE[1] / 2)
+    return np.stack([x1, y1, x1 + PLAYER_SIZE[0], y1 + PLAYER_SIZE[1]], axis=1)
+
+
+def write_recording(path: Path, frames: int):
+    rng = np.random.default_rng(0)
+    rink = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0]), np.float32)
+    for blur in (5, 21, 61):
+        layer = cv2.GaussianBlur(rng.normal(0, 1, rink.shape).astype(np.float32), (blur, blur), 0)
+        rink += layer / layer.std()
+    rink = cv2.cvtColor(cv2.normalize(rink, None, 60, 200, cv2.NORM_MINMAX, cv2.CV_8U), cv2.COLOR_GRAY2BGR)
+    # Red jerseys with texture to follow, and nothing else in the frame that red
+    jerseys = []
+    height, width = PLAYER_SIZE[::-1]
+    for _ in range(PLAYERS):
+        jersey = np.empty((height, width, 3), np.uint8)
+        jersey[:, :, :2] = cv2.GaussianBlur(rng.integers(0, 70, (height, width, 2), np.uint8), (5, 5), 0)
+        jersey[:, :, 2] = cv2.GaussianBlur(rng.integers(170, 255, (height, width), np.uint8), (5, 5), 0)
+        jerseys.append(jersey)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, FRAME_SIZE)
+    for i in range(frames):
+        frame = rink.copy()
+        for (x1, y1, x2, y2), jersey in zip(player_boxes(i).astype(int), jerseys):
+            frame[y1:y2, x1:x2] = jersey
+        writer.write(frame)
+    writer.release()
+
+
+class StandInDetector:
+    """image -> (boxes, confidences) of the red players, after busying the CPU for detect_s like YOLO"""
+
+    def __init__(self, detect_s: float):
+        self.detect_s = detect_s
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        busy_until = time.thread_time() + self.detect_s
+        while time.thread_time() < busy_until:
+            pass
+        blue, green, red = cv2.split(image)
+        mask = ((red > 140) & (green < 100) & (blue < 100)).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        stats = stats[1:][stats[1:, cv2.CC_STAT_AREA] > 50]
+        x, y, w, h = stats[:, :4].astype(np.float64).T
+        return np.stack([x, y, x + w, y + h], axis=1), np.ones(len(stats))
+
+
+def run(recording: Path, frames: int, skipping: bool, detect_share: float, detect_s: float) -> dict:
+    feed = VideoFileFeed(recording, mode=PlaybackMode.STEPPED)
+    detector = functools.partial(StandInDetector, detect_s)
+    tracker = MotionTracker(feed, TrackingMode.MULTI, CountingController(), detector_factory=detector)
+    tracker.detector_skipping = skipping
+    tracker.detect_share = detect_share
+    feed.step()
+    tracker._configure_tracking()
+
+    tracked_frames = detections = 0
+    cpu_s = latency_s = iou_sum = covered = intervals = 0.0
+    measured_from = None
+    started = time.perf_counter()
+    stepped, last_seq = 1, 0
+    while True:
+        # Release frames at the recording's rate, the newest is tracked once the last one is done
+        due = min(frames, 1 + int((time.perf_counter() - started) * FPS))
+        if due <= last_seq:
+            if last_seq >= frames:
+                break
+            time.sleep(max(0.0, started + last_seq / FPS - time.perf_counter()))
+            continue
+        if due > stepped:
+            feed.step(due - stepped)
+            stepped = due
+            # The feed decodes stepped frames one by one, the newest is what a live camera would offer
+            feed.wait_next(stepped - 1, timeout=feed.stale_after)
+        cpu = time.thread_time()
+        tracked = tracker._next_tracks(last_seq)
+        cpu = time.thread_time() - cpu
+        if tracked is None:
+            break
+        last_seq = tracked.seq
+        if tracked.captured_at - started < WARM_UP:
+            continue
+        if measured_from is None:
+            measured_from = time.perf_counter()
+        tracked_frames += 1
+        detections += tracked.detected
+        intervals += tracker.detect_every
+        cpu_s += cpu
+        latency_s += tracked.age()
+        truth = player_boxes(tracked.seq - 1)
+        if len(tracked.tracks):
+            best = iou_matrix(truth, tracked.tracks.boxes).max(axis=1)
+            iou_sum += best.mean()
+            covered += (best > 0.5).mean()
+    seconds = time.perf_counter() - measured_from
+    feed.release()
+    return {
+        "frames_s": tracked_frames / seconds,
+        "detections_s": detections / seconds,
+        "every": intervals / tracked_frames,
+        "cpu": cpu_s / seconds,
+        "latency_ms": latency_s / tracked_frames * 1000,
+        "iou": iou_sum / tracked_frames,
+        "covered": covered / tracked_frames * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=15.0, help="measured run length per setting")
+    parser.add_argument("--detect-ms", type=float, default=100.0, help="CPU time per detection")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "rink.mp4"
+        frames = int((args.seconds + WARM_UP) * FPS)
+        write_recording(recording, frames)
+        print(f"{'setting':<18}{'frames/s':>9}{'detect/s':>10}{'every':>7}{'CPU':>7}{'latency':>10}"
+              f"{'IoU':>7}{'covered':>9}")
+        for label, skipping, share in (("every frame", False, 1.0), ("skipping 50%", True, 0.5),
+                                       ("skipping 25%", True, 0.25)):
+            result = run(recording, frames, skipping, share, args.detect_ms / 1000)
+            print(f"{label:<18}{result['frames_s']:>9.1f}{result['detections_s']:>10.1f}{result['every']:>7.1f}"
+                  f"{result['cpu']:>7.2f}{result['latency_ms']:>8.0f}ms{result['iou']:>7.2f}"
+                  f"{result['covered']:>8.0f}%")
+
+
+if __name__ == '__main__':
+    main()
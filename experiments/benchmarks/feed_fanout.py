@@ -0,0 +1,80 @@
+"""
+Process CPU for N consumers of one stream: a private RTSPFeed each (N decoders) against FeedHub
+subscriptions sharing one decoder.
+
+Every consumer takes each frame with wait_next and reads the detection sized output, like a tracker
+would. The source is a synthetic 1080p recording decoded at the feeds' 20fps cap. Reported per setup:
+CPU seconds per wall second (1.0 = one core busy) and frames each consumer received per second.
+
+Run from repo root: python -m experiments.benchmarks.feed_fanout --consumers 1 2 4
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from experiments.benchmarks.feed_ring_buffer import FPS, write_recording
+from feed_hub import FeedHub
+from frame_preprocessing import FrameOutput
+from rtsp_feed import RTSPFeed
+
+DETECT_OUTPUT = FrameOutput("detect", max_side=640)
+
+
+def consume(feed, seconds: float, frames: List[int]):
+    last_seq = 0
+    received = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frame = feed.wait_next(last_seq, timeout=2.0)
+        if frame is None:
+            break
+        last_seq = frame.seq
+        frame.output(DETECT_OUTPUT.name).mean()
+        received += 1
+    frames.append(received)
+
+
+def run(feeds: list, seconds: float) -> dict:
+    for feed in feeds:
+        feed.add_output(DETECT_OUTPUT)
+        feed.start()
+    time.sleep(0.5)
+    frames = []
+    threads = [threading.Thread(target=consume, args=(feed, seconds, frames)) for feed in feeds]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    for feed in feeds:
+        feed.release()
+    return {"cores": cpu / wall, "fps": sum(frames) / len(frames) / wall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--consumers", type=int, nargs="+", default=[1, 2, 4], help="consumer counts to run")
+    parser.add_argument("--seconds", type=float, default=10.0, help="run length per setup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "feed.mp4"
+        # Long enough that no decoder reaches the end of the file
+        write_recording(recording, int((args.seconds + 2) * FPS * 1.5))
+        print(f"{'consumers':<11}{'setup':<14}{'cores':>8}{'fps each':>10}")
+        for consumers in args.consumers:
+            private = [RTSPFeed.from_url(str(recording)) for _ in range(consumers)]
+            hub = FeedHub()
+            shared = [hub.subscribe(str(recording)) for _ in range(consumers)]
+            for label, feeds in (("private feeds", private), ("shared hub", shared)):
+                result = run(feeds, args.seconds)
+                print(f"{consumers:<11}{label:<14}{result['cores']:>8.2f}{result['fps']:>10.1f}")
+            hub.close()
+
+
+if __name__ == '__main__':
+    main()
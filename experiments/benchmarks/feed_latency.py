@@ -0,0 +1,147 @@
+"""
+Glass-to-frame delay of RTSPFeed's default and low_latency modes on a loopback live stream.
+
+A local MJPEG-over-HTTP server plays the camera: it renders frames on a fixed 30fps clock, stamps
+each with its frame number as a barcode and records when it was "captured". A consumer takes frames
+from the feed with wait_next, spending CONSUMER_WORK_S on each like a tracker would, and reads the
+barcode back to get the delay from capture to the frame being handed over.
+The feed reads at up to 20fps, slower than the stream, which is what lets a buffer build up.
+
+Run from repo root: python -m experiments.benchmarks.feed_latency --seconds 15
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from rtsp_feed import RTSPFeed
+
+SOURCE_FPS = 30
+FEED_FPS = 20
+FRAME_SIZE = (1280, 720)
+BARCODE_BITS = 20
+BLOCK = 40
+CONSUMER_WORK_S = 0.03
+
+
+class LoopbackCamera:
+    """Serves multipart JPEG frames, each stamped with its frame number, on a real-time clock"""
+    captured_at: Dict[int, float]
+
+    def __init__(self, port: int = 0):
+        self.captured_at = {}
+        self._started_at = time.perf_counter()
+        self._stopped = threading.Event()
+        rng = np.random.default_rng(0)
+        self._background = rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+        self._background = cv2.GaussianBlur(self._background, (9, 9), 0)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/stream.mjpg"
+
+    def stop(self):
+        """Stop serving and drop connected clients, like the camera going offline"""
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def render(self, frame_number: int) -> bytes:
+        frame = self._background.copy()
+        for bit in range(BARCODE_BITS):
+            value = 255 if frame_number >> bit & 1 else 0
+            frame[:BLOCK, bit * BLOCK:(bit + 1) * BLOCK] = value
+        return cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+    def _make_handler(self):
+        camera = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+                last_sent = -1
+                try:
+                    while not camera._stopped.is_set():
+                        # Like a live camera: the frame sent is whichever the clock says is current,
+                        # frames the connection couldn't take in time are never sent
+                        frame_number = int((time.perf_counter() - camera._started_at) * SOURCE_FPS)
+                        if frame_number == last_sent:
+                            time.sleep((frame_number + 1) / SOURCE_FPS - (time.perf_counter() - camera._started_at))
+                            continue
+                        camera.captured_at[frame_number] = camera._started_at + frame_number / SOURCE_FPS
+                        jpeg = camera.render(frame_number)
+                        self.wfile.write(
+                            b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg)
+                            + jpeg + b"\r\n"
+                        )
+                        last_sent = frame_number
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def read_barcode(image: np.ndarray) -> int:
+    row = image[BLOCK // 2, BLOCK // 2:BARCODE_BITS * BLOCK:BLOCK].mean(axis=1)
+    return sum(1 << bit for bit, value in enumerate(row) if value > 127)
+
+
+def measure(feed: RTSPFeed, camera: LoopbackCamera, seconds: float) -> List[float]:
+    """Capture to hand-over delay of every frame the consumer processed, in order"""
+    delays = []
+    feed.start()
+    last_seq = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frame = feed.wait_next(last_seq, timeout=2.0)
+        if frame is None:
+            break
+        handed_over = time.perf_counter()
+        last_seq = frame.seq
+        captured = camera.captured_at.get(read_barcode(frame.image))
+        if captured is not None:
+            delays.append(handed_over - captured)
+        time.sleep(CONSUMER_WORK_S)
+    feed.release()
+    return delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=15.0, help="run length per mode")
+    args = parser.parse_args()
+
+    modes = (
+        ("default", dict(max_fps=FEED_FPS)),
+        ("low_latency", dict(max_fps=FEED_FPS, low_latency=True)),
+        ("low_latency adaptive", dict(max_fps=FEED_FPS, low_latency=True, adaptive_fps=True)),
+    )
+    print(f"{'mode':<22}{'frames':>8}{'median':>10}{'p95':>10}{'last 1s':>10}")
+    for label, options in modes:
+        camera = LoopbackCamera()
+        feed = RTSPFeed.from_url(camera.url, **options)
+        delays = measure(feed, camera, args.seconds)
+        camera.stop()
+        if not delays:
+            print(f"{label:<22}no frames")
+            continue
+        ordered = sorted(delays)
+        tail = delays[-max(1, int(len(delays) / args.seconds)):]
+        print(f"{label:<22}{len(delays):>8}{ordered[len(ordered) // 2] * 1000:>8.0f}ms"
+              f"{ordered[int(len(ordered) * 0.95)] * 1000:>8.0f}ms{np.mean(tail) * 1000:>8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
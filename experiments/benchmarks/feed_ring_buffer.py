@@ -0,0 +1,144 @@
+"""
+Allocation churn and RSS of RTSPFeed's preallocated frame ring against the previous feed, which let
+cap.read() allocate a new frame every time.
+
+Both feeds decode the same synthetic 1080p recording at the feed's 20fps cap while a reader polls the
+newest frame. Reported per feed: frame bytes freshly allocated per second, minor page faults per frame
+(non zero when the allocator returns freed frames to the OS and faults new ones in), and RSS at start,
+end and peak.
+
+Run from repo root: python -m experiments.benchmarks.feed_ring_buffer --seconds 60
+"""
+import argparse
+import os
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from rtsp_feed import RTSPFeed
+
+FPS = 20
+FRAME_SIZE = (1920, 1080)
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class LegacyFeed:
+    """RTSPFeed before the frame ring (plus joining the decode thread on release)"""
+
+    def __init__(self, url: str):
+        self.cap = cv2.VideoCapture(url)
+        self.is_running = False
+        self.lock = threading.Lock()
+        self.frame: Optional[Tuple[bool, np.ndarray]] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.is_running = True
+        self.thread = threading.Thread(target=self._update_frame, args=())
+        self.thread.start()
+
+    def release(self) -> None:
+        self.is_running = False
+        self.thread.join()
+        if self.cap.isOpened():
+            self.cap.release()
+
+    def _update_frame(self) -> None:
+        target_frame_time = 1 / FPS
+        last_frame_at = 0.0
+        while self.is_running:
+            if time.perf_counter() < last_frame_at + target_frame_time:
+                time.sleep((last_frame_at + target_frame_time) - time.perf_counter())
+            ret, frame = self.cap.read()
+            last_frame_at = time.perf_counter()
+            with self.lock:
+                self.frame = (ret, frame)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        with self.lock:
+            if self.frame is not None:
+                return self.frame
+            return False, None
+
+
+def write_recording(path: Path, frames: int):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, FRAME_SIZE)
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = background.copy()
+        x = (i * 17) % (FRAME_SIZE[0] - 200)
+        cv2.rectangle(frame, (x, 400), (x + 200, 600), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+def run(feed, seconds: float) -> dict:
+    feed.start()
+    time.sleep(0.5)
+    rss_start = rss_bytes()
+    faults_start = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    rss_peak = rss_start
+    buffers = set()
+    frames = 0
+    fresh_bytes = 0
+    last = None
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ret, frame = feed.read()
+        if ret and frame is not last:
+            frames += 1
+            # A buffer we haven't seen before was allocated for this frame
+            base = frame if frame.base is None else frame.base
+            if id(base) not in buffers:
+                fresh_bytes += frame.nbytes
+                if isinstance(feed, LegacyFeed):
+                    # Legacy frames are never reused, don't keep ids of freed arrays around
+                    buffers.clear()
+                buffers.add(id(base))
+            last = frame
+        rss_peak = max(rss_peak, rss_bytes())
+        time.sleep(1 / (FPS * 4))
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults_start
+    rss_end = rss_bytes()
+    feed.release()
+    time.sleep(0.2)
+    return {
+        "frames": frames,
+        "alloc_mb_s": fresh_bytes / seconds / 1e6,
+        "faults_per_frame": faults / max(frames, 1),
+        "rss_start_mb": rss_start / 1e6,
+        "rss_end_mb": rss_end / 1e6,
+        "rss_peak_mb": rss_peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=30.0, help="run length per feed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "feed.mp4"
+        write_recording(recording, int(args.seconds * FPS) + 2 * FPS)
+        print(f"{'feed':<8}{'frames':>8}{'alloc MB/s':>12}{'faults/frame':>14}"
+              f"{'RSS start':>11}{'RSS end':>10}{'RSS peak':>10}")
+        for label, feed in (("legacy", LegacyFeed(str(recording))), ("ring", RTSPFeed.from_url(str(recording)))):
+            result = run(feed, args.seconds)
+            print(f"{label:<8}{result['frames']:>8}{result['alloc_mb_s']:>12.1f}{result['faults_per_frame']:>14.1f}"
+                  f"{result['rss_start_mb']:>9.0f}MB{result['rss_end_mb']:>8.0f}MB{result['rss_peak_mb']:>8.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
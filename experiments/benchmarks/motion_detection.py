@@ -0,0 +1,130 @@
+"""
+Per-frame cost of the subtraction tracker's motion detection at 1080p, 720p and 360p.
+
+contours: the previous pipeline - MOG2 on the full size luma frame, threshold, 5px median, findContours
+and a Python loop of contourArea / boundingRect. components: MotionDetector on the feed's motion
+output (downscaled to MOTION_SIZE) with connectedComponentsWithStats and NumPy filtering.
+Times are split into the feed's reader thread (luma conversion and resize) and the tracking loop.
+The last column is the median distance between the two pipelines' targets. MOG2 soon learns the
+inside of a flat block as background and only reports its moving edges, so in LARGEST mode the two
+often pick different blocks.
+
+Frames are a textured scene with a few blocks moving across it plus sensor noise.
+
+Run from repo root: python -m experiments.benchmarks.motion_detection --frames 200
+"""
+import argparse
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_preprocessing import FrameOutput, FramePreprocessor
+from models import TrackingMode
+from tracking.motion_detection import MIN_OBJECT_AREA, MotionDetector
+from tracking.subtraction_tracker import MOTION_OUTPUT, MOTION_SIZE
+
+RESOLUTIONS = (("1080p", (1920, 1080)), ("720p", (1280, 720)), ("360p", (640, 360)))
+WARM_UP = 20
+
+
+class Scene:
+    """Frames of blocks moving over a static textured background"""
+
+    def __init__(self, size: Tuple[int, int]):
+        self.width, self.height = size
+        rng = np.random.default_rng(0)
+        background = rng.integers(0, 255, (self.height, self.width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(background, (9, 9), 0)
+        self.noise = [rng.normal(0, 3, (self.height, self.width, 3)).astype(np.int16) for _ in range(4)]
+
+    def frame(self, i: int) -> np.ndarray:
+        frame = self.background.copy()
+        block = self.height // 8
+        for k, speed in enumerate((7, 11, 5)):
+            x = int((i * speed * self.width / 1920 + k * self.width / 3) % (self.width - block))
+            y = self.height // 4 + k * self.height // 5
+            cv2.rectangle(frame, (x, y), (x + block, y + block * 3 // 2), (40 * k, 0, 255), -1)
+        return cv2.add(frame, self.noise[i % len(self.noise)], dtype=cv2.CV_8U)
+
+
+def contours_pipeline(back_sub, gray: np.ndarray, mode: TrackingMode) -> Optional[Tuple[float, float]]:
+    """The tracker's detection before MotionDetector, on a full size frame"""
+    fg_mask = back_sub.apply(gray)
+    _, thresh = cv2.threshold(fg_mask, 200, 255, cv2.THRESH_BINARY)
+    thresh = cv2.medianBlur(thresh, 5)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    if mode == TrackingMode.LARGEST:
+        largest = max(contours, key=cv2.contourArea)
+        if cv2.contourArea(largest) > MIN_OBJECT_AREA:
+            x, y, w, h = cv2.boundingRect(largest)
+            return x + w // 2, y + h // 2
+        return None
+    centroids = []
+    for c in contours:
+        if cv2.contourArea(c) > MIN_OBJECT_AREA:
+            x, y, w, h = cv2.boundingRect(c)
+            centroids.append((x + w // 2, y + h // 2))
+    if not centroids:
+        return None
+    return int(np.mean([c[0] for c in centroids])), int(np.mean([c[1] for c in centroids]))
+
+
+def run(scene: Scene, frames: int, prepare: Callable, detect: Callable) -> Tuple[float, float, List]:
+    """Mean ms per frame in the reader thread and in the tracking loop, and each frame's target"""
+    prepare_s = detect_s = 0.0
+    targets = []
+    for i in range(frames + WARM_UP):
+        frame = scene.frame(i)
+        start = time.perf_counter()
+        prepared = prepare(frame)
+        prepared_at = time.perf_counter()
+        target = detect(prepared)
+        if i >= WARM_UP:
+            prepare_s += prepared_at - start
+            detect_s += time.perf_counter() - prepared_at
+            targets.append(target)
+    return prepare_s / frames * 1000, detect_s / frames * 1000, targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200, help="timed frames per resolution and mode")
+    args = parser.parse_args()
+
+    print(f"{'input':<7}{'mode':<9}{'pipeline':<12}{'reader':>9}{'tracker':>10}{'total':>9}{'target Δ':>11}")
+    for label, size in RESOLUTIONS:
+        scene = Scene(size)
+        preprocessor = FramePreprocessor()
+        preprocessor.add(FrameOutput(MOTION_OUTPUT, max_side=MOTION_SIZE, grayscale=True))
+        preprocessor.configure(scene.background.shape)
+        buffers = preprocessor.allocate(scene.background)
+        to_full = preprocessor.transforms[MOTION_OUTPUT]
+
+        def downscale(frame: np.ndarray) -> np.ndarray:
+            preprocessor.apply(frame, buffers)
+            return buffers[MOTION_OUTPUT]
+
+        def full_luma(frame: np.ndarray) -> np.ndarray:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        for mode in (TrackingMode.LARGEST, TrackingMode.MULTI):
+            back_sub = cv2.createBackgroundSubtractorMOG2(history=50, varThreshold=50, detectShadows=False)
+            old = run(scene, args.frames, full_luma, lambda gray: contours_pipeline(back_sub, gray, mode))
+            detector = MotionDetector()
+            new = run(scene, args.frames, downscale, lambda small: detector.detect(small, to_full, mode))
+            # How far the new target is from the old one, where both found one
+            offsets = [
+                np.hypot(b.x - a[0], b.y - a[1]) for a, b in zip(old[2], new[2]) if a is not None and b is not None
+            ]
+            offset = f"{np.median(offsets):.0f}px" if offsets else "-"
+            for pipeline, (reader_ms, tracker_ms, _) in (("contours", old), ("components", new)):
+                print(f"{label:<7}{mode.value:<9}{pipeline:<12}{reader_ms:>7.2f}ms{tracker_ms:>8.2f}ms"
+                      f"{reader_ms + tracker_ms:>7.2f}ms{offset if pipeline == 'components' else '':>11}")
+
+
+if __name__ == '__main__':
+    main()
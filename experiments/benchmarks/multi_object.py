@@ -0,0 +1,130 @@
+"""
+Per-frame cost and quality of tracking.multi_object with a rink full of players.
+
+Players skate smooth random paths over a 1080p frame and are detected with box noise, a share of
+missed detections and a few false ones per frame. Reported for IoU and distance costs: milliseconds
+per update, the share of true players covered by a confirmed track, id switches (a player's track id
+changing from one frame to the next) per 100 player-frames and the jitter of the MULTI target (mean
+frame to frame movement of the average center beyond the players' own) from raw detections and from
+the tracks.
+
+scipy's linear_sum_assignment is used when installed, NumPy's shortest augmenting path otherwise.
+
+Run from repo root: python -m experiments.benchmarks.multi_object --frames 300
+"""
+import argparse
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from tracking import multi_object
+from tracking.multi_object import AssignmentCost, MultiObjectTracker, iou_matrix
+
+FRAME = (1920, 1080)
+FPS = 20
+COUNTS = (10, 30, 40, 60)
+MISS_RATE = 0.1
+FALSE_PER_FRAME = 2
+BOX_NOISE = 0.05  # of the box size
+
+
+class Rink:
+    """Players' true boxes, and noisy detections of them"""
+
+    def __init__(self, count: int, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.position = self.rng.uniform((100, 100), (FRAME[0] - 100, FRAME[1] - 100), (count, 2))
+        self.velocity = self.rng.normal(0, 150, (count, 2))  # pixels per second
+        self.size = self.rng.uniform((30, 60), (50, 110), (count, 2))  # farther players are smaller
+
+    def step(self):
+        dt = 1 / FPS
+        self.velocity += self.rng.normal(0, 300 * np.sqrt(dt), self.velocity.shape)
+        np.clip(self.velocity, -400, 400, out=self.velocity)
+        self.position += self.velocity * dt
+        # Bounce off the boards
+        low, high = self.position < 50, self.position > np.array(FRAME) - 50
+        self.velocity[low | high] *= -1
+        np.clip(self.position, 50, np.array(FRAME) - 50, out=self.position)
+
+    def truth(self) -> np.ndarray:
+        return np.hstack([self.position - self.size / 2, self.position + self.size / 2])
+
+    def detections(self) -> np.ndarray:
+        truth = self.truth()
+        size = np.hstack([self.size, self.size])
+        detected = truth + self.rng.normal(0, BOX_NOISE, truth.shape) * size
+        detected = detected[self.rng.random(len(truth)) > MISS_RATE]
+        corners = self.rng.uniform((0, 0), FRAME, (FALSE_PER_FRAME, 2))
+        false = np.hstack([corners, corners + self.rng.uniform(30, 80, (FALSE_PER_FRAME, 2))])
+        return self.rng.permutation(np.vstack([detected, false]))
+
+
+def mean_center(boxes: np.ndarray) -> np.ndarray:
+    return ((boxes[:, :2] + boxes[:, 2:]) / 2).mean(axis=0)
+
+
+def run(count: int, cost: AssignmentCost, frames: int) -> Tuple[float, float, float, float, float]:
+    """ms per update, % of players tracked, id switches per 100 player-frames, raw and tracked target jitter"""
+    rink = Rink(count)
+    tracker = MultiObjectTracker(cost)
+    previous_ids: Dict[int, int] = {}
+    seconds = tracked = switches = matched_frames = 0.0
+    raw_jitter, tracked_jitter = [], []
+    previous_raw = previous_tracked = previous_truth = None
+    for i in range(frames):
+        rink.step()
+        detections = rink.detections()
+        start = time.perf_counter()
+        tracks = tracker.update(detections, i / FPS)
+        seconds += time.perf_counter() - start
+
+        truth = rink.truth()
+        if len(tracks):
+            overlap = iou_matrix(truth, tracks.boxes)
+            best = overlap.argmax(axis=1)
+            covered = overlap[np.arange(count), best] > 0.3
+            tracked += covered.sum()
+            for player in np.flatnonzero(covered):
+                track_id = int(tracks.ids[best[player]])
+                if player in previous_ids:
+                    matched_frames += 1
+                    switches += previous_ids[player] != track_id
+                previous_ids[player] = track_id
+
+        # Target movement the players' own movement doesn't explain
+        true_center = mean_center(truth)
+        raw = mean_center(detections)
+        target = mean_center(tracks.boxes) if len(tracks) else None
+        if previous_truth is not None:
+            true_step = true_center - previous_truth
+            raw_jitter.append(np.hypot(*(raw - previous_raw - true_step)))
+            if target is not None and previous_tracked is not None:
+                tracked_jitter.append(np.hypot(*(target - previous_tracked - true_step)))
+        previous_truth, previous_raw, previous_tracked = true_center, raw, target
+    return (
+        seconds / frames * 1000,
+        tracked / (frames * count) * 100,
+        switches / max(matched_frames, 1) * 100,
+        float(np.mean(raw_jitter)),
+        float(np.mean(tracked_jitter)) if tracked_jitter else float("nan"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300, help="frames per player count and cost")
+    args = parser.parse_args()
+
+    print(f"assignment: {'numpy' if multi_object.linear_sum_assignment is None else 'scipy'}")
+    print(f"{'players':<9}{'cost':<10}{'update':>9}{'tracked':>9}{'switches':>10}{'raw jitter':>12}{'jitter':>9}")
+    for count in COUNTS:
+        for cost in AssignmentCost:
+            ms, tracked, switches, raw_jitter, jitter = run(count, cost, args.frames)
+            print(f"{count:<9}{cost.value:<10}{ms:>7.2f}ms{tracked:>8.1f}%{switches:>10.2f}"
+                  f"{raw_jitter:>10.1f}px{jitter:>7.1f}px")
+
+
+if __name__ == '__main__':
+    main()
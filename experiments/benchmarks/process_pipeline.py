@@ -0,0 +1,146 @@
+"""
+Detection throughput and latency of the single-process tracker layout against ProcessPipeline.
+
+threads: RTSPFeed's reader thread plus a tracking thread that detects on each new frame, as the YOLO
+tracker runs today. processes: ProcessPipeline, decoding and detecting in two child processes with
+frames passed through shared memory. Both run alongside a 50Hz control loop thread in this process.
+
+The detector is a stand-in with YOLO's split of work: OpenCV filtering (releases the GIL) followed by
+pure Python box post-processing (holds it). The source is a synthetic 1080p recording. Reported:
+detections per second, median and p95 capture to result latency, and the control loop's p95 lateness.
+
+Run from repo root: python -m experiments.benchmarks.process_pipeline --seconds 15
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from experiments.benchmarks.feed_ring_buffer import write_recording
+from frame_preprocessing import FrameOutput
+from process_pipeline import ProcessPipeline
+from rtsp_feed import RTSPFeed
+
+SOURCE_FPS = 30
+DETECT_OUTPUT = FrameOutput("detect", max_side=640)
+CANDIDATES = 300  # boxes the stand-in post-processes in Python per frame
+CONTROL_INTERVAL = 0.02
+
+
+class StandInDetector:
+    """image -> (boxes, confidences) of its brightest blobs, with YOLO-like Python post-processing"""
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        for _ in range(4):
+            gray = cv2.GaussianBlur(gray, (15, 15), 0)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(thresh)
+        rng = np.random.default_rng(int(gray[0, 0]))
+        candidates = [tuple(box) for box in (rng.random((CANDIDATES, 4)) * 640).tolist()]
+        kept = []
+        # Greedy NMS in plain Python, the GIL-bound part
+        for box in candidates:
+            if all(self._iou(box, other) < 0.4 for other in kept[:20]):
+                kept.append(box)
+        boxes = np.array([(x, y, x + w, y + h) for x, y, w, h, _ in stats[1:6]], dtype=np.float32).reshape(-1, 4)
+        return boxes, np.ones(len(boxes), dtype=np.float32)
+
+    @staticmethod
+    def _iou(a, b) -> float:
+        x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+        x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+        inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+        return inter / (a[2] * a[3] + b[2] * b[3] - inter + 1e-9)
+
+
+def control_loop(stop: threading.Event, lateness: List[float]):
+    """Stands in for the camera control thread - a little Python work on a fixed period"""
+    next_due = time.perf_counter() + CONTROL_INTERVAL
+    while not stop.is_set():
+        time.sleep(max(0.0, next_due - time.perf_counter()))
+        lateness.append(time.perf_counter() - next_due)
+        sum(i * i for i in range(2000))
+        next_due += CONTROL_INTERVAL
+
+
+def run_threads(recording: str, seconds: float) -> Tuple[List[float], List[float]]:
+    feed = RTSPFeed.from_url(recording, max_fps=SOURCE_FPS)
+    feed.add_output(DETECT_OUTPUT)
+    detect = StandInDetector()
+    feed.start()
+    feed.wait_next(timeout=5.0)
+    return measure(seconds, lambda after_seq: _detect_next(feed, detect, after_seq), feed.release)
+
+
+def _detect_next(feed: RTSPFeed, detect: StandInDetector, after_seq: int):
+    frame = feed.wait_next(after_seq, timeout=2.0)
+    if frame is None:
+        return None
+    detect(frame.output(DETECT_OUTPUT.name))
+    return frame.seq, frame.captured_at
+
+
+def run_processes(recording: str, seconds: float) -> Tuple[List[float], List[float]]:
+    pipeline = ProcessPipeline(recording, StandInDetector, DETECT_OUTPUT, max_fps=SOURCE_FPS)
+    pipeline.start()
+    pipeline.wait_next(timeout=30.0)
+
+    def next_detections(after_seq: int):
+        detections = pipeline.wait_next(after_seq, timeout=2.0)
+        return None if detections is None else (detections.seq, detections.captured_at)
+
+    return measure(seconds, next_detections, pipeline.release)
+
+
+def measure(seconds: float, next_detections, release) -> Tuple[List[float], List[float]]:
+    """Capture to result latency of each detection, control loop lateness"""
+    stop = threading.Event()
+    lateness = []
+    control = threading.Thread(target=control_loop, args=(stop, lateness))
+    control.start()
+    latencies = []
+    last_seq = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        result = next_detections(last_seq)
+        if result is None:
+            break
+        last_seq, captured_at = result
+        latencies.append(time.perf_counter() - captured_at)
+    stop.set()
+    control.join()
+    release()
+    return latencies, lateness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=15.0, help="run length per mode")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores")
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "feed.mp4"
+        write_recording(recording, int((args.seconds + 10) * SOURCE_FPS))
+        print(f"{'mode':<11}{'det/s':>7}{'median':>10}{'p95':>10}{'control p95 late':>18}")
+        for label, run in (("threads", run_threads), ("processes", run_processes)):
+            latencies, lateness = run(str(recording), args.seconds)
+            if not latencies:
+                print(f"{label:<11}no detections")
+                continue
+            latencies.sort()
+            lateness.sort()
+            print(f"{label:<11}{len(latencies) / args.seconds:>7.1f}{latencies[len(latencies) // 2] * 1000:>8.0f}ms"
+                  f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.0f}ms"
+                  f"{lateness[int(len(lateness) * 0.95)] * 1000:>16.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
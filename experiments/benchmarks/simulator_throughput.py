@@ -0,0 +1,78 @@
+"""
+Controller throughput and tracker convergence against the camera simulator at different network conditions.
+
+Throughput: move_pan calls per second, back to back.
+Convergence: a synthetic target sits off-centre; a 20Hz loop applying the yolo tracker's pan gains and
+dead zone steers the simulated head until the target stays inside the dead zone.
+
+Run from repo root: python -m experiments.benchmarks.simulator_throughput
+"""
+import time
+
+from cam_controller import PTZController
+from experiments.camera_simulator import CameraSimulator
+
+THROUGHPUT_SECONDS = 2.0
+CONDITIONS = (
+    ("local", 0.0, 0.0, 0.0),
+    ("lan 5ms +-2ms", 0.005, 0.004, 0.0),
+    ("wifi 20ms +-15ms", 0.02, 0.03, 0.0),
+    ("lossy 20ms 5% errors", 0.02, 0.01, 0.05),
+)
+
+# Synthetic optics - pan units visible across the frame width at the current zoom
+FRAME_WIDTH_PX = 1920
+FRAME_WIDTH_PAN_UNITS = 0x4000
+TARGET_PAN = 0xA400
+PAN_SENSITIVITY = 0.03
+PAN_DEAD_ZONE = 125
+LOOP_INTERVAL = 0.05
+CONVERGENCE_TIMEOUT = 20.0
+
+
+def measure_throughput(controller: PTZController) -> float:
+    sent = 0
+    deadline = time.perf_counter() + THROUGHPUT_SECONDS
+    while time.perf_counter() < deadline:
+        controller.move_pan(1 if sent % 2 == 0 else -1, 1.0)
+        sent += 1
+    return sent / THROUGHPUT_SECONDS
+
+
+def measure_convergence(simulator: CameraSimulator, controller: PTZController) -> float:
+    """Seconds until the target has been inside the dead zone for 5 consecutive loops, inf if never"""
+    simulator.head.move_to(0x8000, 0x8000, 0x1D)
+    time.sleep(1.0)
+    controller.refresh_position()
+    start = time.perf_counter()
+    settled_loops = 0
+    while time.perf_counter() - start < CONVERGENCE_TIMEOUT:
+        # What the video would show - the head's true position, not the controller's model
+        delta_px = (TARGET_PAN - simulator.head.position().pan) / FRAME_WIDTH_PAN_UNITS * FRAME_WIDTH_PX
+        if abs(delta_px) > PAN_DEAD_ZONE:
+            settled_loops = 0
+            controller.move_pan(1 if delta_px > 0 else -1, abs(delta_px) * PAN_SENSITIVITY)
+        else:
+            settled_loops += 1
+            if settled_loops >= 5:
+                return time.perf_counter() - start - 5 * LOOP_INTERVAL
+        time.sleep(LOOP_INTERVAL)
+    return float("inf")
+
+
+def main():
+    print(f"{'condition':<24}{'reconcile':>10}{'moves/s':>10}{'converged in':>14}")
+    for label, latency, jitter, error_rate in CONDITIONS:
+        for reconcile_interval in (0.0, 1.0):
+            with CameraSimulator(latency=latency, jitter=jitter, error_rate=error_rate, seed=0) as simulator:
+                controller = PTZController(simulator.address, reconcile_interval=reconcile_interval)
+                controller.check_connection()
+                controller.refresh_position()
+                throughput = measure_throughput(controller)
+                convergence = measure_convergence(simulator, controller)
+                controller.close()
+            print(f"{label:<24}{reconcile_interval:>9.1f}s{throughput:>10.1f}{convergence:>13.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+CPU cost of the subtraction tracker's loop while tracking and while it has nothing to do.
+
+The real tracking.subtraction_tracker.MotionTracker runs against a synthetic recording (a block moving
+across a static 720p scene) played in real time, with a controller that only counts commands.
+Phases: step moves (each move starts a cooldown), velocity control (no cooldown) and a stalled feed
+(no new frames). Reported per phase: loop passes and frames per second, loop thread CPU per processed
+frame and the whole process's CPU load, decoding included (1.0 = one core busy).
+
+Run from repo root: python -m experiments.benchmarks.tracker_idle --seconds 5
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from file_feed import PlaybackMode, VideoFileFeed
+from models import TrackingMode
+from tracking.subtraction_tracker import MotionTracker
+
+FPS = 20
+FRAME_SIZE = (1280, 720)
+
+
+class CountingController:
+    """Accepts any controller command and counts it"""
+    commands: int = 0
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands += 1
+        return command
+
+
+def write_recording(path: Path, frames: int):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, FRAME_SIZE)
+    background = cv2.GaussianBlur(
+        np.random.default_rng(0).integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8), (9, 9), 0
+    )
+    for i in range(frames):
+        frame = background.copy()
+        x = 100 + (i * 9) % (FRAME_SIZE[0] - 400)
+        cv2.rectangle(frame, (x, 250), (x + 160, 450), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def measure(tracker: MotionTracker, seconds: float) -> dict:
+    stats_start, cpu_start, wall_start = tracker.loop_stats(), time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    stats = tracker.loop_stats().since(stats_start)
+    return {
+        "passes_s": stats.iterations_per_s,
+        "frames_s": stats.frames_per_s,
+        "cpu_frame_ms": stats.cpu_per_frame_s * 1000,
+        "process_cores": (time.process_time() - cpu_start) / (time.perf_counter() - wall_start),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each phase")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "scene.mp4"
+        write_recording(recording, int(args.seconds * 2 * FPS) + 4 * FPS)
+        controller = CountingController()
+        feed = VideoFileFeed(recording, mode=PlaybackMode.REALTIME)
+        tracker = MotionTracker(feed, TrackingMode.LARGEST, controller)
+        tracker.start_tracking()
+        time.sleep(1.5)  # configure, initial cooldown, background model warm up
+
+        print(f"{'phase':<10}{'passes/s':>10}{'frames/s':>10}{'CPU/frame':>12}{'process':>10}")
+        results = {"steps": measure(tracker, args.seconds)}
+        tracker.velocity_control = True
+        results["velocity"] = measure(tracker, args.seconds)
+        # No steps are ever given, so the feed goes quiet without stopping, like a stalled camera
+        feed.mode = PlaybackMode.STEPPED
+        results["stalled"] = measure(tracker, args.seconds)
+        for phase, result in results.items():
+            print(f"{phase:<10}{result['passes_s']:>10.1f}{result['frames_s']:>10.1f}"
+                  f"{result['cpu_frame_ms']:>10.2f}ms{result['process_cores']:>10.3f}")
+        print(f"{controller.commands} commands sent")
+        tracker.stop_tracking()
+        feed.release()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Throughput and latency of the YOLO tracker's stages against the serial loop it replaced.
+
+serial: one thread waits for a frame, detects, updates the tracks and sends the camera commands
+before waiting for the next frame, as the tracker did before it was split into stages. staged: the
+real tracking.yolo_tracker.MotionTracker, with detection and camera control on their own threads
+joined by a latest-value queue.
+
+The source is a synthetic 1080p recording played in real time, the detector the process_pipeline
+benchmark's YOLO stand-in and the camera a controller whose every command blocks for --round-trip
+seconds like PTZController's HTTP requests. Reported per stage: frames out per second, frames replaced
+before the next stage took them, mean latency from capture as the frame leaves the stage and thread
+CPU per frame; then the camera commands sent per second.
+
+Run from repo root: python -m experiments.benchmarks.yolo_pipeline --seconds 10
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from experiments.benchmarks.feed_ring_buffer import write_recording
+from experiments.benchmarks.process_pipeline import StandInDetector
+from file_feed import PlaybackMode, VideoFileFeed
+from models import TrackingMode
+from tracking.loop_stats import LoopMeter, LoopStats
+from tracking.yolo_tracker import CAPTURE_STAGE, CONTROL_STAGE, INFERENCE_STAGE, MotionTracker
+
+FPS = 20  # feed_ring_buffer's recording
+WARM_UP = 2.0
+
+
+class BlockingController:
+    """Accepts any controller command, blocking for a camera round trip"""
+    commands: int = 0
+
+    def __init__(self, round_trip: float):
+        self.round_trip = round_trip
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            time.sleep(self.round_trip)
+            self.commands += 1
+        return command
+
+
+def run_serial(
+    tracker: MotionTracker, controller: BlockingController, seconds: float
+) -> Tuple[Dict[str, LoopStats], float]:
+    """The tracking loop before it was split into stages, on the tracker's own detection and control code"""
+    tracker._configure_tracking()
+    meter = LoopMeter()
+    start = None
+    commands = 0
+    last_seq = 0
+    deadline = time.perf_counter() + WARM_UP + seconds
+    while time.perf_counter() < deadline:
+        if start is None and time.perf_counter() > deadline - seconds:
+            start, commands = meter.snapshot(), controller.commands
+        meter.pass_started()
+        tracked = tracker._next_tracks(last_seq)
+        if tracked is None:
+            continue
+        if last_seq:
+            meter.frames_dropped(tracked.seq - last_seq - 1)
+        last_seq = tracked.seq
+        tracker._steer(tracked.tracks)
+        meter.frame_processed(tracked.age())
+    meter.pass_started()
+    return {"loop": meter.snapshot().since(start)}, (controller.commands - commands) / seconds
+
+
+def run_staged(
+    tracker: MotionTracker, controller: BlockingController, seconds: float
+) -> Tuple[Dict[str, LoopStats], float]:
+    tracker.start_tracking()
+    time.sleep(WARM_UP)
+    start, commands = tracker.stage_stats(), controller.commands
+    time.sleep(seconds)
+    end, commands = tracker.stage_stats(), controller.commands - commands
+    tracker.stop_tracking()
+    stages = (CAPTURE_STAGE, INFERENCE_STAGE, CONTROL_STAGE)
+    return {stage: end[stage].since(start[stage]) for stage in stages}, commands / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured run length per layout")
+    parser.add_argument("--round-trip", type=float, default=0.08, help="seconds each camera command blocks")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = Path(tmp) / "feed.mp4"
+        write_recording(recording, 10 * FPS)
+        print(f"{'layout':<8}{'stage':<11}{'frames/s':>9}{'dropped/s':>11}{'latency':>10}{'CPU/frame':>11}"
+              f"{'commands/s':>12}")
+        for layout, run in (("serial", run_serial), ("staged", run_staged)):
+            controller = BlockingController(args.round_trip)
+            feed = VideoFileFeed(recording, mode=PlaybackMode.REALTIME, loop=True)
+            tracker = MotionTracker(feed, TrackingMode.MULTI, controller, detector_factory=StandInDetector)
+            stats, commands = run(tracker, controller, args.seconds)
+            for i, (stage, stage_stats) in enumerate(stats.items()):
+                cpu = f"{stage_stats.cpu_per_frame_s * 1000:.2f}ms" if stage_stats.cpu_s else "-"
+                print(f"{layout if i == 0 else '':<8}{stage:<11}{stage_stats.frames_per_s:>9.1f}"
+                      f"{stage_stats.dropped_per_s:>11.1f}{stage_stats.latency_per_frame_s * 1000:>8.0f}ms{cpu:>11}"
+                      f"{f'{commands:.1f}' if i == len(stats) - 1 else '':>12}")
+            feed.release()
+
+
+if __name__ == '__main__':
+    main()
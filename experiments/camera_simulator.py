@@ -0,0 +1,272 @@
+"""
+Local stand-in for a Panasonic aw_ptz CGI camera, for load testing PTZController without hardware.
+Implements the commands the controller uses:
+#APS absolute pan/tilt move, #APC pan/tilt query, #AXZ absolute zoom, #GZ zoom query, #Z zoom speed,
+#PTS pan/tilt speed
+and /cgi-bin/getinfo for the connection check.
+
+Pan/tilt/zoom travel towards their targets at a finite speed, so queries made mid-move return
+intermediate positions. Latency, jitter and error rate can be injected per request, and stall()
+makes the camera accept connections but stop answering until resume().
+
+Run from repo root: python -m experiments.camera_simulator --port 8080 --latency 0.02 --jitter 0.01
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import ptz_codec
+from models import PTZPosition
+
+COMMAND_TYPES = ("APS", "APC", "AXZ", "PTS", "GZ", "Z")
+
+
+class SimulatedHead:
+    """Pan/tilt/zoom state that moves towards its targets at a fixed rate"""
+    pan_speed: float  # position units per second at full APS speed
+    tilt_speed: float
+    zoom_speed: float  # position units per second at full Z speed / for AXZ moves
+
+    def __init__(self, pan_speed: float = 0x6000, tilt_speed: float = 0x4000, zoom_speed: float = 0x800):
+        self.pan_speed = pan_speed
+        self.tilt_speed = tilt_speed
+        self.zoom_speed = zoom_speed
+        self._lock = threading.Lock()
+        self._pan = self._target_pan = 0x8000
+        self._tilt = self._target_tilt = 0x8000
+        self._zoom = self._target_zoom = float(ptz_codec.ZOOM_MIN)
+        self._pt_rate = 1.0
+        self._pan_velocity = 0.0  # units per second while a PTS speed command is active
+        self._tilt_velocity = 0.0
+        self._zoom_velocity = 0.0  # units per second while a Z speed command is active
+        self._updated_at = time.perf_counter()
+
+    @staticmethod
+    def _approach(current: float, target: float, max_step: float) -> float:
+        if abs(target - current) <= max_step:
+            return target
+        return current + max_step if target > current else current - max_step
+
+    def _advance(self):
+        now = time.perf_counter()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self._pan_velocity or self._tilt_velocity:
+            self._pan = ptz_codec.clamp_pan_tilt(self._pan + self._pan_velocity * elapsed)
+            self._tilt = ptz_codec.clamp_pan_tilt(self._tilt + self._tilt_velocity * elapsed)
+            self._target_pan, self._target_tilt = self._pan, self._tilt
+        else:
+            self._pan = self._approach(self._pan, self._target_pan, self.pan_speed * self._pt_rate * elapsed)
+            self._tilt = self._approach(self._tilt, self._target_tilt, self.tilt_speed * self._pt_rate * elapsed)
+        if self._zoom_velocity:
+            self._zoom = min(max(self._zoom + self._zoom_velocity * elapsed, ptz_codec.ZOOM_MIN), ptz_codec.ZOOM_MAX)
+            self._target_zoom = self._zoom
+        else:
+            self._zoom = self._approach(self._zoom, self._target_zoom, self.zoom_speed * elapsed)
+
+    def position(self) -> PTZPosition:
+        with self._lock:
+            self._advance()
+            return PTZPosition(int(self._pan), int(self._tilt), int(self._zoom))
+
+    def move_to(self, pan: int, tilt: int, speed: int):
+        with self._lock:
+            self._advance()
+            self._pan_velocity = self._tilt_velocity = 0.0
+            self._target_pan = ptz_codec.clamp_pan_tilt(pan)
+            self._target_tilt = ptz_codec.clamp_pan_tilt(tilt)
+            self._pt_rate = max(1, min(speed, ptz_codec.PT_SPEED_MAX)) / ptz_codec.PT_SPEED_MAX
+
+    def move_at(self, pan_speed: int, tilt_speed: int):
+        """PTS command speeds: 50 stop, pan below 50 left (increasing), tilt below 50 down (increasing)"""
+        with self._lock:
+            self._advance()
+            self._pan_velocity = (50 - pan_speed) / 49 * self.pan_speed
+            self._tilt_velocity = (50 - tilt_speed) / 49 * self.tilt_speed
+
+    def zoom_to(self, zoom: int):
+        with self._lock:
+            self._advance()
+            self._zoom_velocity = 0.0
+            self._target_zoom = ptz_codec.clamp_zoom(zoom)
+
+    def zoom_at(self, speed: int):
+        """Z command speed: 01 fastest wide, 50 stop, 99 fastest tele"""
+        with self._lock:
+            self._advance()
+            self._zoom_velocity = (speed - 50) / 49 * self.zoom_speed
+
+
+class CameraSimulator:
+    """
+    Threaded HTTP server speaking the aw_ptz CGI protocol
+    :latency: seconds added to every response
+    :jitter: max extra seconds, uniformly distributed, added on top of latency
+    :error_rate: fraction of requests answered with HTTP 503
+    """
+    head: SimulatedHead
+    latency: float
+    jitter: float
+    error_rate: float
+    request_counts: Counter
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        head: Optional[SimulatedHead] = None,
+        seed: Optional[int] = None,
+    ):
+        self.head = head if head is not None else SimulatedHead()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.request_counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._responsive = threading.Event()
+        self._responsive.set()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """host:port, as passed to PTZController"""
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.address
+
+    def stop(self):
+        self.resume()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "CameraSimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stall(self):
+        """Hold every request without answering, like a hung CGI handler"""
+        self._responsive.clear()
+
+    def resume(self):
+        self._responsive.set()
+
+    def _response_delay(self) -> Tuple[float, bool]:
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        return delay, failed
+
+    def handle_command(self, cmd: str) -> Optional[str]:
+        """Apply an aw_ptz command (without the leading #) and return the response body, None if unknown"""
+        command_type = next((prefix for prefix in COMMAND_TYPES if cmd.startswith(prefix)), cmd)
+        with self._lock:
+            self.request_counts[command_type] += 1
+        if cmd == "APC":
+            position = self.head.position()
+            return f"aPC{position.pan:04X}{position.tilt:04X}"
+        if cmd == "GZ":
+            return f"gz{self.head.position().zoom:03X}"
+        try:
+            if cmd.startswith("APS"):
+                pan, tilt = ptz_codec.decode_pan_tilt(cmd)
+                self.head.move_to(pan, tilt, int(cmd[11:13], 16))
+                return f"aPS{cmd[3:]}"
+            if cmd.startswith("AXZ"):
+                self.head.zoom_to(ptz_codec.decode_zoom(cmd))
+                return f"axz{cmd[3:]}"
+        except ValueError:
+            return None
+        if cmd.startswith("PTS") and len(cmd) == 7 and cmd[3:].isdigit():
+            self.head.move_at(int(cmd[3:5]), int(cmd[5:]))
+            return f"pTS{cmd[3:]}"
+        if cmd.startswith("Z") and len(cmd) == 3 and cmd[1:].isdigit():
+            self.head.zoom_at(int(cmd[1:]))
+            return f"zS{cmd[1:]}"
+        return None
+
+    def _make_handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                simulator._responsive.wait()
+                delay, failed = simulator._response_delay()
+                if delay:
+                    time.sleep(delay)
+                url = urlparse(self.path)
+                if failed:
+                    self._reply(503, "Service Unavailable")
+                elif url.path == "/cgi-bin/getinfo":
+                    self._reply(200, "OUI=0x0080F0\r\nMODEL=SIMULATOR")
+                elif url.path == "/cgi-bin/aw_ptz":
+                    cmd = parse_qs(url.query).get("cmd", [""])[0].lstrip("#")
+                    body = simulator.handle_command(cmd)
+                    self._reply(200, body if body is not None else "er1")
+                else:
+                    self._reply(404, "Not Found")
+
+            def _reply(self, status: int, body: str):
+                payload = body.encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/plain")
+                    self.send_header("Content-Length", str(len(payload)))
+                    if self.close_connection:
+                        self.send_header("Connection", "close")
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up waiting, e.g. timed out during a stall
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated aw_ptz camera")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random extra seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    simulator = CameraSimulator(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Simulated camera listening on {simulator.start()}")
+    try:
+        while True:
+            time.sleep(5)
+            counts: Dict[str, int] = dict(simulator.request_counts)
+            print(f"{simulator.head.position()} requests={counts}")
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Export fine-tuned weights for the tracker's ONNX Runtime and OpenVINO detector backends.
+
+The weights are installed as the tracker's tracking/yolo_weights.pt and exported next to it, where
+tracking.detector_backends.player_detector looks for them.
+
+Run from repo root: python -m experiments.yolo_finetune.export runs/detect/ice_hockey_detector/weights/best.pt
+"""
+import argparse
+import shutil
+from pathlib import Path
+from typing import List
+
+from tracking.detector_backends import WEIGHTS_PATH, DetectorBackend, export_weights
+
+
+def export(weights: Path, backends: List[DetectorBackend]):
+    if weights.resolve() != WEIGHTS_PATH.resolve():
+        shutil.copyfile(weights, WEIGHTS_PATH)
+        print(f"Installed {weights} as {WEIGHTS_PATH}")
+    for backend, path in export_weights(WEIGHTS_PATH, backends).items():
+        print(f"Exported {backend.value}: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("weights", type=Path, nargs="?", default=WEIGHTS_PATH, help="fine-tuned .pt weights")
+    parser.add_argument(
+        "--backends", nargs="+", default=[DetectorBackend.ONNX.value, DetectorBackend.OPENVINO.value],
+        choices=[DetectorBackend.ONNX.value, DetectorBackend.OPENVINO.value], help="exports to make",
+    )
+    args = parser.parse_args()
+    export(args.weights, [DetectorBackend(backend) for backend in args.backends])
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,8 @@ def finetune():
     )
     print("Training Complete")
     print(f"Results saved to: {model.trainer.save_dir}")
+    print(f"Export for the tracker with: python -m experiments.yolo_finetune.export "
+          f"{Path(model.trainer.save_dir).joinpath('weights', 'best.pt')}")
 
     metrics = model.val()
     print(f"Validation metrics: {metrics}")
@@ -6,6 +6,8 @@ import cv2
 import numpy as np
 from ultralytics import YOLO
 
+from file_feed import PlaybackMode, VideoFileFeed
+
 # MODEL_PATH = Path(__file__).parent.joinpath("yolo11n.pt")
 # MODEL_PATH = Path(__file__).parent.joinpath("fine-tuned-70-epoch-850-images.pt")
 MODEL_PATH = Path(__file__).parent.joinpath("fine-tuned-200-epoch-1000-images.pt")
@@ -47,23 +49,29 @@ def main():
     class_names = detector.names
     target_class_id = [k for k, v in class_names.items() if v == "player"][0]
 
-    cap = cv2.VideoCapture(str(TEST_VIDEO_PATH))
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # Every frame in turn, as fast as detection allows
+    feed = VideoFileFeed(TEST_VIDEO_PATH, mode=PlaybackMode.MAX_SPEED)
+    frame_width = int(feed.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(feed.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     frame_center_x = frame_width / 2
     frame_center_y = frame_height / 2
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = feed.fps
 
     print(f"Processing video: ({frame_width}x{frame_height} @ {fps:.2f} FPS)")
 
     frame_count = 0
+    last_seq = 0
+    feed.start()
 
     while True:
         start_time = time.perf_counter()
-        ret, frame = cap.read()
-        if not ret:
+        feed_frame = feed.wait_next(last_seq)
+        if feed_frame is None:
             print("End of video stream or error reading frame.")
             break
+        last_seq = feed_frame.seq
+        # Feed frames are read-only views of its ring, draw on a copy
+        frame = feed_frame.image.copy()
         frame_count += 1
 
         results = detector(frame, conf=0.8, iou=0.4, verbose=False)
@@ -162,6 +170,8 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord("q"):
             break
 
+    feed.release()
+
 
 if __name__ == '__main__':
     main()
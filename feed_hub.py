@@ -0,0 +1,285 @@
+"""
+One decoder per stream, shared by any number of consumers. FeedHub keeps a single RTSPFeed per URL,
+opened by the first subscriber and released with the last one. Each FeedSubscription applies its own
+frame rate limit and drop policy to the frames that feed decodes.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from frame_preprocessing import FrameOutput
+from rtsp_feed import FeedFrame, FeedHealth, RTSPFeed
+
+# Decode rate of a shared feed when none of its subscribers asks for more
+DEFAULT_FEED_FPS = 20.0
+
+
+class DropPolicy(str, Enum):
+    LATEST = "latest"  # only the newest frame is kept, as a view into the feed's ring - no copy
+    QUEUE = "queue"  # every frame is copied into a bounded queue, the oldest dropped once it is full
+
+
+class FeedSubscription:
+    """
+    A consumer's handle on a shared feed. It has RTSPFeed's consumer interface (add_output, start,
+    read_frame, wait_next, is_running, release...) so trackers take either.
+
+    Frames are offered from the feed's reader thread and skipped until 1 / max_fps has passed since the
+    last one taken, max_fps None takes every decoded frame. With DropPolicy.LATEST frames are views into
+    the feed's ring like RTSPFeed.read_frame, valid until ring_size - 1 newer frames are decoded at the
+    feed's rate, which the fastest subscriber sets. DropPolicy.QUEUE is for consumers that must see every
+    frame they can keep up with, e.g. a recorder: frames are copied into queue_size + 1 preallocated
+    slots and stay valid until queue_size newer frames have been queued.
+    """
+    url: str
+    max_fps: Optional[float]
+    drop_policy: DropPolicy
+    queue_size: int
+    frames_delivered: int
+    frames_skipped: int  # over the rate limit
+    frames_dropped: int  # replaced by a newer frame, or pushed out of a full queue, before being taken
+    _hub: "FeedHub"
+    _feed: RTSPFeed
+    _new_frame: threading.Condition
+    _latest: Optional[FeedFrame]
+    _taken_seq: int
+    _queue: Deque[FeedFrame]
+    _slots: List[Dict[Optional[str], Tuple[np.ndarray, np.ndarray]]]
+    _next_slot: int
+    _next_due: float
+    _closed: bool
+
+    def __init__(
+        self,
+        hub: "FeedHub",
+        feed: RTSPFeed,
+        url: str,
+        max_fps: Optional[float],
+        drop_policy: DropPolicy,
+        queue_size: int,
+    ):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.url = url
+        self.max_fps = max_fps
+        self.drop_policy = drop_policy
+        self.queue_size = queue_size
+        self.frames_delivered = 0
+        self.frames_skipped = 0
+        self.frames_dropped = 0
+        self._hub = hub
+        self._feed = feed
+        self._new_frame = threading.Condition()
+        self._latest = None
+        self._taken_seq = 0
+        self._queue = deque()
+        self._slots = [{} for _ in range(queue_size + 1)] if drop_policy is DropPolicy.QUEUE else []
+        self._next_slot = 0
+        self._next_due = 0.0
+        self._closed = False
+
+    @property
+    def is_running(self) -> bool:
+        return not self._closed and self._feed.is_running
+
+    @property
+    def stale_after(self) -> float:
+        return self._feed.stale_after
+
+    def add_output(self, output: FrameOutput) -> None:
+        """Outputs are shared by name between the feed's subscribers and live as long as the feed"""
+        self._hub._add_output(self, output)
+
+    def start(self) -> None:
+        """Starts the shared feed's decoder if no other subscriber has"""
+        self._hub._start(self)
+
+    def release(self) -> None:
+        """Unsubscribe, the feed is released with its last subscriber"""
+        self._hub._release(self)
+
+    def _close(self):
+        with self._new_frame:
+            self._closed = True
+            self._new_frame.notify_all()
+
+    def _offer(self, frame: FeedFrame):
+        """Feed listener, runs in the reader thread"""
+        if self.max_fps:
+            interval = 1 / self.max_fps
+            if frame.captured_at < self._next_due:
+                self.frames_skipped += 1
+                return
+            # Keep to the average rate over a jittery stream, without bursting to catch up after a gap
+            self._next_due = max(self._next_due, frame.captured_at - interval) + interval
+        if self.drop_policy is DropPolicy.QUEUE:
+            frame = self._copy(frame)
+        with self._new_frame:
+            if self.drop_policy is DropPolicy.QUEUE:
+                if len(self._queue) == self.queue_size:
+                    self._queue.popleft()
+                    self.frames_dropped += 1
+                self._queue.append(frame)
+            else:
+                if self._latest is not None and self._latest.seq > self._taken_seq:
+                    self.frames_dropped += 1
+                self._latest = frame
+            self._new_frame.notify_all()
+
+    def _copy(self, frame: FeedFrame) -> FeedFrame:
+        slot = self._slots[self._next_slot]
+        self._next_slot = (self._next_slot + 1) % len(self._slots)
+        image = self._copy_into(slot, None, frame.image)
+        outputs = {name: self._copy_into(slot, name, output) for name, output in frame.outputs.items()}
+        return FeedFrame(frame.seq, frame.captured_at, image, outputs, frame.transforms)
+
+    @staticmethod
+    def _copy_into(slot: Dict[Optional[str], Tuple[np.ndarray, np.ndarray]], name: Optional[str], source: np.ndarray):
+        """Copy source into the slot's buffer for name, returns a read-only view of it"""
+        buffer, view = slot.get(name, (None, None))
+        if buffer is None or buffer.shape != source.shape or buffer.dtype != source.dtype:
+            buffer = np.empty_like(source)
+            view = buffer.view()
+            view.flags.writeable = False
+            slot[name] = buffer, view
+        np.copyto(buffer, source)
+        return view
+
+    def _has_frame_after(self, after_seq: int) -> bool:
+        if self.drop_policy is DropPolicy.QUEUE:
+            return any(frame.seq > after_seq for frame in self._queue)
+        return self._latest is not None and self._latest.seq > after_seq
+
+    def _take(self, after_seq: int) -> Optional[FeedFrame]:
+        """Next frame newer than after_seq, called with the lock held"""
+        if self.drop_policy is DropPolicy.QUEUE:
+            while self._queue and self._queue[0].seq <= after_seq:
+                self._queue.popleft()
+            frame = self._queue.popleft() if self._queue else None
+        else:
+            frame = self._latest if self._latest is not None and self._latest.seq > after_seq else None
+        if frame is not None and frame.seq > self._taken_seq:
+            self.frames_delivered += 1
+            self._taken_seq = frame.seq
+        return frame
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        frame = self.read_frame()
+        return (True, frame.image) if frame is not None else (False, None)
+
+    def read_frame(self) -> Optional[FeedFrame]:
+        """Newest frame (LATEST) or the oldest queued one (QUEUE), None if there is none"""
+        with self._new_frame:
+            return self._take(0)
+
+    def wait_next(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[FeedFrame]:
+        """
+        Block until a frame newer than after_seq is offered, as RTSPFeed.wait_next.
+        None on timeout or once unsubscribed.
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: not self.is_running or self._has_frame_after(after_seq), timeout)
+            return self._take(after_seq) if not self._closed else None
+
+    def frame_age(self) -> float:
+        return self._feed.frame_age()
+
+    def is_stale(self) -> bool:
+        return self._feed.is_stale()
+
+    def health(self) -> FeedHealth:
+        """The shared feed's health, the frames_* attributes count this subscriber's drops"""
+        return self._feed.health()
+
+
+@dataclass
+class _SharedFeed:
+    feed: RTSPFeed
+    subscribers: List[FeedSubscription]
+
+
+class FeedHub:
+    """
+    Shared feeds by URL. The first subscriber's feed options (ring_size, stale_after, low_latency) open
+    the feed, later subscribers to the same URL share it as it is. The feed decodes at the highest
+    max_fps its subscribers ask for, default_fps for those taking every frame.
+    """
+    default_fps: float
+    _feeds: Dict[str, _SharedFeed]
+    _lock: threading.Lock
+
+    def __init__(self, default_fps: float = DEFAULT_FEED_FPS):
+        self.default_fps = default_fps
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        url: str,
+        max_fps: Optional[float] = None,
+        drop_policy: DropPolicy = DropPolicy.LATEST,
+        queue_size: int = 8,
+        ring_size: int = 4,
+        stale_after: float = 1.0,
+        low_latency: bool = False,
+    ) -> FeedSubscription:
+        with self._lock:
+            shared = self._feeds.get(url)
+            if shared is None:
+                feed = RTSPFeed.from_url(url, ring_size=ring_size, stale_after=stale_after, low_latency=low_latency)
+                shared = self._feeds[url] = _SharedFeed(feed, [])
+            subscription = FeedSubscription(self, shared.feed, url, max_fps, drop_policy, queue_size)
+            shared.subscribers.append(subscription)
+            shared.feed.add_listener(subscription._offer)
+            self._update_rate(shared)
+        return subscription
+
+    def subscriber_count(self, url: str) -> int:
+        with self._lock:
+            shared = self._feeds.get(url)
+            return len(shared.subscribers) if shared is not None else 0
+
+    def close(self):
+        """Release every feed, waking all subscribers"""
+        with self._lock:
+            feeds, self._feeds = self._feeds, {}
+        for shared in feeds.values():
+            for subscription in shared.subscribers:
+                subscription._close()
+            shared.feed.release()
+
+    def _update_rate(self, shared: _SharedFeed):
+        shared.feed.max_fps = max(subscription.max_fps or self.default_fps for subscription in shared.subscribers)
+
+    def _add_output(self, subscription: FeedSubscription, output: FrameOutput):
+        with self._lock:
+            existing = {registered.name: registered for registered in subscription._feed.outputs()}
+            if output.name not in existing:
+                subscription._feed.add_output(output)
+            elif existing[output.name] != output:
+                raise ValueError(
+                    f"Frame output {output.name} is already registered on {subscription.url} as {existing[output.name]}"
+                )
+
+    def _start(self, subscription: FeedSubscription):
+        with self._lock:
+            if not subscription._closed and not subscription._feed.is_running:
+                subscription._feed.start()
+
+    def _release(self, subscription: FeedSubscription):
+        with self._lock:
+            shared = self._feeds.get(subscription.url)
+            if subscription._closed or shared is None or subscription not in shared.subscribers:
+                return
+            subscription._close()
+            shared.feed.remove_listener(subscription._offer)
+            shared.subscribers.remove(subscription)
+            if shared.subscribers:
+                self._update_rate(shared)
+                return
+            del self._feeds[subscription.url]
+        shared.feed.release()
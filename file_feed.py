@@ -0,0 +1,199 @@
+"""
+Recorded games as feeds. VideoFileFeed and ImageDirectoryFeed are RTSPFeeds reading from disk, so the
+trackers run unchanged against them for profiling and regression runs.
+"""
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from rtsp_feed import FeedFrame, RTSPFeed
+
+# Frame rate of recordings that don't report one, and the default for image directories
+DEFAULT_PLAYBACK_FPS = 30.0
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+class PlaybackMode(str, Enum):
+    REALTIME = "realtime"  # frames are due at the recording's rate, overdue ones are skipped like a live camera's
+    MAX_SPEED = "max_speed"  # the next frame is decoded once a consumer has taken the last - every frame, no waiting
+    STEPPED = "stepped"  # one frame is decoded per step()
+
+
+class _ImageSequence:
+    """Image files in name order behind the parts of cv2.VideoCapture's interface RTSPFeed uses"""
+    paths: List[Path]
+    fps: float
+    _index: int
+
+    def __init__(self, directory: Path, pattern: str, fps: float):
+        self.paths = sorted(path for path in directory.glob(pattern) if path.suffix.lower() in IMAGE_SUFFIXES)
+        self.fps = fps
+        self._index = 0
+
+    def isOpened(self) -> bool:
+        return self._index < len(self.paths)
+
+    def grab(self) -> bool:
+        self._index += 1
+        return self._index <= len(self.paths)
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        frame = cv2.imread(str(self.paths[self._index - 1]))
+        if frame is None:
+            print(f"Could not read {self.paths[self._index - 1]}")
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.retrieve(image) if self.grab() else (False, None)
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.paths))
+        return 0.0
+
+    def release(self):
+        self._index = len(self.paths)
+
+
+class VideoFileFeed(RTSPFeed):
+    """
+    Plays a recording into RTSPFeed's frame ring, outputs and wait_next. Playback ends at the end of the
+    file unless loop is set: is_running goes False, waiting consumers wake up and finished is set.
+
+    REALTIME paces frames at fps (the recording's own rate by default) and skips frames that are already
+    overdue, so a slow tracker sees what it would on a live camera. MAX_SPEED decodes the next frame as
+    soon as a consumer has taken the current one, so every frame is processed once, as fast as the
+    consumer can go - consumers must take frames from the feed itself, not through a FeedHub. STEPPED
+    decodes a frame per step() call.
+    """
+    path: Path
+    mode: PlaybackMode
+    loop: bool
+    fps: float
+    finished: bool
+    _steps: int
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: PlaybackMode = PlaybackMode.REALTIME,
+        loop: bool = False,
+        fps: Optional[float] = None,
+        ring_size: int = 4,
+        stale_after: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.mode = PlaybackMode(mode)
+        self.loop = loop
+        self.finished = False
+        self._steps = 0
+        self._setup(str(path), ring_size, stale_after, low_latency=False, max_fps=0.0, adaptive_fps=False)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Could not open {self.path}")
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or DEFAULT_PLAYBACK_FPS
+        self.max_fps = self.fps
+
+    def _open_capture(self):
+        return cv2.VideoCapture(self.url)
+
+    def _reader(self) -> Callable[[], None]:
+        return self._play
+
+    def frame_count(self) -> int:
+        """Frames in the recording, as far as its container says"""
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def step(self, frames: int = 1) -> None:
+        """STEPPED mode - let the reader decode this many more frames"""
+        with self._new_frame:
+            self._steps += frames
+            self._new_frame.notify_all()
+
+    def _note_consumed(self, frame: FeedFrame):
+        super()._note_consumed(frame)
+        if self.mode is PlaybackMode.MAX_SPEED:
+            # Wakes the reader waiting for this frame to be taken
+            self._new_frame.notify_all()
+
+    def _wait_turn(self) -> bool:
+        """Hold the reader until the mode allows the next frame, False once released"""
+        with self._new_frame:
+            if self.mode is PlaybackMode.MAX_SPEED:
+                self._new_frame.wait_for(lambda: not self.is_running or self._consumed_seq >= self._seq)
+            elif self.mode is PlaybackMode.STEPPED:
+                self._new_frame.wait_for(lambda: not self.is_running or self._steps > 0)
+                self._steps = max(0, self._steps - 1)
+        return self.is_running
+
+    def _skip_overdue(self, due: float) -> int:
+        """REALTIME - grab past frames whose time has already gone, returns how many"""
+        overdue = int((time.perf_counter() - due) * self.fps)
+        skipped = 0
+        while skipped < overdue and self.cap.grab():
+            skipped += 1
+        self._frames_skipped += skipped
+        return skipped
+
+    def _play(self) -> None:
+        started_at = time.perf_counter()
+        position = 0  # frames into playback, loops included
+        while self._wait_turn():
+            if self.mode is PlaybackMode.REALTIME:
+                due = started_at + position / self.fps
+                if time.perf_counter() < due:
+                    if self._stopped.wait(due - time.perf_counter()):
+                        break
+                else:
+                    position += self._skip_overdue(due)
+            ret, index = self._decode_next(self.cap.read)
+            position += 1
+            if ret:
+                self._publish(ret, index, time.perf_counter())
+                continue
+            if not self.loop or not self._rewind():
+                self._finish()
+                break
+
+    def _rewind(self) -> bool:
+        self.cap.release()
+        self.cap = self._open_capture()
+        return self.cap.isOpened()
+
+    def _finish(self):
+        with self._new_frame:
+            self.finished = True
+            self.is_running = False
+            self._new_frame.notify_all()
+
+
+class ImageDirectoryFeed(VideoFileFeed):
+    """Images in a directory (matching pattern), played in name order as a fps recording"""
+    pattern: str
+    _image_fps: float
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        mode: PlaybackMode = PlaybackMode.REALTIME,
+        loop: bool = False,
+        fps: float = DEFAULT_PLAYBACK_FPS,
+        pattern: str = "*",
+        ring_size: int = 4,
+        stale_after: float = 1.0,
+    ):
+        self.pattern = pattern
+        self._image_fps = fps
+        super().__init__(directory, mode, loop, fps, ring_size, stale_after)
+
+    def _open_capture(self) -> _ImageSequence:
+        return _ImageSequence(Path(self.url), self.pattern, self._image_fps)
@@ -0,0 +1,159 @@
+"""
+Per-frame preprocessing run in the feed's reader thread: ROI crop, resize and grayscale conversion
+into preallocated buffers, one named output per consumer. Every output has a FrameTransform that maps
+its pixel coordinates back to the full frame.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class FrameTransform:
+    """Output pixel coordinates to full frame pixels: full = output * scale + offset"""
+    scale_x: float = 1.0
+    scale_y: float = 1.0
+    offset_x: float = 0.0
+    offset_y: float = 0.0
+
+    def to_full(self, x, y):
+        """Point (or arrays of points) in output pixels to full frame pixels"""
+        return x * self.scale_x + self.offset_x, y * self.scale_y + self.offset_y
+
+    def to_output(self, x, y):
+        return (x - self.offset_x) / self.scale_x, (y - self.offset_y) / self.scale_y
+
+    def boxes_to_full(self, boxes: np.ndarray) -> np.ndarray:
+        """(N, 4) x1, y1, x2, y2 boxes in output pixels to full frame pixels"""
+        scale = np.array([self.scale_x, self.scale_y, self.scale_x, self.scale_y])
+        offset = np.array([self.offset_x, self.offset_y, self.offset_x, self.offset_y])
+        return boxes * scale + offset
+
+    def boxes_to_output(self, boxes: np.ndarray) -> np.ndarray:
+        """(N, 4) x1, y1, x2, y2 boxes in full frame pixels to output pixels"""
+        scale = np.array([self.scale_x, self.scale_y, self.scale_x, self.scale_y])
+        offset = np.array([self.offset_x, self.offset_y, self.offset_x, self.offset_y])
+        return (boxes - offset) / scale
+
+    def area_to_full(self, area: float) -> float:
+        return area * self.scale_x * self.scale_y
+
+    def matrix_to_full(self, matrix: np.ndarray) -> np.ndarray:
+        """A 2x3 affine transform of output pixels as the same transform of full frame pixels"""
+        to_full = np.array([[self.scale_x, 0, self.offset_x], [0, self.scale_y, self.offset_y], [0, 0, 1]])
+        return (to_full @ np.vstack([matrix, [0, 0, 1]]) @ np.linalg.inv(to_full))[:2]
+
+
+IDENTITY = FrameTransform()
+
+
+@dataclass(frozen=True)
+class FrameOutput:
+    """
+    A named image derived from each frame. roi (x, y, width, height in full frame pixels) is cropped
+    first, then the crop is resized by at most one of size (width, height), scale or max_side
+    (longest side in pixels, keeping the aspect ratio), then optionally converted to grayscale.
+    """
+    name: str
+    size: Optional[Tuple[int, int]] = None
+    scale: Optional[float] = None
+    max_side: Optional[int] = None
+    roi: Optional[Tuple[int, int, int, int]] = None
+    grayscale: bool = False
+
+    def __post_init__(self):
+        if sum(option is not None for option in (self.size, self.scale, self.max_side)) > 1:
+            raise ValueError(f"Output {self.name}: give at most one of size, scale and max_side")
+
+    def crop(self, frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
+        """roi clipped to the frame, the whole frame without one"""
+        if self.roi is None:
+            return 0, 0, frame_width, frame_height
+        x, y, width, height = self.roi
+        x, y = min(max(x, 0), frame_width - 1), min(max(y, 0), frame_height - 1)
+        return x, y, min(width, frame_width - x), min(height, frame_height - y)
+
+    def output_size(self, frame_width: int, frame_height: int) -> Tuple[int, int]:
+        _, _, width, height = self.crop(frame_width, frame_height)
+        if self.size is not None:
+            return self.size
+        if self.scale is not None:
+            return max(1, round(width * self.scale)), max(1, round(height * self.scale))
+        if self.max_side is not None:
+            ratio = self.max_side / max(width, height)
+            return max(1, round(width * ratio)), max(1, round(height * ratio))
+        return width, height
+
+    def transform(self, frame_width: int, frame_height: int) -> FrameTransform:
+        x, y, width, height = self.crop(frame_width, frame_height)
+        output_width, output_height = self.output_size(frame_width, frame_height)
+        return FrameTransform(width / output_width, height / output_height, x, y)
+
+
+class FramePreprocessor:
+    """Fills each ring slot's output buffers from its frame. Only used from the reader thread"""
+    outputs: List[FrameOutput]
+    transforms: Dict[str, FrameTransform]
+    _frame_shape: Optional[Tuple[int, ...]]
+    _scratch: Dict[str, np.ndarray]
+
+    def __init__(self):
+        self.outputs = []
+        self.transforms = {}
+        self._frame_shape = None
+        self._scratch = {}
+
+    def add(self, output: FrameOutput):
+        if any(existing.name == output.name for existing in self.outputs):
+            raise ValueError(f"Duplicate frame output {output.name}")
+        self.outputs.append(output)
+
+    def configure(self, frame_shape: Tuple[int, ...]):
+        """Size transforms and scratch space for frames of frame_shape"""
+        self._frame_shape = frame_shape
+        frame_height, frame_width = frame_shape[:2]
+        self.transforms = {output.name: output.transform(frame_width, frame_height) for output in self.outputs}
+        self._scratch = {}
+        for output in self.outputs:
+            if output.grayscale and self._resizes(output):
+                _, _, width, height = output.crop(frame_width, frame_height)
+                # Convert first - an area resize of one channel costs less than the conversion saves
+                self._scratch[output.name] = np.empty((height, width), np.uint8)
+
+    def _resizes(self, output: FrameOutput) -> bool:
+        frame_height, frame_width = self._frame_shape[:2]
+        _, _, width, height = output.crop(frame_width, frame_height)
+        return output.output_size(frame_width, frame_height) != (width, height)
+
+    def allocate(self, frame: np.ndarray) -> Dict[str, np.ndarray]:
+        """Output buffers for one ring slot. Crop-only outputs are views into the slot's frame"""
+        buffers = {}
+        frame_height, frame_width = frame.shape[:2]
+        for output in self.outputs:
+            x, y, width, height = output.crop(frame_width, frame_height)
+            if not self._resizes(output) and not output.grayscale:
+                buffers[output.name] = frame[y:y + height, x:x + width]
+                continue
+            output_width, output_height = output.output_size(frame_width, frame_height)
+            channels = () if output.grayscale else tuple(frame.shape[2:])
+            buffers[output.name] = np.empty((output_height, output_width) + channels, frame.dtype)
+        return buffers
+
+    def apply(self, frame: np.ndarray, buffers: Dict[str, np.ndarray]):
+        frame_height, frame_width = frame.shape[:2]
+        for output in self.outputs:
+            x, y, width, height = output.crop(frame_width, frame_height)
+            source = frame[y:y + height, x:x + width]
+            buffer = buffers[output.name]
+            resize = self._resizes(output)
+            if resize and output.grayscale:
+                scratch = self._scratch[output.name]
+                cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=scratch)
+                cv2.resize(scratch, buffer.shape[1::-1], dst=buffer, interpolation=cv2.INTER_AREA)
+            elif resize:
+                cv2.resize(source, buffer.shape[1::-1], dst=buffer, interpolation=cv2.INTER_AREA)
+            elif output.grayscale:
+                cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=buffer)
+            # Crop-only outputs are views of the frame, already up to date
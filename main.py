@@ -13,20 +13,36 @@ import json
 import os
 
 from cam_controller import PTZController
+from camera_pool import CameraPool
+from command_scheduler import CommandScheduler
 from ui_elements.holdable_button import HoldableButton
-from models import PresetLocation, TrackingMode
+from models import PresetLocation, PTZPosition, TrackingMode
 # from tracking.subtraction_tracker import MotionTracker
-from tracking.yolo_tracker import MotionTracker
-from rtsp_feed import RTSPFeed
+from tracking.yolo_tracker import MotionTracker, detection_pipeline
+from tracking.detector_backends import DetectorBackend, player_detector
+from feed_hub import FeedHub
+from rtsp_feed import rtsp_url
+
+# Decode and detect in child processes instead of threads, for tracking boxes with cores to spare
+TRACK_IN_PROCESSES = False
+# Inference runtime for YOLO and its threads (None for about one per core). ONNX and OpenVINO need the
+# weights exported first: python -m experiments.yolo_finetune.export <weights.pt>
+DETECTOR_BACKEND = DetectorBackend.PYTORCH
+DETECTOR_THREADS: Optional[int] = None
 
 
 class PTZControlApp:
     root: tk.Tk
+    camera_pool: CameraPool
+    feed_hub: FeedHub
     ptz_controller: Optional[PTZController]
+    command_scheduler: Optional[CommandScheduler]
     presets: Dict[str, PresetLocation]
     hotkeys: Dict[str, str]
     running: bool
     tracking_enabled: bool
+    jog_velocity: float
+    resume_tracking_after_jog: bool
     motion_tracker: Optional[MotionTracker]
     status_thread: threading.Thread
     connection_thread: Optional[threading.Thread]
@@ -36,7 +52,12 @@ class PTZControlApp:
         self.root.title("PTZ Camera Controller")
         self.root.geometry("610x600")
 
+        # One camera at a time - a few workers cover its commands and position polls
+        self.camera_pool = CameraPool(max_workers=4)
+        # Trackers, previews and recorders of the same stream share one decoder
+        self.feed_hub = FeedHub()
         self.ptz_controller = None
+        self.command_scheduler = None
         self.motion_tracker = None
         self.presets = {}
         self.hotkeys = {}
@@ -47,6 +68,8 @@ class PTZControlApp:
 
         self.running = True
         self.tracking_enabled = False
+        self.jog_velocity = 0.5
+        self.resume_tracking_after_jog = False
         self.status_thread = threading.Thread(
             target=self.update_status_loop, daemon=True
         )
@@ -80,21 +103,21 @@ class PTZControlApp:
         jog_frame.pack(side="left", fill="both", expand=True, padx=5)
 
         HoldableButton(
-            jog_frame, text="▲", width=4, command=lambda: self.jog_tilt(-1), timeout=100
+            jog_frame, text="▲", width=4, command=lambda: self.start_jog(tilt=-1), release_command=self.stop_jog
         ).grid(row=0, column=1, padx=5, pady=5)
 
         HoldableButton(
-            jog_frame, text="◀", width=4, command=lambda: self.jog_pan(1), timeout=100
+            jog_frame, text="◀", width=4, command=lambda: self.start_jog(pan=1), release_command=self.stop_jog
         ).grid(row=1, column=0, padx=5, pady=5)
         ttk.Button(jog_frame, text="𝐇", width=4, command=lambda: self.go_home()).grid(
             row=1, column=1, padx=5, pady=5
         )
         HoldableButton(
-            jog_frame, text="▶", width=4, command=lambda: self.jog_pan(-1), timeout=100
+            jog_frame, text="▶", width=4, command=lambda: self.start_jog(pan=-1), release_command=self.stop_jog
         ).grid(row=1, column=2, padx=5, pady=5)
 
         HoldableButton(
-            jog_frame, text="▼", width=4, command=lambda: self.jog_tilt(1), timeout=100
+            jog_frame, text="▼", width=4, command=lambda: self.start_jog(tilt=1), release_command=self.stop_jog
         ).grid(row=2, column=1, padx=5, pady=5)
 
         zoom_frame = ttk.Frame(jog_frame)
@@ -108,8 +131,8 @@ class PTZControlApp:
             zoom_buttons_frame,
             text="Z-",
             width=4,
-            command=lambda: self.jog_zoom(-1),
-            timeout=100,
+            command=lambda: self.start_jog(zoom=-1),
+            release_command=self.stop_jog,
         ).pack(side="left", padx=5)
         ttk.Button(
             zoom_buttons_frame, text="Zx1", width=4, command=lambda: self.reset_zoom()
@@ -118,8 +141,8 @@ class PTZControlApp:
             zoom_buttons_frame,
             text="Z+",
             width=4,
-            command=lambda: self.jog_zoom(1),
-            timeout=100,
+            command=lambda: self.start_jog(zoom=1),
+            release_command=self.stop_jog,
         ).pack(side="left", padx=5)
 
         tracking_frame = ttk.Frame(zoom_frame)
@@ -182,8 +205,10 @@ class PTZControlApp:
 
         def connect_once():
             try:
-                self.ptz_controller = PTZController(ip)
+                self.ptz_controller = self.camera_pool.add_camera(ip, ip)
                 if self.ptz_controller.check_connection():
+                    self.command_scheduler = CommandScheduler(self.ptz_controller)
+                    self.command_scheduler.start()
                     self.root.after(0, lambda: self.status_label.config(text="Connected", foreground="green"))
                     self.root.after(0, lambda: self.connect_btn.config(text="Disconnect"))
                 else:
@@ -201,8 +226,12 @@ class PTZControlApp:
             if hasattr(self.motion_tracker, 'rtsp_feed'):
                 self.motion_tracker.rtsp_feed.release()
 
+        if self.command_scheduler:
+            self.command_scheduler.stop()
+            self.command_scheduler = None
+
         if self.ptz_controller:
-            self.ptz_controller.connected = False
+            self.camera_pool.remove_camera(self.ptz_controller.ip_address)
             self.ptz_controller = None
 
         self.status_label.config(text="Disconnected", foreground="red")
@@ -222,8 +251,6 @@ class PTZControlApp:
             result = func(*args, **kwargs)
 
             if was_tracking:
-                if hasattr(args[0].motion_tracker, "back_sub"):
-                    args[0].motion_tracker.back_sub.clear()
                 args[0].toggle_tracking()
             return result
         return wrapper
@@ -232,10 +259,14 @@ class PTZControlApp:
         """Toggle auto-tracking on/off"""
         if self.motion_tracker is None:
             # Initialize tracker with connection sharing
+            url = rtsp_url(self.ptz_controller.ip_address, 554, "mediainput/h264/stream_2")
+            detector_factory = player_detector(DETECTOR_BACKEND, DETECTOR_THREADS)
             self.motion_tracker = MotionTracker(
-                feed=RTSPFeed(self.ptz_controller.ip_address, 554, "mediainput/h264/stream_2"),
+                feed=detection_pipeline(url, low_latency=True, detector_factory=detector_factory) if TRACK_IN_PROCESSES
+                else self.feed_hub.subscribe(url, low_latency=True),
                 mode=TrackingMode(self.track_mode_select.get().split(".")[1]),
-                cam_controller=self.ptz_controller
+                cam_controller=self.command_scheduler,
+                detector_factory=detector_factory,
             )
 
         if self.tracking_enabled:
@@ -255,33 +286,57 @@ class PTZControlApp:
         new_track_mode = TrackingMode(self.track_mode_select.get().split(".")[1])
         self.motion_tracker.track_mode = new_track_mode
 
+    def start_jog(self, pan: int = 0, tilt: int = 0, zoom: int = 0):
+        """
+        Start a continuous jog while a jog button is held, tracking is paused until stop_jog
+        pan: left=1, right=-1 | tilt: down=1, up=-1 | zoom: in=1, out=-1
+        """
+        if not self.command_scheduler:
+            return
+        if self.tracking_enabled:
+            self.resume_tracking_after_jog = True
+            self.toggle_tracking()
+        if zoom:
+            self.command_scheduler.start_zoom(zoom * self.jog_velocity)
+        else:
+            self.command_scheduler.start_pan_tilt(pan * self.jog_velocity, tilt * self.jog_velocity)
+
+    def stop_jog(self):
+        if not self.command_scheduler:
+            return
+        self.command_scheduler.stop_pan_tilt()
+        self.command_scheduler.stop_zoom()
+        if self.resume_tracking_after_jog:
+            self.resume_tracking_after_jog = False
+            self.toggle_tracking()
+
     @manual_tracking_override
     def jog_pan(self, direction: int):
         # left=1, right=-1
-        if self.ptz_controller:
-            self.ptz_controller.move_pan(direction)
+        if self.command_scheduler:
+            self.command_scheduler.move_pan(direction)
 
     @manual_tracking_override
     def go_home(self):
-        if self.ptz_controller:
-            self.ptz_controller.move_home()
+        if self.command_scheduler:
+            self.command_scheduler.move_home()
 
     @manual_tracking_override
     def reset_zoom(self):
-        if self.ptz_controller:
-            self.ptz_controller.reset_zoom()
+        if self.command_scheduler:
+            self.command_scheduler.reset_zoom()
 
     @manual_tracking_override
     def jog_tilt(self, direction: int):
         # down=-1, up=1
-        if self.ptz_controller:
-            self.ptz_controller.move_tilt(direction)
+        if self.command_scheduler:
+            self.command_scheduler.move_tilt(direction)
 
     @manual_tracking_override
     def jog_zoom(self, direction: int):
         # Zoom Out=-1, Zoom In=1
-        if self.ptz_controller:
-            self.ptz_controller.move_zoom(direction)
+        if self.command_scheduler:
+            self.command_scheduler.move_zoom(direction)
 
     def create_preset(self):
         """Create a new preset location"""
@@ -299,14 +354,23 @@ class PTZControlApp:
             ):
                 return
 
-        current_pos = self.ptz_controller.current_position
-        self.presets[name] = PresetLocation(
-            name=name, pan=current_pos.pan, tilt=current_pos.tilt, zoom=current_pos.zoom
-        )
+        controller = self.ptz_controller
 
-        self.save_presets()
-        self.update_preset_buttons()
-        messagebox.showinfo("Success", f"Preset '{name}' created")
+        def save_preset(current_pos: PTZPosition):
+            self.presets[name] = PresetLocation(
+                name=name, pan=current_pos.pan, tilt=current_pos.tilt, zoom=current_pos.zoom
+            )
+            self.save_presets()
+            self.update_preset_buttons()
+            messagebox.showinfo("Success", f"Preset '{name}' created")
+
+        def refresh_once():
+            # Two camera round trips - off the Tk thread so a stalled camera can't freeze the UI
+            controller.refresh_position()
+            current_pos = controller.position()
+            self.root.after(0, lambda: save_preset(current_pos))
+
+        threading.Thread(target=refresh_once, daemon=True).start()
 
     def delete_preset(self):
         """Delete a preset location"""
@@ -337,8 +401,8 @@ class PTZControlApp:
             messagebox.showerror("Error", "Camera not connected")
             return
 
-        if preset_name in self.presets:
-            self.ptz_controller.goto_preset(self.presets[preset_name])
+        if preset_name in self.presets and self.command_scheduler:
+            self.command_scheduler.goto_preset(self.presets[preset_name])
 
     def set_hotkey(self):
         """Set a hotkey for a preset or jog function"""
@@ -388,8 +452,9 @@ class PTZControlApp:
         """Update status information in a separate thread"""
         while self.running:
             if self.ptz_controller and self.ptz_controller.connected:
-                self.ptz_controller.refresh_position()
-                pos = self.ptz_controller.current_position
+                # Polls every connected camera at once, the active one is displayed
+                self.camera_pool.refresh_positions(self.camera_pool.connected_names())
+                pos = self.ptz_controller.position()
 
                 pos_text = (
                     f"Pan: {pos.pan:.1f} | Tilt: {pos.tilt:.1f} | Zoom: {pos.zoom:.1f}"
@@ -437,6 +502,8 @@ class PTZControlApp:
             self.root.mainloop()
         finally:
             self.running = False
+            self.feed_hub.close()
+            self.camera_pool.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+"""
+Decoding and inference in their own processes, so neither shares a GIL with the control loop.
+
+The decode process runs an RTSPFeed and writes one FrameOutput of each frame into a SharedFrameRing.
+The inference process copies the newest frame out of the ring, runs the detector on it and sends the
+boxes back over a pipe as Detections - only the small result arrays are pickled, never frame data.
+"""
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.synchronize
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from frame_preprocessing import FrameOutput, FrameTransform
+from rtsp_feed import RTSPFeed
+from shared_frame_ring import RingSpec, SharedFrameRing
+
+# Builds the detector in the inference process: image -> (boxes x1, y1, x2, y2 in image pixels, confidences).
+# Must be picklable, i.e. a module level function or class
+DetectorFactory = Callable[[], Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]]
+
+# Processes are spawned, not forked - the parent has threads (and possibly OpenCV state) mid-flight
+_context = multiprocessing.get_context("spawn")
+
+
+@dataclass(frozen=True)
+class Detections:
+    seq: int  # seq of the frame detected on, as numbered by the decode process's feed
+    # time.perf_counter() in the decode process when the frame was read - a system-wide monotonic clock
+    # on Linux, so comparable with this process's perf_counter
+    captured_at: float
+    taken_at: float  # time.perf_counter() when inference took the frame
+    frame_size: Tuple[int, int]  # full frame width, height
+    boxes: np.ndarray  # (N, 4) x1, y1, x2, y2 in full frame pixels
+    confidences: np.ndarray
+
+    def age(self) -> float:
+        return time.perf_counter() - self.captured_at
+
+
+@dataclass(frozen=True)
+class _RingReady:
+    """Decode process -> inference process: a (new) ring to read from and how its frames map back"""
+    spec: RingSpec
+    frame_size: Tuple[int, int]
+    transform: FrameTransform
+
+
+def _decode(url: str, output: FrameOutput, low_latency: bool, max_fps: float, slots: int, rings, stopped):
+    feed = RTSPFeed.from_url(url, low_latency=low_latency, max_fps=max_fps)
+    feed.add_output(output)
+    feed.start()
+    ring: Optional[SharedFrameRing] = None
+    last_seq = 0
+    try:
+        while not stopped.is_set():
+            frame = feed.wait_next(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            image = frame.output(output.name)
+            if ring is None or ring.shape != image.shape:
+                # First frame, or the stream changed resolution - the ring is sized to the output
+                if ring is not None:
+                    ring.close()
+                    ring.unlink()
+                ring = SharedFrameRing.create(image.shape, image.dtype, slots)
+                frame_height, frame_width = frame.image.shape[:2]
+                rings.put(_RingReady(ring.spec, (frame_width, frame_height), frame.transform(output.name)))
+            ring.write(image, frame.seq, frame.captured_at)
+    finally:
+        feed.release()
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+
+def _infer(detector_factory: DetectorFactory, rings, results: Connection, stopped):
+    detect = detector_factory()
+    ring: Optional[SharedFrameRing] = None
+    ready: Optional[_RingReady] = None
+    image = None
+    last_seq = 0
+    try:
+        while not stopped.is_set():
+            if ring is None or not rings.empty():
+                try:
+                    ready = rings.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if ring is not None:
+                    ring.close()
+                ring = SharedFrameRing.attach(ready.spec)
+                image = ring.empty_frame()
+            frame = ring.wait_next(image, last_seq, timeout=0.5, stopped=stopped)
+            if frame is None:
+                continue
+            last_seq, captured_at = frame
+            taken_at = time.perf_counter()
+            boxes, confidences = detect(image)
+            results.send(Detections(
+                last_seq, captured_at, taken_at, ready.frame_size, ready.transform.boxes_to_full(boxes), confidences
+            ))
+    except (BrokenPipeError, EOFError):
+        pass  # the parent has gone
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+class ProcessPipeline:
+    """
+    Newest-frame detections from a stream, decoded and detected on in two child processes.
+    start() spawns them, wait_next blocks for detections on a frame newer than after_seq (older results
+    still in the pipe are skipped, like RTSPFeed.wait_next skips frames). One consumer thread only.
+    """
+    url: str
+    output: FrameOutput
+    stale_after: float
+    _detector_factory: DetectorFactory
+    _low_latency: bool
+    _max_fps: float
+    _slots: int
+    _processes: List[multiprocessing.Process]
+    _rings: Optional[multiprocessing.queues.Queue]
+    _results: Optional[Connection]
+    _stopped: multiprocessing.synchronize.Event
+    _latest: Optional[Detections]
+
+    def __init__(
+        self,
+        url: str,
+        detector_factory: DetectorFactory,
+        output: FrameOutput,
+        low_latency: bool = False,
+        max_fps: float = 20.0,
+        slots: int = 4,
+        stale_after: float = 1.0,
+    ):
+        self.url = url
+        self.output = output
+        self.stale_after = stale_after
+        self._detector_factory = detector_factory
+        self._low_latency = low_latency
+        self._max_fps = max_fps
+        self._slots = slots
+        self._processes = []
+        self._rings = None
+        self._results = None
+        self._stopped = _context.Event()
+        self._latest = None
+
+    @property
+    def is_running(self) -> bool:
+        return (
+            bool(self._processes) and not self._stopped.is_set() and all(p.is_alive() for p in self._processes)
+        )
+
+    def start(self) -> None:
+        if self._processes:
+            return
+        # Kept referenced - spawned children open the queue's semaphores after start() returns
+        self._rings = _context.Queue()
+        self._results, results = _context.Pipe(duplex=False)
+        self._processes = [
+            _context.Process(
+                target=_decode, name="pipeline-decode", daemon=True,
+                args=(self.url, self.output, self._low_latency, self._max_fps, self._slots, self._rings, self._stopped),
+            ),
+            _context.Process(
+                target=_infer, name="pipeline-infer", daemon=True,
+                args=(self._detector_factory, self._rings, results, self._stopped),
+            ),
+        ]
+        for process in self._processes:
+            process.start()
+        # The children hold the write end now, closing ours lets recv see EOF if they die
+        results.close()
+
+    def release(self) -> None:
+        self._stopped.set()
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                print(f"{process.name} did not stop, terminating it")
+                process.terminate()
+        if self._results is not None:
+            self._results.close()
+            self._results = None
+
+    def _drain(self):
+        """Keep only the newest of the results waiting in the pipe"""
+        try:
+            while self._results.poll():
+                self._latest = self._results.recv()
+        except (EOFError, OSError):
+            self._stopped.set()
+
+    def wait_next(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Detections]:
+        """None on timeout, or once the pipeline is released or a child process has died"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self._results is not None:
+            self._drain()
+            if self._latest is not None and self._latest.seq > after_seq:
+                return self._latest
+            if not self.is_running:
+                return None
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                return None
+            # Bounded so a child dying without closing the pipe is still noticed
+            self._results.poll(0.5 if remaining is None else min(remaining, 0.5))
+        return None
@@ -0,0 +1,128 @@
+"""
+Encoding and decoding of aw_ptz command and response payloads.
+
+Pan/Tilt: 4 hex digits each, full 16 bit range 0x0000-0xFFFF
+APS (absolute move): APS{pan}{tilt}{speed:2}{speed table:1}, echoed back as aPS...
+APC (position query): response aPC{pan}{tilt}
+Zoom: 3 hex digits, 12 bit, limited to 0x555-0xFFF
+min zoom: hex 555 = 1365
+max zoom: hex FFF = 4095
+AXZ (absolute zoom): AXZ{zoom}, echoed back as axz...
+GZ (zoom query): response gz{zoom}
+Z (zoom speed): Z{01-99} - 01 fastest wide, 50 stop, 99 fastest tele, acknowledged as zS{speed}
+PTS (pan/tilt speed): PTS{pan:2}{tilt:2} decimal 01-99, 50 stop
+    pan 01 fastest left - 99 fastest right, tilt 01 fastest down - 99 fastest up
+
+Hex strings are precomputed so encoding on the control path is table lookups only.
+"""
+from typing import Tuple
+
+PT_MIN = 0x0000
+PT_MAX = 0xFFFF
+ZOOM_MIN = 0x555
+ZOOM_MAX = 0xFFF
+PT_SPEED_MAX = 0x1D
+SPEED_STOP = 50
+DEFAULT_SPEED_TABLE = 2
+
+_HEX4 = tuple(f"{value:04X}" for value in range(PT_MAX + 1))
+_HEX3 = tuple(f"{value:03X}" for value in range(ZOOM_MAX + 1))
+_HEX2 = tuple(f"{value:02X}" for value in range(0x100))
+
+
+def clamp_pan_tilt(value: float) -> int:
+    return max(min(int(value), PT_MAX), PT_MIN)
+
+
+def clamp_zoom(value: float) -> int:
+    return max(min(int(value), ZOOM_MAX), ZOOM_MIN)
+
+
+def encode_pan_tilt(pan: int, tilt: int, speed: int = PT_SPEED_MAX, speed_table: int = DEFAULT_SPEED_TABLE) -> str:
+    """APS absolute pan/tilt move"""
+    if not PT_MIN <= pan <= PT_MAX or not PT_MIN <= tilt <= PT_MAX:
+        raise ValueError(f"Pan/Tilt out of range: {pan:#x}, {tilt:#x}")
+    if not 1 <= speed <= PT_SPEED_MAX:
+        raise ValueError(f"Pan/Tilt speed out of range: {speed:#x}")
+    return f"APS{_HEX4[pan]}{_HEX4[tilt]}{_HEX2[speed]}{speed_table}"
+
+
+def encode_zoom(zoom: int) -> str:
+    """AXZ absolute zoom"""
+    if not ZOOM_MIN <= zoom <= ZOOM_MAX:
+        raise ValueError(f"Zoom out of range: {zoom:#x}")
+    return f"AXZ{_HEX3[zoom]}"
+
+
+def encode_zoom_speed(speed: int) -> str:
+    """Z continuous zoom, 50 stops"""
+    if not 1 <= speed <= 99:
+        raise ValueError(f"Zoom speed out of range: {speed}")
+    return f"Z{speed:02d}"
+
+
+def velocity_to_speed(velocity: float) -> int:
+    """Signed velocity in [-1, 1] to a PTS/Z speed value, 0 maps to the stop value 50"""
+    velocity = max(min(velocity, 1.0), -1.0)
+    return SPEED_STOP + round(velocity * (SPEED_STOP - 1))
+
+
+def encode_pan_tilt_speed(pan_speed: int, tilt_speed: int) -> str:
+    """PTS continuous pan/tilt, 5050 stops"""
+    if not 1 <= pan_speed <= 99 or not 1 <= tilt_speed <= 99:
+        raise ValueError(f"Pan/Tilt speed out of range: {pan_speed}, {tilt_speed}")
+    return f"PTS{pan_speed:02d}{tilt_speed:02d}"
+
+
+def acknowledges(command: str, response: str) -> bool:
+    """Whether a camera response is the echo of command"""
+    response = response.upper()
+    if response == command:
+        return True
+    # Zoom speed is acknowledged as zS{speed}
+    return command.startswith("Z") and response == f"ZS{command[1:]}"
+
+
+def command_type(command: str) -> str:
+    """Command family used for metrics - APS, AXZ, APC, GZ, PTS, Z or the raw command"""
+    for prefix in ("APS", "AXZ", "APC", "PTS", "GZ", "Z"):
+        if command.startswith(prefix):
+            return prefix
+    return command
+
+
+def valid_response(command: str, response: str) -> bool:
+    """Whether response is what the camera sends back for command - a status for queries, else the echo"""
+    if command == "APC":
+        return len(response) == 11 and response.startswith("aPC")
+    if command == "GZ":
+        return len(response) == 5 and response.startswith("gz")
+    return acknowledges(command, response)
+
+
+def decode_pan_tilt(command: str) -> Tuple[int, int]:
+    """Target pan/tilt of an APS command or its echo"""
+    if len(command) != 14 or command[:3].upper() != "APS":
+        raise ValueError(f"Not an APS command: {command!r}")
+    return int(command[3:7], 16), int(command[7:11], 16)
+
+
+def decode_zoom(command: str) -> int:
+    """Target zoom of an AXZ command or its echo"""
+    if len(command) != 6 or command[:3].upper() != "AXZ":
+        raise ValueError(f"Not an AXZ command: {command!r}")
+    return int(command[3:], 16)
+
+
+def decode_pan_tilt_status(text: str) -> Tuple[int, int]:
+    """APC query response"""
+    if len(text) != 11 or not text.startswith("aPC"):
+        raise ValueError(f"Unexpected APC response: {text!r}")
+    return int(text[3:7], 16), int(text[7:11], 16)
+
+
+def decode_zoom_status(text: str) -> int:
+    """GZ query response"""
+    if len(text) != 5 or not text.startswith("gz"):
+        raise ValueError(f"Unexpected GZ response: {text!r}")
+    return int(text[2:], 16)
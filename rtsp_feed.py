@@ -1,45 +1,453 @@
+import os
 import threading
 import time
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
 
 import cv2
+import numpy as np
+
+from frame_preprocessing import IDENTITY, FrameOutput, FramePreprocessor, FrameTransform
+
+# FFmpeg demuxer/decoder options for low_latency mode: no input buffering, no reordering delay. The RTSP
+# transport is left to FFmpeg (UDP first) - forcing TCP would add retransmission delay, not remove it
+LOW_LATENCY_CAPTURE_OPTIONS = "fflags;nobuffer|flags;low_delay|max_delay;0|reorder_queue_size;0"
+# Adaptive fps decodes this much faster than consumers have been taking frames
+ADAPTIVE_FPS_HEADROOM = 1.25
+MIN_ADAPTIVE_FPS = 2.0
+# A read blocks at most this long on a dead stream before failing
+OPEN_TIMEOUT_MS = 5000
+READ_TIMEOUT_MS = 5000
+# Consecutive failed reads before the stream is reopened, and the wait before each attempt
+RECONNECT_AFTER_FAILURES = 3
+RECONNECT_BACKOFF_INITIAL = 0.5
+RECONNECT_BACKOFF_MAX = 30.0
+# release() waits this long for the reader, a read blocked on a dead stream finishes (and releases the
+# capture) on its own up to READ_TIMEOUT_MS later - so releasing from a UI thread never freezes it
+RELEASE_JOIN_TIMEOUT = 0.5
+
+# OpenCV reads capture options from the environment when a capture is opened
+_capture_options_lock = threading.Lock()
+
+
+def rtsp_url(ip: str, port: int, stream_path: str) -> str:
+    return f"rtsp://{ip}:{port}/{stream_path}"
+
+
+@dataclass(frozen=True)
+class FeedFrame:
+    seq: int  # increments by one per decoded frame, starting at 1
+    captured_at: float  # time.perf_counter() when the frame was read from the stream
+    image: np.ndarray  # read-only view into the feed's ring, see RTSPFeed
+    outputs: Dict[str, np.ndarray] = field(default_factory=dict)  # read-only, by FrameOutput name
+    transforms: Dict[str, FrameTransform] = field(default_factory=dict)
+
+    def age(self) -> float:
+        return time.perf_counter() - self.captured_at
+
+    def output(self, name: Optional[str]) -> np.ndarray:
+        """A named output, the full frame for None"""
+        return self.image if name is None else self.outputs[name]
+
+    def transform(self, name: Optional[str]) -> FrameTransform:
+        """Maps the named output's pixels back to full frame pixels"""
+        return IDENTITY if name is None else self.transforms[name]
+
+
+@dataclass(frozen=True)
+class FeedHealth:
+    connected: bool  # False while waiting to reconnect
+    frames_decoded: int
+    frames_dropped: int  # grabbed but not decoded (low_latency), or decoded but never taken by a consumer
+    read_failures: int
+    reconnects: int
+    seconds_since_frame: float  # inf before the first frame
+    backoff_s: float  # wait before the next reconnect attempt
 
 
 class RTSPFeed:
+    """
+    Decodes a stream on a background thread into a fixed ring of preallocated frame buffers.
+    cap.read() fills the next slot in place, so there is no per-frame allocation once the
+    first frame has fixed the frame size.
+
+    Readers get read-only views of the newest slot. A view stays valid until ring_size - 1 newer
+    frames have been decoded (150ms with the default 4 slots at 20fps) - copy it to keep it longer.
+
+    Consumers that must see each frame once call wait_next with the last seq they processed, which
+    blocks until a newer frame is decoded. The feed is stale when no frame has arrived for stale_after
+    seconds, e.g. the decoder has stalled on a dropped stream.
+
+    By default frames are read at up to max_fps with a sleep in between - if the stream runs faster,
+    the backlog builds up in FFmpeg's buffers and every frame arrives late. low_latency mode opens the
+    stream without input buffering and grab()s every frame as it arrives, only retrieve()ing the
+    newest one into the ring when max_fps allows. With adaptive_fps the decode rate follows how fast
+    consumers actually take frames, up to max_fps.
+
+    Consumers that want a smaller, cropped or grayscale image register a FrameOutput with add_output.
+    Outputs are produced in the reader thread into their own preallocated ring buffers and arrive with
+    each FeedFrame, together with the transform back to full frame coordinates. Listeners added with
+    add_listener are called in the reader thread with every decoded frame, see feed_hub.
+
+    When reads keep failing or no frame arrives for stale_after seconds the stream is closed and
+    reopened, waiting RECONNECT_BACKOFF_INITIAL seconds, doubling up to RECONNECT_BACKOFF_MAX while
+    attempts fail. Consumers keep waiting on the same feed throughout; health() reports the counters.
+    """
     url: str
     is_running: bool
+    ring_size: int
+    stale_after: float
+    low_latency: bool
+    max_fps: float
+    adaptive_fps: bool
+    _ring: List[np.ndarray]
+    _views: List[np.ndarray]
+    _preprocessor: FramePreprocessor
+    _output_buffers: List[Dict[str, np.ndarray]]
+    _output_views: List[Dict[str, np.ndarray]]
+    _pending_outputs: List[FrameOutput]
+    _listeners: Tuple[Callable[[FeedFrame], None], ...]
+    _latest: Optional[FeedFrame]
+    _last_ok: bool
+    _seq: int
+    _thread: Optional[threading.Thread]
+    _new_frame: threading.Condition
+    _consumed_seq: int
+    _consumed_at: float
+    _consume_interval: Optional[float]
+    _stopped: threading.Event
+    _connected: bool
+    _consecutive_failures: int
+    _backoff: float
+    _frames_decoded: int
+    _frames_skipped: int
+    _frames_unconsumed: int
+    _read_failures: int
+    _reconnects: int
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        stream_path: str,
+        ring_size: int = 4,
+        stale_after: float = 1.0,
+        low_latency: bool = False,
+        max_fps: float = 20.0,
+        adaptive_fps: bool = False,
+    ):
+        self._setup(rtsp_url(ip, port, stream_path), ring_size, stale_after, low_latency, max_fps, adaptive_fps)
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        ring_size: int = 4,
+        stale_after: float = 1.0,
+        low_latency: bool = False,
+        max_fps: float = 20.0,
+        adaptive_fps: bool = False,
+    ) -> "RTSPFeed":
+        """Feed from anything cv2.VideoCapture opens, e.g. a recording"""
+        feed = cls.__new__(cls)
+        feed._setup(url, ring_size, stale_after, low_latency, max_fps, adaptive_fps)
+        return feed
 
-    def __init__(self, ip: str, port: int, stream_path: str):
-        self.url = f"rtsp://{ip}:{port}/{stream_path}"
-        self.cap = cv2.VideoCapture(self.url)
+    def _setup(
+        self, url: str, ring_size: int, stale_after: float, low_latency: bool, max_fps: float, adaptive_fps: bool
+    ):
+        if ring_size < 2:
+            raise ValueError("ring_size must be at least 2 so the newest frame isn't decoded over")
+        self.url = url
+        self.low_latency = low_latency
+        self.cap = self._open_capture()
         self.is_running = False
+        self.ring_size = ring_size
+        self.stale_after = stale_after
+        self.max_fps = max_fps
+        self.adaptive_fps = adaptive_fps
         self.lock = threading.Lock()
-        self.frame: Optional[Tuple[bool, cv2.Mat]] = None
+        self._new_frame = threading.Condition(self.lock)
+        self._ring = []
+        self._views = []
+        self._preprocessor = FramePreprocessor()
+        self._output_buffers = []
+        self._output_views = []
+        self._pending_outputs = []
+        self._listeners = ()
+        self._latest = None
+        self._last_ok = False
+        self._seq = 0
+        self._thread = None
+        self._consumed_seq = 0
+        self._consumed_at = 0.0
+        self._consume_interval = None
+        self._stopped = threading.Event()
+        self._connected = self.cap.isOpened()
+        self._consecutive_failures = 0
+        self._backoff = RECONNECT_BACKOFF_INITIAL
+        self._frames_decoded = 0
+        self._frames_skipped = 0
+        self._frames_unconsumed = 0
+        self._read_failures = 0
+        self._reconnects = 0
+
+    def _open_capture(self) -> cv2.VideoCapture:
+        timeouts = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS, cv2.CAP_PROP_READ_TIMEOUT_MSEC, READ_TIMEOUT_MS]
+        if not self.low_latency:
+            return cv2.VideoCapture(self.url, cv2.CAP_ANY, timeouts)
+        with _capture_options_lock:
+            previous = os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS")
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = LOW_LATENCY_CAPTURE_OPTIONS
+            try:
+                cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG, timeouts)
+            finally:
+                if previous is None:
+                    del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+                else:
+                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = previous
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def add_output(self, output: FrameOutput) -> None:
+        """Outputs added while the feed is running are produced from the next decoded frame on"""
+        with self.lock:
+            if any(existing.name == output.name for existing in self.outputs()):
+                raise ValueError(f"Duplicate frame output {output.name}")
+            if self.is_running:
+                # The reader thread owns the preprocessor, it picks these up before its next decode
+                self._pending_outputs.append(output)
+            else:
+                self._preprocessor.add(output)
+
+    def outputs(self) -> List[FrameOutput]:
+        return self._preprocessor.outputs + self._pending_outputs
+
+    def add_listener(self, listener: Callable[[FeedFrame], None]) -> None:
+        """
+        Call listener(frame) in the reader thread after each decoded frame. It holds up decoding,
+        so it should only hand the frame over, not process it
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener: Callable[[FeedFrame], None]) -> None:
+        self._listeners = tuple(existing for existing in self._listeners if existing != listener)
 
     def start(self) -> None:
         self.is_running = True
-        thread = threading.Thread(target=self._update_frame, args=())
-        thread.start()
+        self._stopped.clear()
+        # Daemon, so a reader still blocked on a dead stream doesn't hold up the app's exit
+        self._thread = threading.Thread(target=self._run_reader, daemon=True)
+        self._thread.start()
+
+    def _reader(self) -> Callable[[], None]:
+        """The reader thread's loop"""
+        return self._update_frame_low_latency if self.low_latency else self._update_frame
+
+    def _run_reader(self) -> None:
+        try:
+            self._reader()()
+        finally:
+            # Once started, the reader owns the capture - release() may not have waited for this read
+            self.cap.release()
 
     def release(self) -> None:
+        """Stop the reader. Returns within RELEASE_JOIN_TIMEOUT even while a read is blocked"""
         self.is_running = False
-        if self.cap.isOpened():
-            self.cap.release()
+        self._stopped.set()
+        with self._new_frame:
+            self._new_frame.notify_all()
+        if self._thread is None:
+            if self.cap.isOpened():
+                self.cap.release()
+            return
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=RELEASE_JOIN_TIMEOUT)
+            self._thread = None
+
+    def target_fps(self) -> float:
+        """Rate frames are currently decoded into the ring at"""
+        if not self.adaptive_fps or self._consume_interval is None:
+            return self.max_fps
+        return min(self.max_fps, max(MIN_ADAPTIVE_FPS, ADAPTIVE_FPS_HEADROOM / self._consume_interval))
+
+    @staticmethod
+    def _read_only(buffer: np.ndarray) -> np.ndarray:
+        view = buffer.view()
+        view.flags.writeable = False
+        return view
+
+    def _allocate_ring(self, frame: np.ndarray):
+        self._ring = [np.empty_like(frame) for _ in range(self.ring_size)]
+        self._views = [self._read_only(buffer) for buffer in self._ring]
+        self._preprocessor.configure(frame.shape)
+        self._output_buffers = [self._preprocessor.allocate(buffer) for buffer in self._ring]
+        self._output_views = [
+            {name: self._read_only(output) for name, output in buffers.items()} for buffers in self._output_buffers
+        ]
+
+    def _take_pending_outputs(self) -> bool:
+        if not self._pending_outputs:
+            return False
+        with self.lock:
+            for output in self._pending_outputs:
+                self._preprocessor.add(output)
+            self._pending_outputs = []
+        return True
+
+    def _decode_next(self, read: Callable) -> Tuple[bool, int]:
+        """Decode with read (cap.read or cap.retrieve) into the slot after the newest, returns (ok, slot index)"""
+        index = (self._seq + 1) % self.ring_size
+        # New outputs need buffers in every slot - reallocate the ring, frames already handed out keep the old one
+        if self._take_pending_outputs() or not self._ring:
+            ret, frame = read()
+            if not ret:
+                return False, index
+            self._allocate_ring(frame)
+            self._ring[index][...] = frame
+        else:
+            ret, frame = read(self._ring[index])
+            if not ret:
+                return False, index
+            if frame is not self._ring[index]:
+                # Stream changed resolution or format - cv2 allocated a new array, size the ring to it
+                self._allocate_ring(frame)
+                self._ring[index][...] = frame
+        self._preprocessor.apply(self._ring[index], self._output_buffers[index])
+        return True, index
+
+    def _publish(self, ret: bool, index: int, captured_at: float):
+        with self._new_frame:
+            self._last_ok = ret
+            if not ret:
+                return
+            self._frames_decoded += 1
+            self._seq += 1
+            frame = self._latest = FeedFrame(
+                self._seq, captured_at, self._views[index],
+                self._output_views[index], self._preprocessor.transforms,
+            )
+            self._new_frame.notify_all()
+        for listener in self._listeners:
+            listener(frame)
 
     def _update_frame(self) -> None:
-        max_fps = 20
-        target_frame_time = 1/max_fps
         last_frame_at: float = 0.0
         while self.is_running:
+            target_frame_time = 1 / self.target_fps()
             if time.perf_counter() < last_frame_at + target_frame_time:
-                time.sleep((last_frame_at + target_frame_time) - time.perf_counter())
-            ret, frame = self.cap.read()
+                time.sleep(max(0.0, (last_frame_at + target_frame_time) - time.perf_counter()))
+            ret, index = self._decode_next(self.cap.read)
             last_frame_at = time.perf_counter()
-            with self.lock:
-                self.frame = (ret, frame)
+            self._publish(ret, index, last_frame_at)
+            self._check_stream(ret)
 
-    def read(self) -> Tuple[bool, Optional[cv2.Mat]]:
+    def _update_frame_low_latency(self) -> None:
+        last_frame_at: float = 0.0
+        while self.is_running:
+            # grab blocks until the stream delivers a frame, so FFmpeg's buffer never backs up
+            if not self.cap.grab():
+                self._publish(False, 0, time.perf_counter())
+                self._check_stream(False)
+                continue
+            grabbed_at = time.perf_counter()
+            if grabbed_at - last_frame_at < 1 / self.target_fps():
+                # Dropped - skips the colour conversion and copy into the ring
+                self._frames_skipped += 1
+                self._check_stream(True)
+                continue
+            ret, index = self._decode_next(self.cap.retrieve)
+            last_frame_at = grabbed_at
+            self._publish(ret, index, grabbed_at)
+            self._check_stream(ret)
+
+    def _check_stream(self, ret: bool):
+        """After each read - reconnects once reads keep failing or frames stop arriving"""
+        if ret:
+            self._consecutive_failures = 0
+            self._backoff = RECONNECT_BACKOFF_INITIAL
+            return
+        self._consecutive_failures += 1
+        self._read_failures += 1
+        if self._consecutive_failures >= RECONNECT_AFTER_FAILURES or self.is_stale():
+            self._reconnect()
+
+    def _reconnect(self):
+        """Reopen the stream after the current backoff, doubling it for next time"""
+        self._connected = False
+        print(f"Video feed {self.url} lost, reconnecting in {self._backoff:.1f}s")
+        self.cap.release()
+        if self._stopped.wait(self._backoff):
+            return
+        self._backoff = min(self._backoff * 2, RECONNECT_BACKOFF_MAX)
+        self._reconnects += 1
+        self.cap = self._open_capture()
+        self._consecutive_failures = 0
+        self._connected = self.cap.isOpened()
+
+    def _note_consumed(self, frame: FeedFrame):
+        """Track how often consumers take a new frame, for adaptive_fps. Called with the lock held"""
+        if frame.seq <= self._consumed_seq:
+            return
+        now = time.perf_counter()
+        if self._consumed_seq:
+            self._frames_unconsumed += frame.seq - self._consumed_seq - 1
+            interval = now - self._consumed_at
+            self._consume_interval = (
+                interval if self._consume_interval is None else 0.8 * self._consume_interval + 0.2 * interval
+            )
+        self._consumed_seq = frame.seq
+        self._consumed_at = now
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Newest frame as a read-only view"""
         with self.lock:
-            if self.frame is not None:
-                return self.frame
+            if self._last_ok and self._latest is not None:
+                self._note_consumed(self._latest)
+                return True, self._latest.image
             return False, None
+
+    def read_frame(self) -> Optional[FeedFrame]:
+        """Newest frame with its sequence number, None if the last decode failed"""
+        with self.lock:
+            if not self._last_ok or self._latest is None:
+                return None
+            self._note_consumed(self._latest)
+            return self._latest
+
+    def wait_next(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[FeedFrame]:
+        """
+        Block until a frame newer than after_seq is decoded and return the newest one.
+        Frames decoded while the caller was busy are skipped, not queued.
+        None on timeout or once the feed is released.
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(
+                lambda: not self.is_running or (self._latest is not None and self._latest.seq > after_seq),
+                timeout,
+            )
+            if self._latest is not None and self._latest.seq > after_seq:
+                self._note_consumed(self._latest)
+                return self._latest
+            return None
+
+    def frame_age(self) -> float:
+        """Seconds since the newest frame was decoded, inf before the first one"""
+        with self.lock:
+            latest = self._latest
+        return latest.age() if latest is not None else float("inf")
+
+    def is_stale(self) -> bool:
+        return self.frame_age() > self.stale_after
+
+    def health(self) -> FeedHealth:
+        with self.lock:
+            return FeedHealth(
+                connected=self._connected,
+                frames_decoded=self._frames_decoded,
+                frames_dropped=self._frames_skipped + self._frames_unconsumed,
+                read_failures=self._read_failures,
+                reconnects=self._reconnects,
+                seconds_since_frame=self._latest.age() if self._latest is not None else float("inf"),
+                backoff_s=self._backoff,
+            )
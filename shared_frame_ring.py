@@ -0,0 +1,124 @@
+"""
+Fixed-size frame ring in multiprocessing shared memory, for handing frames to another process without
+pickling them. One writer process, any number of readers, each with its own copy-out buffer.
+"""
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Readers poll the ring's sequence numbers this often while waiting for a frame
+POLL_INTERVAL = 0.002
+_HEADER_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class RingSpec:
+    """Everything another process needs to attach to a ring, small enough to send over a queue"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    slots: int
+
+
+class SharedFrameRing:
+    """
+    Layout: latest seq, one seq and one capture time per slot, then the slots' frames. The writer
+    zeroes a slot's seq before writing into it and sets it once the frame is complete, so a reader that
+    sees the same seq before and after copying a slot out knows the copy isn't torn.
+    Sequence numbers are the writer's and must increase, starting at 1.
+    """
+    spec: RingSpec
+    _shm: shared_memory.SharedMemory
+    _latest: np.ndarray
+    _slot_seq: np.ndarray
+    _captured_at: np.ndarray
+    _frames: np.ndarray
+
+    def __init__(self, spec: RingSpec, shm: shared_memory.SharedMemory):
+        self.spec = spec
+        self._shm = shm
+        header_bytes = self._header_bytes(spec.slots)
+        self._latest = np.ndarray((1,), np.int64, shm.buf, 0)
+        self._slot_seq = np.ndarray((spec.slots,), np.int64, shm.buf, 8)
+        self._captured_at = np.ndarray((spec.slots,), np.float64, shm.buf, 8 + 8 * spec.slots)
+        self._frames = np.ndarray((spec.slots,) + spec.shape, np.dtype(spec.dtype), shm.buf, header_bytes)
+
+    @staticmethod
+    def _header_bytes(slots: int) -> int:
+        size = 8 + 16 * slots
+        return -(-size // _HEADER_ALIGN) * _HEADER_ALIGN
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], dtype, slots: int = 4) -> "SharedFrameRing":
+        if slots < 2:
+            raise ValueError("slots must be at least 2 so the newest frame isn't written over")
+        dtype = np.dtype(dtype)
+        size = cls._header_bytes(slots) + slots * int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(RingSpec(shm.name, tuple(shape), dtype.str, slots), shm)
+        ring._latest[0] = 0
+        ring._slot_seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, spec: RingSpec) -> "SharedFrameRing":
+        return cls(spec, shared_memory.SharedMemory(name=spec.name))
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.spec.shape
+
+    def empty_frame(self) -> np.ndarray:
+        """A buffer for read/wait_next to copy frames out into"""
+        return np.empty(self.spec.shape, np.dtype(self.spec.dtype))
+
+    def write(self, frame: np.ndarray, seq: int, captured_at: float):
+        index = seq % self.spec.slots
+        self._slot_seq[index] = 0
+        np.copyto(self._frames[index], frame)
+        self._captured_at[index] = captured_at
+        self._slot_seq[index] = seq
+        self._latest[0] = seq
+
+    def latest_seq(self) -> int:
+        return int(self._latest[0])
+
+    def read(self, out: np.ndarray, after_seq: int = 0) -> Optional[Tuple[int, float]]:
+        """Copy the newest frame into out if it is newer than after_seq, returns its (seq, captured_at)"""
+        while True:
+            seq = int(self._latest[0])
+            if seq <= after_seq:
+                return None
+            index = seq % self.spec.slots
+            if self._slot_seq[index] != seq:
+                # The writer has moved on to the next frame since seq was read
+                continue
+            captured_at = float(self._captured_at[index])
+            np.copyto(out, self._frames[index])
+            if self._slot_seq[index] == seq:
+                return seq, captured_at
+
+    def wait_next(
+        self, out: np.ndarray, after_seq: int = 0, timeout: Optional[float] = None, stopped=None
+    ) -> Optional[Tuple[int, float]]:
+        """read, waiting for a frame newer than after_seq. None on timeout or once stopped (an Event) is set"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            result = self.read(out, after_seq)
+            if result is not None:
+                return result
+            if (stopped is not None and stopped.is_set()) or (deadline is not None and time.perf_counter() >= deadline):
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        del self._latest, self._slot_seq, self._captured_at, self._frames
+        self._shm.close()
+
+    def unlink(self):
+        """Remove the ring once every process is done with it - the creator calls this"""
+        self._shm.unlink()
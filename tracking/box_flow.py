@@ -0,0 +1,131 @@
+"""
+Boxes carried from frame to frame by sparse Lucas-Kanade optical flow, for the frames a detector
+skips. Each box is anchored with a small grid of points over its middle; every frame the points are
+tracked forwards and back again, points that don't return to where they started are dropped, and
+each box moves by the median of its points' motion and scales by the median change in their spread.
+A box that keeps too few points is lost until the next anchor.
+
+The search starts where each box's velocity says its points should be, so the frames that pass while
+the detector runs don't take the players out of the flow's reach.
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+GRID = (3, 3)  # points per box, across and down - flow costs about 10us a point, there and back
+WINDOW = (11, 11)
+# Pyramid levels - enough for the players' motion over the frames a detection takes
+MAX_LEVEL = 3
+# Points cover this share of the box around its center - the box's edges are mostly background
+INNER = 0.6
+MIN_POINTS = 4
+MAX_FORWARD_BACKWARD_ERROR = 1.0  # pixels
+MAX_SCALE_STEP = 1.25  # per frame, either way
+
+
+class BoxFlow:
+    """Only used from one thread. Boxes are (N, 4) x1, y1, x2, y2 in the pixels of the frames passed in"""
+    _previous: Optional[np.ndarray]  # grayscale frame the points are on
+    _spare: Optional[np.ndarray]
+    _ids: np.ndarray
+    _boxes: np.ndarray
+    _velocities: np.ndarray  # (N, 2) pixels per second
+    _at: float  # timestamp of the frame the points are on
+    _points: np.ndarray  # (N, K, 2) float32, NaN once lost
+
+    def __init__(self):
+        self._previous = None
+        self._spare = None
+        self.reset()
+
+    def reset(self):
+        self._ids = np.empty(0, int)
+        self._boxes = np.empty((0, 4))
+        self._velocities = np.empty((0, 2))
+        self._points = np.empty((0, GRID[0] * GRID[1], 2), np.float32)
+
+    def _gray(self, image: np.ndarray) -> np.ndarray:
+        """image in the spare buffer, grayscale"""
+        if self._spare is None or self._spare.shape != image.shape[:2]:
+            self._spare = np.empty(image.shape[:2], np.uint8)
+        if image.ndim == 3:
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._spare)
+        else:
+            np.copyto(self._spare, image)
+        return self._spare
+
+    def _keep(self, gray: np.ndarray):
+        self._previous, self._spare = gray, self._previous
+
+    def anchor(self, image: np.ndarray, timestamp: float, ids: np.ndarray, boxes: np.ndarray, velocities: np.ndarray):
+        """
+        Start following boxes (e.g. fresh detections) on image, replacing whatever was followed.
+        velocities (N, 2) are the boxes' best known motion in pixels per second, zeros when unknown
+        """
+        self._keep(self._gray(image))
+        self._at = timestamp
+        boxes = np.asarray(boxes, np.float64).reshape(-1, 4)
+        fx, fy = np.meshgrid(
+            np.linspace(-INNER / 2, INNER / 2, GRID[0]), np.linspace(-INNER / 2, INNER / 2, GRID[1])
+        )
+        offsets = np.stack([fx.ravel(), fy.ravel()], axis=1)  # (K, 2) in box sizes
+        centers, sizes = (boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]
+        self._ids = np.asarray(ids).copy()
+        self._boxes = boxes.copy()
+        self._velocities = np.asarray(velocities, np.float64).reshape(-1, 2).copy()
+        self._points = (centers[:, None, :] + offsets[None, :, :] * sizes[:, None, :]).astype(np.float32)
+
+    def propagate(self, image: np.ndarray, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """ids and boxes of everything still followed, moved to image"""
+        gray = self._gray(image)
+        dt, self._at = timestamp - self._at, timestamp
+        if self._previous is None or self._previous.shape != gray.shape or not len(self._ids):
+            self._keep(gray)
+            self.reset()
+            return self._ids, self._boxes
+
+        count, per_box = self._points.shape[:2]
+        flat = self._points.reshape(-1, 2)
+        valid = np.flatnonzero(~np.isnan(flat[:, 0]))
+        start = flat[valid].reshape(-1, 1, 2)
+        expected = (np.repeat(self._velocities * dt, per_box, axis=0)[valid]).astype(np.float32).reshape(-1, 1, 2)
+        moved, found, _ = cv2.calcOpticalFlowPyrLK(
+            self._previous, gray, start, start + expected, winSize=WINDOW, maxLevel=MAX_LEVEL,
+            flags=cv2.OPTFLOW_USE_INITIAL_FLOW,
+        )
+        back, found_back, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self._previous, moved, moved - expected, winSize=WINDOW, maxLevel=MAX_LEVEL,
+            flags=cv2.OPTFLOW_USE_INITIAL_FLOW,
+        )
+        error = np.linalg.norm((back - start).reshape(-1, 2), axis=1)
+        good = (found.ravel() == 1) & (found_back.ravel() == 1) & (error < MAX_FORWARD_BACKWARD_ERROR)
+        self._keep(gray)
+
+        before = np.full((count * per_box, 2), np.nan, np.float32)
+        after = np.full((count * per_box, 2), np.nan, np.float32)
+        before[valid[good]] = flat[valid[good]]
+        after[valid[good]] = moved.reshape(-1, 2)[good]
+        before, after = before.reshape(count, per_box, 2), after.reshape(count, per_box, 2)
+        kept = (~np.isnan(after[:, :, 0])).sum(axis=1) >= MIN_POINTS
+        before, after = before[kept], after[kept]
+        self._ids, self._boxes, self._points = self._ids[kept], self._boxes[kept], after
+        self._velocities = self._velocities[kept]
+        if not kept.any():
+            return self._ids, self._boxes
+
+        shift = np.nanmedian(after - before, axis=1)
+        if dt > 0:
+            self._velocities = shift / dt
+        spread_before = np.linalg.norm(before - np.nanmedian(before, axis=1)[:, None, :], axis=2)
+        spread_after = np.linalg.norm(after - np.nanmedian(after, axis=1)[:, None, :], axis=2)
+        # Points right at the middle say nothing about scale
+        ratio = np.where(spread_before > 0.5, spread_after / np.maximum(spread_before, 0.5), np.nan)
+        measured = ~np.isnan(ratio).all(axis=1)
+        scale = np.ones(len(ratio))
+        scale[measured] = np.clip(np.nanmedian(ratio[measured], axis=1), 1 / MAX_SCALE_STEP, MAX_SCALE_STEP)
+
+        centers = (self._boxes[:, :2] + self._boxes[:, 2:]) / 2 + shift
+        halves = (self._boxes[:, 2:] - self._boxes[:, :2]) / 2 * scale[:, None]
+        self._boxes = np.hstack([centers - halves, centers + halves])
+        return self._ids, self._boxes
@@ -0,0 +1,30 @@
+import asyncio
+from typing import Any, Callable, Union
+
+from async_cam_controller import AsyncPTZController
+from cam_controller import PTZController
+from command_scheduler import CommandScheduler
+
+CameraController = Union[PTZController, AsyncPTZController, CommandScheduler]
+
+
+def send_command(cam_control: CameraController, command: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a controller command from a tracking loop.
+    Blocking controllers run it inline, async controllers get it scheduled on their event loop
+    and the tracking loop carries on without waiting for the camera.
+    """
+    result = command(*args, **kwargs)
+    if asyncio.iscoroutine(result):
+        return cam_control.submit(result)
+    return result
+
+
+def proportional_velocity(offset: float, dead_zone: float, gain: float) -> float:
+    """
+    Velocity mode output for a normalised offset (-1 to 1, frame edge to edge).
+    0 inside the dead zone, otherwise offset * gain clipped to [-1, 1]
+    """
+    if abs(offset) <= dead_zone:
+        return 0.0
+    return max(min(offset * gain, 1.0), -1.0)
@@ -0,0 +1,200 @@
+"""
+The YOLO player detector on interchangeable CPU inference backends: the fine-tuned PyTorch weights
+through Ultralytics, or the same weights exported to ONNX (run by ONNX Runtime) or OpenVINO IR. Every
+backend is an image -> (boxes x1, y1, x2, y2 in image pixels, confidences) callable for the player
+class, so player_detector's factories drop into MotionTracker and ProcessPipeline unchanged.
+
+The exported backends never import Ultralytics or PyTorch: they letterbox, run the network and decode
+its raw output here, the way Ultralytics does for the PyTorch weights. Each backend imports its runtime
+only when built, so a tracker pays for the one it uses. export_weights makes the exports next to the
+weights; experiments/yolo_finetune/export.py does that for a fine-tuning run.
+"""
+import ast
+import functools
+import math
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from process_pipeline import DetectorFactory
+
+if TYPE_CHECKING:
+    import onnxruntime
+    import openvino
+    from ultralytics import YOLO
+
+WEIGHTS_PATH = Path(__file__).parent.joinpath("yolo_weights.pt")
+DETECT_SIZE = 640  # network input's longest side
+STRIDE = 32  # the letterbox pads to a multiple of the network's largest stride, as Ultralytics does
+PAD_VALUE = 114
+CONFIDENCE = 0.8
+NMS_IOU = 0.4
+PLAYER_CLASS = "player"
+
+
+class DetectorBackend(str, Enum):
+    PYTORCH = "pytorch"
+    ONNX = "onnx"  # ONNX Runtime's CPU execution provider
+    OPENVINO = "openvino"
+
+
+def weights_path(backend: DetectorBackend, weights: Path = WEIGHTS_PATH) -> Path:
+    """Where export_weights puts backend's export of weights (the .pt file)"""
+    if backend == DetectorBackend.ONNX:
+        return weights.with_suffix(".onnx")
+    if backend == DetectorBackend.OPENVINO:
+        return weights.parent.joinpath(f"{weights.stem}_openvino_model", f"{weights.stem}.xml")
+    return weights
+
+
+def export_weights(
+    weights: Path = WEIGHTS_PATH, backends: Iterable[DetectorBackend] = (DetectorBackend.ONNX, DetectorBackend.OPENVINO)
+) -> Dict[DetectorBackend, Path]:
+    """
+    Export the PyTorch weights for backends with Ultralytics, returns the exports' paths. Exports take any
+    input size, so they letterbox like the PyTorch backend instead of padding every frame to a square
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    exported = {}
+    for backend in backends:
+        if backend == DetectorBackend.PYTORCH:
+            continue
+        model.export(format=backend.value, imgsz=DETECT_SIZE, dynamic=True)
+        exported[backend] = weights_path(backend, weights)
+    return exported
+
+
+def _player_class_id(names: List[str]) -> int:
+    return names.index(PLAYER_CLASS)
+
+
+def _letterbox(image: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """image -> network input blob (1, 3, H, W) RGB 0..1, its scale and (left, top) padding"""
+    height, width = image.shape[:2]
+    scale = min(DETECT_SIZE / height, DETECT_SIZE / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x = math.ceil(new_width / STRIDE) * STRIDE - new_width
+    pad_y = math.ceil(new_height / STRIDE) * STRIDE - new_height
+    left, top = pad_x // 2, pad_y // 2
+    padded = cv2.copyMakeBorder(
+        image, top, pad_y - top, left, pad_x - left, cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3
+    )
+    return cv2.dnn.blobFromImage(padded, 1 / 255, swapRB=True), scale, (left, top)
+
+
+def _decode(
+    output: np.ndarray, class_id: int, scale: float, padding: Tuple[int, int], image_shape: Tuple[int, ...]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raw YOLO output (1, 4 + classes, anchors) of center, size and class scores per anchor -> player boxes
+    in the image's pixels and their confidences, after the same filtering and NMS as Ultralytics
+    """
+    predictions = output[0].T
+    scores = predictions[:, 4:]
+    classes = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), classes]
+    keep = (classes == class_id) & (confidences > CONFIDENCE)
+    centers, sizes, confidences = predictions[keep, :2], predictions[keep, 2:4], confidences[keep]
+    corners = centers - sizes / 2
+    chosen = np.asarray(
+        cv2.dnn.NMSBoxes(np.hstack([corners, sizes]).tolist(), confidences.tolist(), CONFIDENCE, NMS_IOU), int
+    ).reshape(-1)
+    boxes = np.hstack([corners[chosen], corners[chosen] + sizes[chosen]]).astype(np.float64)
+    boxes = (boxes - np.array(padding * 2)) / scale
+    height, width = image_shape[:2]
+    np.clip(boxes, 0, [width, height, width, height], out=boxes)
+    return boxes, confidences[chosen].astype(np.float64)
+
+
+class TorchDetector:
+    """The PyTorch weights through Ultralytics. threads sets PyTorch's for the whole process"""
+    model: "YOLO"
+    player_class_id: int
+
+    def __init__(self, weights: Path = WEIGHTS_PATH, threads: Optional[int] = None):
+        import torch
+        from ultralytics import YOLO
+
+        if threads is not None:
+            torch.set_num_threads(threads)
+        self.model = YOLO(weights)
+        self.player_class_id = _player_class_id([self.model.names[k] for k in sorted(self.model.names)])
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        result = self.model(image, imgsz=DETECT_SIZE, conf=CONFIDENCE, iou=NMS_IOU, verbose=False)[0]
+        players = result.boxes.cls.cpu().numpy() == self.player_class_id
+        return result.boxes.xyxy.cpu().numpy()[players], result.boxes.conf.cpu().numpy()[players]
+
+
+class OnnxDetector:
+    """The ONNX export on ONNX Runtime's CPU provider, threads for its intra-op pool"""
+    session: "onnxruntime.InferenceSession"
+    input_name: str
+    player_class_id: int
+
+    def __init__(self, weights: Path = weights_path(DetectorBackend.ONNX), threads: Optional[int] = None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads is not None:
+            options.intra_op_num_threads = threads
+        # One frame at a time through a sequential graph - a second pool would only compete for the cores
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(str(weights), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        # Ultralytics stores the class names in the export's metadata as a dict literal
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map["names"])
+        self.player_class_id = _player_class_id([names[k] for k in sorted(names)])
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        blob, scale, padding = _letterbox(image)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return _decode(output, self.player_class_id, scale, padding, image.shape)
+
+
+class OpenVinoDetector:
+    """The OpenVINO IR export on the CPU plugin, tuned for latency, threads for its inference threads"""
+    request: "openvino.InferRequest"
+    player_class_id: int
+
+    def __init__(self, weights: Path = weights_path(DetectorBackend.OPENVINO), threads: Optional[int] = None):
+        import openvino
+
+        core = openvino.Core()
+        model = core.read_model(weights)
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads is not None:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.request = core.compile_model(model, "CPU", config).create_infer_request()
+        # Ultralytics stores the class names in the IR's runtime info, space separated
+        self.player_class_id = _player_class_id(model.get_rt_info(["model_info", "labels"]).astype(str).split())
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        blob, scale, padding = _letterbox(image)
+        self.request.infer([blob])
+        return _decode(self.request.get_output_tensor(0).data, self.player_class_id, scale, padding, image.shape)
+
+
+BACKENDS = {
+    DetectorBackend.PYTORCH: TorchDetector,
+    DetectorBackend.ONNX: OnnxDetector,
+    DetectorBackend.OPENVINO: OpenVinoDetector,
+}
+
+
+def player_detector(
+    backend: DetectorBackend = DetectorBackend.PYTORCH, threads: Optional[int] = None, weights: Path = WEIGHTS_PATH
+) -> DetectorFactory:
+    """
+    Factory for backend's detector on the export of weights (the .pt file), with threads inference threads
+    (None for the runtime's default, about one per core). Picklable, for ProcessPipeline's child process
+    """
+    return functools.partial(BACKENDS[backend], weights_path(backend, weights), threads)
@@ -0,0 +1,98 @@
+"""
+The camera's own motion between frames, so the background model can follow pans, tilts and zooms
+instead of re-learning. Lucas-Kanade flow of a fixed grid of points is fitted with a RANSAC
+similarity transform (translation, rotation and scale); points on moving objects are outliers.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+GRID = (8, 6)  # points across, down
+MIN_INLIERS = 12
+# Motion below this (pixels at the frame corners) is treated as the camera standing still
+STILL_PX = 0.25
+# While still, the reference frame is refreshed this often so slow scene changes don't break the flow
+MAX_REFERENCE_AGE = 30
+
+
+@dataclass(frozen=True)
+class CameraMotion:
+    matrix: np.ndarray  # 2x3, reference frame pixels to current frame pixels
+    moved: bool
+
+
+def corner_displacement(matrix: np.ndarray, width: int, height: int) -> float:
+    """Largest distance any frame corner moves under matrix"""
+    corners = np.array([[0, 0], [width, 0], [0, height], [width, height]], np.float64)
+    moved = corners @ matrix[:, :2].T + matrix[:, 2]
+    return float(np.abs(moved - corners).max())
+
+
+class EgoMotionEstimator:
+    """
+    Measures each frame against a reference frame. The reference moves on only once the camera has
+    moved, so slow pans add up to a measurable step instead of getting lost below STILL_PX per frame
+    """
+    grid: Tuple[int, int]
+    min_inliers: int
+    still_px: float
+    _reference: Optional[np.ndarray]
+    _reference_age: int
+    _points: Optional[np.ndarray]
+
+    def __init__(self, grid: Tuple[int, int] = GRID, min_inliers: int = MIN_INLIERS, still_px: float = STILL_PX):
+        self.grid = grid
+        self.min_inliers = min_inliers
+        self.still_px = still_px
+        self._reference = None
+        self._reference_age = 0
+        self._points = None
+
+    def reset(self):
+        self._reference = None
+
+    def _grid_points(self, shape: Tuple[int, ...]) -> np.ndarray:
+        if self._points is None:
+            height, width = shape[:2]
+            margin = min(width, height) // 15
+            xs, ys = np.meshgrid(
+                np.linspace(margin, width - margin, self.grid[0]), np.linspace(margin, height - margin, self.grid[1])
+            )
+            self._points = np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.float32).reshape(-1, 1, 2)
+        return self._points
+
+    def update(self, frame: np.ndarray) -> Optional[CameraMotion]:
+        """
+        Motion from the reference frame to frame (grayscale). None on the first frame, after a change of
+        frame size, or when too few points agree - the camera moved too far or the view is featureless
+        """
+        reference = self._reference
+        if reference is None or reference.shape != frame.shape:
+            self._points = None
+            self._rebase(frame)
+            return None
+        points = self._grid_points(frame.shape)
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(reference, frame, points, None, winSize=(15, 15), maxLevel=3)
+        found = status.ravel() == 1
+        matrix = None
+        if found.sum() >= self.min_inliers:
+            matrix, inliers = cv2.estimateAffinePartial2D(
+                points[found], tracked[found], method=cv2.RANSAC, ransacReprojThreshold=1.0
+            )
+        if matrix is None or inliers.sum() < self.min_inliers:
+            self._rebase(frame)
+            return None
+
+        moved = corner_displacement(matrix, frame.shape[1], frame.shape[0]) > self.still_px
+        self._reference_age += 1
+        if moved or self._reference_age >= MAX_REFERENCE_AGE:
+            self._rebase(frame)
+        return CameraMotion(matrix, moved)
+
+    def _rebase(self, frame: np.ndarray):
+        if self._reference is None or self._reference.shape != frame.shape:
+            self._reference = np.empty_like(frame)
+        np.copyto(self._reference, frame)
+        self._reference_age = 0
@@ -0,0 +1,38 @@
+"""
+A one-slot queue between the stages of a tracking loop. The producer never waits: a value the
+consumer hasn't taken yet is replaced, so a slow stage always works on the newest input instead of
+a backlog. Values are numbered like RTSPFeed's frames and taken with the same wait_next pattern.
+"""
+import threading
+from typing import Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LatestValue(Generic[T]):
+    """put from one thread, wait_next from another. One consumer only"""
+    _condition: threading.Condition
+    _value: Optional[T]
+    _seq: int
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._value = None
+        self._seq = 0
+
+    def put(self, value: T) -> int:
+        """Replace the value, returns its seq (from 1)"""
+        with self._condition:
+            self._value = value
+            self._seq += 1
+            self._condition.notify_all()
+            return self._seq
+
+    def wait_next(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Tuple[int, T]]:
+        """
+        Block until a value newer than after_seq is put and return it with its seq. None on timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > after_seq, timeout):
+                return None
+            return self._seq, self._value
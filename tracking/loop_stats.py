@@ -0,0 +1,105 @@
+"""
+Iteration rate and CPU cost of a tracking loop. The loop thread marks each pass and each frame it
+processes; CPU time is the loop thread's own (time.thread_time), so it excludes the feed's decoding.
+Stages of a pipelined loop also record each frame's latency (its age, from capture, as it leaves the
+stage) and the frames they produced that were replaced by newer ones before the next stage took them.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class LoopStats:
+    """Totals since the meter started. Subtract an earlier snapshot with since() for a window"""
+    seconds: float
+    iterations: int
+    frames: int
+    cpu_s: float
+    latency_s: float = 0.0  # summed over frames
+    dropped: int = 0
+
+    def since(self, earlier: "LoopStats") -> "LoopStats":
+        return LoopStats(
+            self.seconds - earlier.seconds,
+            self.iterations - earlier.iterations,
+            self.frames - earlier.frames,
+            self.cpu_s - earlier.cpu_s,
+            self.latency_s - earlier.latency_s,
+            self.dropped - earlier.dropped,
+        )
+
+    @property
+    def iterations_per_s(self) -> float:
+        return self.iterations / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def frames_per_s(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def cpu_per_frame_s(self) -> float:
+        return self.cpu_s / self.frames if self.frames else 0.0
+
+    @property
+    def latency_per_frame_s(self) -> float:
+        return self.latency_s / self.frames if self.frames else 0.0
+
+    @property
+    def dropped_per_s(self) -> float:
+        return self.dropped / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def cpu_load(self) -> float:
+        """Share of one core the loop thread used, 1.0 = busy all the time"""
+        return self.cpu_s / self.seconds if self.seconds > 0 else 0.0
+
+
+class LoopMeter:
+    """
+    pass_started and frame_processed are called from the loop's thread, frames_dropped and snapshot
+    from any. CPU time is accounted up to the start of the latest pass.
+    """
+    _lock: threading.Lock
+    _started_at: float
+    _iterations: int
+    _frames: int
+    _cpu_s: float
+    _cpu_mark: Optional[float]
+    _latency_s: float
+    _dropped: int
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._iterations = 0
+        self._frames = 0
+        self._cpu_s = 0.0
+        self._cpu_mark = None
+        self._latency_s = 0.0
+        self._dropped = 0
+
+    def pass_started(self):
+        cpu = time.thread_time()
+        with self._lock:
+            if self._cpu_mark is not None:
+                self._cpu_s += cpu - self._cpu_mark
+            self._cpu_mark = cpu
+            self._iterations += 1
+
+    def frame_processed(self, latency_s: float = 0.0):
+        with self._lock:
+            self._frames += 1
+            self._latency_s += latency_s
+
+    def frames_dropped(self, count: int):
+        with self._lock:
+            self._dropped += count
+
+    def snapshot(self) -> LoopStats:
+        with self._lock:
+            return LoopStats(
+                time.perf_counter() - self._started_at, self._iterations, self._frames, self._cpu_s,
+                self._latency_s, self._dropped,
+            )
@@ -0,0 +1,215 @@
+"""
+Moving objects from background subtraction. Runs on the feed's downscaled luma output; objects are
+connected components of the foreground mask, filtered and combined with NumPy rather than a Python
+loop over contours. Results are in full frame pixels.
+
+The background model is warped by the camera's own motion (tracking.ego_motion), so panning, tilting
+and zooming don't turn the whole frame into foreground until the model has re-learnt the scene.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_preprocessing import FrameTransform
+from models import TrackingMode
+from tracking.ego_motion import CameraMotion, EgoMotionEstimator
+
+# Objects smaller than this (full frame pixels) are noise
+MIN_OBJECT_AREA = 500
+# Connected-component labelling algorithm - OpenCV's default picks a block-based one for 8-connectivity
+LABELLING_ALGORITHM = cv2.CCL_DEFAULT
+# Learning rate of pixels that don't fit the model (an object passing), relative to the background's
+MISFIT_RATE = 0.1
+# Frames a pixel that doesn't fit the model has to hold still before its new value replaces the background:
+# background uncovered by an object that was there when learning started, or an object that stopped
+STEADY_FRAMES = 20
+
+
+@dataclass(frozen=True)
+class MotionTarget:
+    x: float  # full frame pixels
+    y: float
+    area: float  # the object's bounding box (LARGEST) or the box around all objects (MULTI), full frame pixels
+
+
+class CompensatedBackground:
+    """
+    One Gaussian per pixel: mean, variance and the number of frames learnt (capped at history).
+    Unlike MOG2's mixture the model is plain arrays, so it can be warped to follow the camera; pixels
+    the camera brings into view start over from the current frame. Only used from the tracking loop.
+    """
+    history: int
+    var_threshold: float  # squared distance in variances that makes a pixel foreground, like MOG2's
+    var_threshold_gen: float  # squared distance within which a pixel fits the model and updates its variance
+    var_init: float
+    var_min: float
+    _learnt: bool
+    _mean: Optional[np.ndarray]
+
+    def __init__(
+        self, history: int = 50, var_threshold: float = 50, var_threshold_gen: float = 9,
+        var_init: float = 15.0, var_min: float = 4.0
+    ):
+        self.history = history
+        self.var_threshold = var_threshold
+        self.var_threshold_gen = var_threshold_gen
+        self.var_init = var_init
+        self.var_min = var_min
+        self._learnt = False
+        self._mean = None
+
+    def reset(self):
+        """Forget the scene, the next frame is learnt from scratch"""
+        self._learnt = False
+
+    def _allocate(self, shape: Tuple[int, ...]):
+        self._mean, self._var, self._age = (np.empty(shape, np.float32) for _ in range(3))
+        self._warped = tuple(np.empty(shape, np.float32) for _ in range(3))
+        self._diff, self._dist, self._limit, self._rate = (np.empty(shape, np.float32) for _ in range(4))
+        self._steady = np.zeros(shape, np.float32)  # frames each pixel has held still without fitting the model
+        self._foreground, self._steady_now = np.empty(shape, bool), np.empty(shape, bool)
+        self._mask, self._previous, self._change = (np.empty(shape, np.uint8) for _ in range(3))
+        self._learnt = False
+
+    def warp(self, matrix: np.ndarray, frame: np.ndarray):
+        """Move the model by matrix (2x3, previous frame pixels to frame's)"""
+        if not self._learnt or self._mean.shape != frame.shape:
+            return
+        size = frame.shape[1::-1]
+        mean, var, age = self._warped
+        cv2.warpAffine(self._mean, matrix, size, dst=mean, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        cv2.warpAffine(self._var, matrix, size, dst=var, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        cv2.warpAffine(self._age, matrix, size, dst=age, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        cv2.warpAffine(
+            self._previous, matrix, size, dst=self._change, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+        )
+        self._previous, self._change = self._change, self._previous
+        self._steady.fill(0)
+        self._warped = (self._mean, self._var, self._age)
+        self._mean, self._var, self._age = mean, var, age
+        # Pixels that were (partly) out of view have nothing to compare against yet
+        fresh = np.less(age, 1, out=self._foreground)
+        np.copyto(mean, frame, where=fresh)
+        var[fresh] = self.var_init
+        age[fresh] = 1
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Foreground mask of frame (0/255, a reused buffer), then learn frame into the model"""
+        if self._mean is None or self._mean.shape != frame.shape:
+            self._allocate(frame.shape)
+        if not self._learnt:
+            np.copyto(self._mean, frame)
+            np.copyto(self._previous, frame)
+            self._steady.fill(0)
+            self._var.fill(self.var_init)
+            self._age.fill(1)
+            self._learnt = True
+            self._mask.fill(0)
+            return self._mask
+
+        diff, dist, limit, rate, foreground = self._diff, self._dist, self._limit, self._rate, self._foreground
+        np.subtract(frame, self._mean, out=diff, dtype=np.float32)
+        np.multiply(diff, diff, out=dist)
+        np.multiply(self._var, self.var_threshold, out=limit)
+        np.greater(dist, limit, out=foreground)
+        np.multiply(foreground, 255, out=self._mask, dtype=np.uint8)
+
+        # Running mean over the frames learnt so far, an exponential one over history once full. Pixels that
+        # don't fit the model barely move the mean, so an object passing leaves no ghost, and leave the
+        # variance alone, or where it crossed would stay blind after it left
+        np.multiply(self._var, self.var_threshold_gen, out=limit)
+        misfit = np.greater(dist, limit, out=foreground)
+        np.add(self._age, 1, out=rate)
+        np.reciprocal(rate, out=rate)
+        np.multiply(rate, MISFIT_RATE, out=rate, where=misfit)
+        np.multiply(diff, rate, out=diff)
+        self._mean += diff
+        np.copyto(dist, self._var, where=misfit)
+        np.subtract(dist, self._var, out=dist)
+        np.multiply(dist, rate, out=dist)
+        self._var += dist
+        np.maximum(self._var, self.var_min, out=self._var)
+        self._age += 1
+        np.minimum(self._age, self.history, out=self._age)
+
+        # Misfits that have held still for STEADY_FRAMES are the background now
+        cv2.absdiff(frame, self._previous, dst=self._change)
+        np.copyto(self._previous, frame)
+        np.square(self._change, out=dist, dtype=np.float32)
+        steady = np.less_equal(dist, limit, out=self._steady_now)
+        np.logical_and(steady, misfit, out=steady)
+        np.multiply(self._steady, steady, out=self._steady)
+        self._steady += steady
+        adopted = np.greater_equal(self._steady, STEADY_FRAMES, out=self._steady_now)
+        if adopted.any():
+            np.copyto(self._mean, frame, where=adopted)
+            self._steady[adopted] = 0
+        return self._mask
+
+
+class MotionDetector:
+    background: CompensatedBackground
+    ego_motion: EgoMotionEstimator
+    camera_motion: Optional[CameraMotion]  # measured on the latest frame, None when it couldn't be
+    min_area: float
+    _labels: Optional[np.ndarray]
+
+    def __init__(self, min_area: float = MIN_OBJECT_AREA, history: int = 50, var_threshold: float = 50):
+        self.background = CompensatedBackground(history, var_threshold)
+        self.ego_motion = EgoMotionEstimator()
+        self.camera_motion = None
+        self.min_area = min_area
+        self._labels = None
+
+    def reset(self):
+        """Re-learn the background from the next frame"""
+        self.background.reset()
+        self.ego_motion.reset()
+
+    def foreground(self, frame: np.ndarray) -> np.ndarray:
+        motion = self.camera_motion = self.ego_motion.update(frame)
+        if motion is None:
+            # First frame, or the camera moved further than can be measured
+            self.background.reset()
+        elif motion.moved:
+            self.background.warp(motion.matrix, frame)
+        fg_mask = self.background.apply(frame)
+        return cv2.medianBlur(fg_mask, 3)
+
+    def objects(self, frame: np.ndarray, to_full: FrameTransform) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Update the background model with frame and find the moving objects: boxes (N, 4) x1, y1, x2, y2
+        and pixel areas (N,), both in full frame pixels
+        """
+        mask = self.foreground(frame)
+        if self._labels is None or self._labels.shape != mask.shape:
+            self._labels = np.empty(mask.shape, np.int32)
+        count, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+            mask, 8, cv2.CV_32S, LABELLING_ALGORITHM, labels=self._labels
+        )
+        stats = stats[1:]  # label 0 is the background
+        areas = to_full.area_to_full(stats[:, cv2.CC_STAT_AREA].astype(np.float64))
+        objects = areas > self.min_area
+        x, y, w, h = stats[objects, :4].astype(np.float64).T  # frame pixels
+        x1, y1 = to_full.to_full(x, y)
+        x2, y2 = to_full.to_full(x + w, y + h)
+        return np.stack([x1, y1, x2, y2], axis=1), areas[objects]
+
+    def detect(self, frame: np.ndarray, to_full: FrameTransform, mode: TrackingMode) -> Optional[MotionTarget]:
+        """Update the background model with frame and find what to track, None when nothing moves"""
+        return motion_target(*self.objects(frame, to_full), mode)
+
+
+def motion_target(boxes: np.ndarray, areas: np.ndarray, mode: TrackingMode) -> Optional[MotionTarget]:
+    """What to track among objects (N, 4) x1, y1, x2, y2 with areas (N,), None without any"""
+    if not len(boxes):
+        return None
+    if mode == TrackingMode.LARGEST:
+        x1, y1, x2, y2 = boxes[int(np.argmax(areas))]
+        return MotionTarget((x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) * (y2 - y1))
+    # Average of the objects' box centers, and the box around all of them
+    center_x, center_y = ((boxes[:, :2] + boxes[:, 2:]) / 2).mean(axis=0)
+    union_w, union_h = boxes[:, 2:].max(axis=0) - boxes[:, :2].min(axis=0)
+    return MotionTarget(center_x, center_y, union_w * union_h)
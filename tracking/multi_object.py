@@ -0,0 +1,301 @@
+"""
+Multi-object tracking with persistent ids: a constant-velocity Kalman filter per object, detections
+matched to tracks by linear assignment on an IoU or center-distance cost, and track birth and death.
+Every step is vectorised over all tracks, so a rink full of players costs about as much as a few.
+
+Tracks are confirmed after min_hits detections in a row, so a single spurious detection never reaches
+the camera; confirmed tracks coast on their prediction through up to max_misses missed frames.
+Frames the detector skips can still correct the tracks with propagate, e.g. from tracking.box_flow.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    # scipy comes with ultralytics; the subtraction tracker alone doesn't need it
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+# Noise as fractions of each object's size (its box's longest side)
+MEASUREMENT_STD = 0.05
+ACCELERATION_STD = 3.0  # per second squared
+INITIAL_VELOCITY_STD = 2.0  # per second
+# Time step used when updates come without timestamps
+DEFAULT_DT = 1 / 20
+# A longer gap between updates (tracking paused, feed stalled) starts the tracks over
+MAX_GAP = 1.0
+
+
+class AssignmentCost(str, Enum):
+    IOU = "IOU"  # 1 - IoU of the predicted and detected boxes, for detectors with stable boxes
+    DISTANCE = "DISTANCE"  # center distance over the predicted box's diagonal, for blobs that change shape
+
+
+@dataclass(frozen=True)
+class Tracks:
+    """Tracks after an update, one row each"""
+    ids: np.ndarray  # (N,) int
+    boxes: np.ndarray  # (N, 4) x1, y1, x2, y2
+    velocities: np.ndarray  # (N, 2) box center pixels per second
+    misses: np.ndarray  # (N,) updates since last detected, 0 when detected this update
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def areas(self) -> np.ndarray:
+        return (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) IoU of x1, y1, x2, y2 boxes a (N, 4) and b (M, 4)"""
+    a, b = a[:, None, :], b[None, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-9)
+
+
+def distance_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) distance between the centers of boxes a and b, in diagonals of a"""
+    centers_a = (a[:, :2] + a[:, 2:]) / 2
+    centers_b = (b[:, :2] + b[:, 2:]) / 2
+    diagonals = np.maximum(np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1]), 1e-9)
+    return np.linalg.norm(centers_a[:, None, :] - centers_b[None, :, :], axis=2) / diagonals[:, None]
+
+
+def _assign(cost: np.ndarray) -> np.ndarray:
+    """
+    Minimum cost assignment for cost (N, M) with N <= M, column index for each row. Shortest augmenting
+    paths (the algorithm scipy uses), one row at a time with the column scans vectorised
+    """
+    n, m = cost.shape
+    u, v = np.zeros(n), np.zeros(m)
+    col_for_row, row_for_col = np.full(n, -1), np.full(m, -1)
+    for start in range(n):
+        shortest = np.full(m, np.inf)
+        path = np.full(m, -1)
+        done_cols = np.zeros(m, bool)
+        tree_rows = [start]
+        row, reached, sink = start, 0.0, -1
+        while sink < 0:
+            reduced = reached + cost[row] - u[row] - v
+            better = ~done_cols & (reduced < shortest)
+            path[better] = row
+            shortest[better] = reduced[better]
+            col = int(np.argmin(np.where(done_cols, np.inf, shortest)))
+            reached = shortest[col]
+            done_cols[col] = True
+            if row_for_col[col] < 0:
+                sink = col
+            else:
+                row = row_for_col[col]
+                tree_rows.append(row)
+        # Keep the dual feasible, then flip the path's assignments
+        u[start] += reached
+        others = np.array(tree_rows[1:], int)
+        u[others] += reached - shortest[col_for_row[others]]
+        v[done_cols] -= reached - shortest[done_cols]
+        col = sink
+        while True:
+            row = path[col]
+            row_for_col[col] = row
+            col_for_row[row], col = col, col_for_row[row]
+            if row == start:
+                break
+    return col_for_row
+
+
+def linear_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows and columns of the minimum cost matching of every row or every column, whichever is fewer"""
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    if cost.shape[0] <= cost.shape[1]:
+        return np.arange(cost.shape[0]), _assign(cost)
+    cols = _assign(cost.T)
+    order = np.argsort(cols)
+    return cols[order], order
+
+
+def _measurements(boxes: np.ndarray) -> np.ndarray:
+    """(N, 4) x1, y1, x2, y2 to cx, cy, w, h"""
+    return np.hstack([(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]])
+
+
+def _transition(dt: float) -> Tuple[np.ndarray, np.ndarray]:
+    """State transition and unit process noise (white acceleration) for state cx, cy, w, h and their velocities"""
+    transition = np.eye(8)
+    transition[range(4), range(4, 8)] = dt
+    noise = np.zeros((8, 8))
+    noise[range(4), range(4)] = dt ** 4 / 4
+    noise[range(4), range(4, 8)] = noise[range(4, 8), range(4)] = dt ** 3 / 2
+    noise[range(4, 8), range(4, 8)] = dt ** 2
+    return transition, noise
+
+
+class MultiObjectTracker:
+    """Feed every frame's detections to update. Only used from one tracking loop"""
+    cost: AssignmentCost
+    max_cost: float
+    min_hits: int
+    max_misses: int
+    _next_id: int
+    _last_update: Optional[float]
+    _ids: np.ndarray
+    _state: np.ndarray  # (N, 8) cx, cy, w, h, and their velocities per second
+    _covariance: np.ndarray  # (N, 8, 8)
+    _hits: np.ndarray
+    _misses: np.ndarray
+
+    def __init__(
+        self,
+        cost: AssignmentCost = AssignmentCost.IOU,
+        max_cost: Optional[float] = None,
+        min_hits: int = 3,
+        max_misses: int = 10,
+    ):
+        self.cost = cost
+        # IoU of at least 0.1, or centers within one diagonal of the prediction
+        self.max_cost = max_cost if max_cost is not None else (0.9 if cost == AssignmentCost.IOU else 1.0)
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self._next_id = 1
+        self.reset()
+
+    def reset(self):
+        """Drop every track, ids carry on counting"""
+        self._last_update = None
+        self._ids = np.empty(0, int)
+        self._state = np.empty((0, 8))
+        self._covariance = np.empty((0, 8, 8))
+        self._hits = np.empty(0, int)
+        self._misses = np.empty(0, int)
+
+    def __len__(self) -> int:
+        """Tracks alive, tentative ones included"""
+        return len(self._ids)
+
+    def _boxes(self) -> np.ndarray:
+        centers, sizes = self._state[:, :2], np.maximum(self._state[:, 2:4], 1.0)
+        return np.hstack([centers - sizes / 2, centers + sizes / 2])
+
+    def _scales(self) -> np.ndarray:
+        return np.maximum(self._state[:, 2:4].max(axis=1), 1.0)
+
+    def camera_moved(self, matrix: np.ndarray):
+        """Move every track by a similarity transform (2x3) of the view, e.g. the camera panning or zooming"""
+        linear, offset = matrix[:, :2], matrix[:, 2]
+        scale = np.sqrt(abs(np.linalg.det(linear)))
+        self._state[:, :2] = self._state[:, :2] @ linear.T + offset
+        self._state[:, 4:6] = self._state[:, 4:6] @ linear.T
+        self._state[:, [2, 3, 6, 7]] *= scale
+        self._covariance *= scale ** 2
+
+    def _predict(self, dt: float):
+        transition, noise = _transition(dt)
+        process = (ACCELERATION_STD * self._scales()) ** 2
+        self._state = self._state @ transition.T
+        self._covariance = transition @ self._covariance @ transition.T + process[:, None, None] * noise
+
+    def _correct(self, tracks: np.ndarray, measured: np.ndarray):
+        """Kalman update of tracks (indices) with measured (K, 4) cx, cy, w, h"""
+        state, covariance = self._state[tracks], self._covariance[tracks]
+        measurement_var = (MEASUREMENT_STD * np.maximum(measured[:, 2:4].max(axis=1), 1.0)) ** 2
+        innovation_cov = covariance[:, :4, :4] + measurement_var[:, None, None] * np.eye(4)
+        cross = covariance[:, :, :4]  # P H^T
+        gain = np.linalg.solve(innovation_cov, cross.transpose(0, 2, 1)).transpose(0, 2, 1)
+        innovation = measured - state[:, :4]
+        self._state[tracks] = state + (gain @ innovation[:, :, None])[:, :, 0]
+        self._covariance[tracks] = covariance - gain @ cross.transpose(0, 2, 1)
+
+    def _birth(self, measured: np.ndarray):
+        count = len(measured)
+        scales = np.maximum(measured[:, 2:4].max(axis=1), 1.0)
+        state = np.hstack([measured, np.zeros((count, 4))])
+        std = np.hstack([
+            np.repeat((2 * MEASUREMENT_STD * scales)[:, None], 4, axis=1),
+            np.repeat((INITIAL_VELOCITY_STD * scales)[:, None], 4, axis=1),
+        ])
+        covariance = np.zeros((count, 8, 8))
+        covariance[:, range(8), range(8)] = std ** 2
+        self._ids = np.concatenate([self._ids, np.arange(self._next_id, self._next_id + count)])
+        self._next_id += count
+        self._state = np.concatenate([self._state, state])
+        self._covariance = np.concatenate([self._covariance, covariance])
+        self._hits = np.concatenate([self._hits, np.ones(count, int)])
+        self._misses = np.concatenate([self._misses, np.zeros(count, int)])
+
+    def update(self, boxes: np.ndarray, timestamp: Optional[float] = None) -> Tracks:
+        """
+        Advance every track to timestamp (seconds, e.g. the frame's captured_at), match the frame's
+        detections (N, 4) x1, y1, x2, y2 and return the confirmed tracks. Pass an empty array for a frame
+        without detections
+        """
+        self._advance(timestamp)
+        boxes = np.asarray(boxes, np.float64).reshape(-1, 4)
+        measured = _measurements(boxes)
+
+        matched_tracks = np.empty(0, int)
+        matched_detections = np.empty(0, int)
+        if len(self._ids) and len(boxes):
+            predicted = self._boxes()
+            if self.cost == AssignmentCost.IOU:
+                cost = 1 - iou_matrix(predicted, boxes)
+            else:
+                cost = distance_matrix(predicted, boxes)
+            rows, cols = linear_assignment(cost)
+            close = cost[rows, cols] <= self.max_cost
+            matched_tracks, matched_detections = rows[close], cols[close]
+            self._correct(matched_tracks, measured[matched_detections])
+
+        detected = np.zeros(len(self._ids), bool)
+        detected[matched_tracks] = True
+        self._hits[detected] += 1
+        self._misses[detected] = 0
+        self._misses[~detected] += 1
+        # Tentative tracks die on their first miss, confirmed ones once they have coasted too long
+        alive = np.where(self._hits >= self.min_hits, self._misses <= self.max_misses, self._misses == 0)
+        if not alive.all():
+            self._ids, self._state, self._covariance = self._ids[alive], self._state[alive], self._covariance[alive]
+            self._hits, self._misses = self._hits[alive], self._misses[alive]
+
+        unmatched = np.ones(len(boxes), bool)
+        unmatched[matched_detections] = False
+        if unmatched.any():
+            self._birth(measured[unmatched])
+        return self.tracks()
+
+    def propagate(self, ids: np.ndarray, boxes: np.ndarray, timestamp: Optional[float] = None) -> Tracks:
+        """
+        Advance every track to timestamp like update, correcting the tracks with ids by boxes (N, 4)
+        carried over from their last position (e.g. by optical flow) rather than detected. A frame
+        without detection neither counts towards confirming or dropping tracks nor starts any
+        """
+        self._advance(timestamp)
+        positions = np.searchsorted(self._ids, ids)  # ids are kept in ascending order
+        alive = positions < len(self._ids)
+        alive[alive] = self._ids[positions[alive]] == np.asarray(ids)[alive]
+        if alive.any():
+            boxes = np.asarray(boxes, np.float64).reshape(-1, 4)
+            self._correct(positions[alive], _measurements(boxes[alive]))
+        return self.tracks()
+
+    def _advance(self, timestamp: Optional[float]):
+        dt = DEFAULT_DT
+        if timestamp is not None:
+            if self._last_update is not None and timestamp > self._last_update:
+                dt = timestamp - self._last_update
+            if dt > MAX_GAP:
+                self.reset()
+            self._last_update = timestamp
+        if len(self._ids):
+            self._predict(dt)
+
+    def tracks(self, tentative: bool = False) -> Tracks:
+        """The confirmed tracks, or every track alive with tentative"""
+        shown = np.ones(len(self._ids), bool) if tentative else self._hits >= self.min_hits
+        return Tracks(self._ids[shown], self._boxes()[shown], self._state[shown, 4:6], self._misses[shown])
@@ -1,111 +1,114 @@
 import threading
 import time
-from typing import Optional
+from typing import Optional, Union
 
-import cv2
-import numpy as np
-
-from cam_controller import PTZController
+from feed_hub import FeedSubscription
+from frame_preprocessing import FrameOutput
 from rtsp_feed import RTSPFeed
+from tracking.control import CameraController, proportional_velocity, send_command
+from tracking.loop_stats import LoopMeter, LoopStats
+from tracking.motion_detection import MotionDetector, motion_target
+from tracking.multi_object import AssignmentCost, MultiObjectTracker
 from models import TrackingMode, Direction, ZoomDirection
 
+# MOG2 only needs a small luma image - the feed downscales and converts it in its reader thread
+MOTION_OUTPUT = "motion"
+MOTION_SIZE = 640
+
 
 class MotionTracker:
-    rtsp_feed: RTSPFeed
+    rtsp_feed: Union[RTSPFeed, FeedSubscription]
     track_mode: TrackingMode
-    cam_control: PTZController
+    cam_control: CameraController
     track_thread_created: bool
     motion_cool_down_ns: int
     move_scale: float
     min_fill: float
     max_fill: float
-    back_sub: Optional[cv2.BackgroundSubtractorMOG2]
+    motion_detector: Optional[MotionDetector]
+    object_tracker: MultiObjectTracker  # follows the moving objects so one stray blob can't steer the camera
+    velocity_control: bool  # drive continuous pan/tilt/zoom speed instead of position steps
+    velocity_gain: float
+    loop_meter: LoopMeter
     _tracking_active: threading.Event = threading.Event()
 
-    def __init__(self, feed: RTSPFeed, mode: TrackingMode, cam_controller: PTZController):
+    def __init__(self, feed: Union[RTSPFeed, FeedSubscription], mode: TrackingMode, cam_controller: CameraController):
         self.rtsp_feed = feed
+        self.rtsp_feed.add_output(FrameOutput(MOTION_OUTPUT, max_side=MOTION_SIZE, grayscale=True))
         self.track_mode = mode
         self.cam_control = cam_controller
         self.track_thread_created = False
-        self.back_sub = None
+        self.motion_detector = None
+        # Blobs change shape from frame to frame, their centers are steadier than their boxes
+        self.object_tracker = MultiObjectTracker(AssignmentCost.DISTANCE)
 
         self.motion_cool_down_ns = 500_000_000  # 500ms -> 0.5s
         self.move_scale = 0.1  # proportional control factor
         self.min_fill = 0.10  # if object(s) < 10% of frame → zoom in
         self.max_fill = 0.40  # if object(s) > 40% of frame → zoom out
+        self.velocity_control = False
+        self.velocity_gain = 0.5
+        self.loop_meter = LoopMeter()
 
     def is_tracking(self) -> bool:
         return self._tracking_active.is_set()
 
+    def loop_stats(self) -> LoopStats:
+        """Tracking loop passes, processed frames and loop thread CPU time since tracking was created"""
+        return self.loop_meter.snapshot()
+
     def _configure_tracking(self):
         self.rtsp_feed.start()
-        time.sleep(0.5)
-        ret, frame = self.rtsp_feed.read()
-        if not ret:
+        feed_frame = self.rtsp_feed.wait_next(timeout=5.0)
+        if feed_frame is None:
             print("Failed to read from video source")
             return
+        frame = feed_frame.image
 
         self.frame_h, self.frame_w = frame.shape[:2]
         self.center_x, self.center_y = self.frame_w // 2, self.frame_h // 2
         self.frame_area = self.frame_w * self.frame_h
 
-        self.back_sub = cv2.createBackgroundSubtractorMOG2(
-            history=50, varThreshold=50, detectShadows=False
-        )
+        # Follows the camera's own moves, the background model only starts over when it loses the scene
+        self.motion_detector = MotionDetector()
 
     def _tracking_loop(self, tracking_activation_event: threading.Event):
-        camera_moved = False
         last_move_ns: int = time.perf_counter_ns()
+        last_seq = 0
         while True:
+            # Every wait below blocks - the loop only runs for a new frame or the end of a cooldown
             tracking_activation_event.wait()
-            if time.perf_counter_ns() - last_move_ns < self.motion_cool_down_ns:
+            self.loop_meter.pass_started()
+            cool_down_left_ns = self.motion_cool_down_ns - (time.perf_counter_ns() - last_move_ns)
+            if not self.velocity_control and cool_down_left_ns > 0:
+                # Let the camera settle after a step move, frames decoded meanwhile are skipped
+                time.sleep(cool_down_left_ns / 1e9)
+                continue
+            # Each frame is processed once - blocks until the decoder delivers a newer one
+            feed_frame = self.rtsp_feed.wait_next(last_seq, timeout=self.rtsp_feed.stale_after)
+            if feed_frame is None:
+                if not self.rtsp_feed.is_running:
+                    break
+                print("Video feed stalled")
+                if self.velocity_control:
+                    self.stop_camera()
                 continue
-            ret, frame = self.rtsp_feed.read()
-            if not ret:
-                break
-
-            # Apply background subtraction
-            fg_mask = self.back_sub.apply(frame)
-            # Threshold and clean up mask
-            _, thresh = cv2.threshold(fg_mask, 200, 255, cv2.THRESH_BINARY)
-            thresh = cv2.medianBlur(thresh, 5)
-            # Get contours of moving things
-            contours, _ = cv2.findContours(
-                thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
-
-            tracked_obj_x, tracked_obj_y = None, None
-            total_area = 0
-
-            if contours:
-                if self.track_mode == TrackingMode.LARGEST:
-                    # Pick the largest moving object
-                    largest = max(contours, key=cv2.contourArea)
-                    if cv2.contourArea(largest) > 500:  # ignore small noise
-                        x, y, w, h = cv2.boundingRect(largest)
-                        tracked_obj_x, tracked_obj_y = x + w // 2, y + h // 2
-                        total_area = w * h
-
-                elif self.track_mode == TrackingMode.MULTI:
-                    # Track all significant moving objects
-                    centroids = []
-                    boxes = []
-                    for c in contours:
-                        if cv2.contourArea(c) > 500:
-                            x, y, w, h = cv2.boundingRect(c)
-                            centroids.append((x + w // 2, y + h // 2))
-                            boxes.append((x, y, w, h))
-
-                    if centroids:
-                        # Average centroid
-                        tracked_obj_x = int(np.mean([c[0] for c in centroids]))
-                        tracked_obj_y = int(np.mean([c[1] for c in centroids]))
-                        # Compute bounding box around all objects
-                        min_x = min([b[0] for b in boxes])
-                        min_y = min([b[1] for b in boxes])
-                        max_x = max([b[0] + b[2] for b in boxes])
-                        max_y = max([b[1] + b[3] for b in boxes])
-                        total_area = (max_x - min_x) * (max_y - min_y)
+            last_seq = feed_frame.seq
+            self.loop_meter.frame_processed()
+            camera_moved = False
+            frame = feed_frame.output(MOTION_OUTPUT)
+            to_full = feed_frame.transform(MOTION_OUTPUT)
+            boxes, _ = self.motion_detector.objects(frame, to_full)
+            camera_motion = self.motion_detector.camera_motion
+            if camera_motion is None:
+                # The background model is starting over, positions from before can't be related to this frame
+                self.object_tracker.reset()
+            elif camera_motion.moved:
+                self.object_tracker.camera_moved(to_full.matrix_to_full(camera_motion.matrix))
+            tracks = self.object_tracker.update(boxes, feed_frame.captured_at)
+            target = motion_target(tracks.boxes, tracks.areas(), self.track_mode)
+            tracked_obj_x, tracked_obj_y = (None, None) if target is None else (target.x, target.y)
+            total_area = 0 if target is None else target.area
 
             if tracked_obj_x is not None and tracked_obj_y is not None:
                 # Compute offset from center
@@ -116,6 +119,10 @@ class MotionTracker:
                 offset_x = dx / self.frame_w
                 offset_y = dy / self.frame_h
 
+                if self.velocity_control:
+                    self.drive_camera(offset_x, offset_y, total_area / self.frame_area)
+                    continue
+
                 # Move camera proportionally
                 if abs(offset_x) > 0.05:  # deadzone
                     direction = Direction.RIGHT if offset_x > 0 else Direction.LEFT
@@ -142,25 +149,47 @@ class MotionTracker:
                         self.zoom_camera(ZoomDirection.OUT, steps)
                         camera_moved = True
 
+            elif self.velocity_control:
+                self.stop_camera()
+
             if camera_moved:
                 last_move_ns = time.perf_counter_ns()
 
     def move_camera(self, direction: Direction, amount: float):
         if direction == Direction.LEFT:
-            self.cam_control.move_pan(1, amount)
+            send_command(self.cam_control, self.cam_control.move_pan, 1, amount)
         elif direction == Direction.RIGHT:
-            self.cam_control.move_pan(-1, amount)
+            send_command(self.cam_control, self.cam_control.move_pan, -1, amount)
 
         elif direction == Direction.DOWN:
-            self.cam_control.move_tilt(1, amount)
+            send_command(self.cam_control, self.cam_control.move_tilt, 1, amount)
         elif direction == Direction.UP:
-            self.cam_control.move_tilt(-1, amount)
+            send_command(self.cam_control, self.cam_control.move_tilt, -1, amount)
+
+    def drive_camera(self, offset_x: float, offset_y: float, fill_ratio: float):
+        """Velocity mode - camera speed proportional to the offset from center (fraction of frame size)"""
+        # offsets are +-0.5 at the frame edge, the 5% deadzone matches the stepped control
+        pan_velocity = proportional_velocity(-offset_x * 2, 0.1, self.velocity_gain)
+        tilt_velocity = proportional_velocity(offset_y * 2, 0.1, self.velocity_gain)
+        send_command(self.cam_control, self.cam_control.start_pan_tilt, pan_velocity, tilt_velocity)
+
+        if fill_ratio < self.min_fill:
+            zoom_velocity = (self.min_fill - fill_ratio) * 2 * self.velocity_gain
+        elif fill_ratio > self.max_fill:
+            zoom_velocity = (self.max_fill - fill_ratio) * 2 * self.velocity_gain
+        else:
+            zoom_velocity = 0.0
+        send_command(self.cam_control, self.cam_control.start_zoom, zoom_velocity)
+
+    def stop_camera(self):
+        send_command(self.cam_control, self.cam_control.stop_pan_tilt)
+        send_command(self.cam_control, self.cam_control.stop_zoom)
 
     def zoom_camera(self, direction: ZoomDirection, amount: int):
         if direction == ZoomDirection.IN:
-            self.cam_control.move_zoom(1, amount)
+            send_command(self.cam_control, self.cam_control.move_zoom, 1, amount)
         else:
-            self.cam_control.move_zoom(-1, amount)
+            send_command(self.cam_control, self.cam_control.move_zoom, -1, amount)
 
     def start_tracking(self):
 
@@ -180,3 +209,5 @@ class MotionTracker:
     def stop_tracking(self):
         if self._tracking_active.isSet():
             self._tracking_active.clear()
+            if self.velocity_control:
+                self.stop_camera()
@@ -1,27 +1,77 @@
+import math
 import threading
 import time
-from pathlib import Path
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 
-from cam_controller import PTZController
+from feed_hub import FeedSubscription
+from frame_preprocessing import FrameOutput
 from models import TrackingMode, ZoomDirection
-from rtsp_feed import RTSPFeed
+from process_pipeline import DetectorFactory, ProcessPipeline
+from rtsp_feed import FeedFrame, RTSPFeed
+from tracking.box_flow import BoxFlow
+from tracking.detector_backends import DETECT_SIZE, TorchDetector
+from tracking.control import CameraController, proportional_velocity, send_command
+from tracking.latest_value import LatestValue
+from tracking.loop_stats import LoopMeter, LoopStats
+from tracking.multi_object import AssignmentCost, MultiObjectTracker, Tracks
 
 
-MODEL_PATH = Path(__file__).parent.joinpath("yolo_weights.pt")
+# YOLO letterboxes to 640 anyway - the feed resizes in its reader thread instead of the tracking loop
+DETECT_OUTPUT = "detect"
+# A pipeline's first detections wait on both child processes starting and loading the model
+PIPELINE_START_TIMEOUT = 60.0
+# Stages of the tracking loop: the feed's decoding, detection and tracking, and camera commands
+CAPTURE_STAGE = "capture"
+INFERENCE_STAGE = "inference"
+CONTROL_STAGE = "control"
+
+
+@dataclass(frozen=True)
+class TrackedFrame:
+    """The inference stage's output for one frame"""
+    seq: int
+    captured_at: float
+    taken_at: float  # time.perf_counter() when inference took the frame
+    tracks: Tracks
+    detected: bool  # False when the detector skipped the frame and the boxes were carried over by optical flow
+
+    def age(self) -> float:
+        return time.perf_counter() - self.captured_at
+
+
+def detection_pipeline(
+    url: str, low_latency: bool = False, detector_factory: DetectorFactory = TorchDetector
+) -> ProcessPipeline:
+    """
+    Decoding and YOLO each in their own process, for boxes with cores to spare. Pass as a tracker's feed.
+    detector_factory is built in the detection process, e.g. tracking.detector_backends.player_detector
+    """
+    output = FrameOutput(DETECT_OUTPUT, max_side=DETECT_SIZE)
+    return ProcessPipeline(url, detector_factory, output, low_latency=low_latency)
 
 
 class MotionTracker:
-    rtsp_feed: RTSPFeed
-    cam_control: PTZController
+    """
+    Tracking runs as a pipeline of stages: the feed decodes on its own thread (or a ProcessPipeline's
+    processes), an inference thread detects on each newest frame and updates the tracks, and a control
+    thread sends camera commands for the newest tracks. Each stage hands over through a one-slot
+    latest-value queue, so a blocking camera round trip never holds up detection and a slow detector
+    never queues up stale frames.
+    """
+    rtsp_feed: Union[RTSPFeed, FeedSubscription, ProcessPipeline]
+    cam_control: CameraController
     track_thread_created: bool
     _activate_tracking: threading.Event = threading.Event()
-    detector: YOLO
-    player_class_id: int
+    detector_factory: DetectorFactory
+    # image -> (boxes, confidences) from detector_factory, None when a ProcessPipeline detects
+    detector: Optional[Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]]
+    object_tracker: MultiObjectTracker  # players with ids, so one false detection can't steer the camera
+    stage_meters: Dict[str, LoopMeter]
+    _targets: LatestValue[TrackedFrame]  # inference -> control
 
     # Deviation sensitivities - how far to move for a pixel deviation
     pan_sensitivity: float
@@ -36,10 +86,40 @@ class MotionTracker:
     pan_dead_zone: int
     tilt_dead_zone: int
 
-    def __init__(self, feed: RTSPFeed, mode: TrackingMode, cam_controller: PTZController):
+    # Velocity mode - drive continuous pan/tilt/zoom speed instead of position steps
+    velocity_control: bool
+    velocity_gain: float
+
+    # Detector skipping - detect every detect_every frames, carrying the boxes over by optical flow in between.
+    # detect_every follows the detector's measured cost so detection takes about detect_share of the time,
+    # but a frame is detected on at least every max_detect_interval seconds so new players are picked up
+    detector_skipping: bool
+    detect_share: float
+    max_detect_interval: float
+    detect_every: int
+    box_flow: BoxFlow
+    _detect_s: Optional[float]  # smoothed time the detector takes
+    _frame_interval: Optional[float]  # smoothed time between the feed's frames
+    _last_frame: Optional[Tuple[int, float]]  # seq, captured_at
+    _detected: Tuple[int, float]  # seq, captured_at of the latest frame detected on
+
+    def __init__(
+        self,
+        feed: Union[RTSPFeed, FeedSubscription, ProcessPipeline],
+        mode: TrackingMode,
+        cam_controller: CameraController,
+        detector_factory: DetectorFactory = TorchDetector,
+    ):
         self.rtsp_feed = feed
+        if not isinstance(feed, ProcessPipeline):
+            self.rtsp_feed.add_output(FrameOutput(DETECT_OUTPUT, max_side=DETECT_SIZE))
         self.cam_control = cam_controller
         self.track_thread_created = False
+        self.detector_factory = detector_factory
+        self.detector = None
+        self.object_tracker = MultiObjectTracker(AssignmentCost.IOU)
+        self.stage_meters = {stage: LoopMeter() for stage in (CAPTURE_STAGE, INFERENCE_STAGE, CONTROL_STAGE)}
+        self._targets = LatestValue()
 
         self.pan_sensitivity = 0.03
         self.tilt_sensitivity = 0.03
@@ -48,99 +128,212 @@ class MotionTracker:
         self.zoom_out_threshold = 0.6
         self.pan_dead_zone = 125
         self.tilt_dead_zone = 125
+        self.velocity_control = False
+        self.velocity_gain = 0.5
+        self.detector_skipping = False
+        self.detect_share = 0.5
+        self.max_detect_interval = 0.5
+        self.detect_every = 1
+        self.box_flow = BoxFlow()
+        self._detect_s = None
+        self._frame_interval = None
+        self._last_frame = None
+        self._detected = (0, 0.0)
 
     def is_tracking(self) -> bool:
         return self._activate_tracking.is_set()
 
+    def stage_stats(self) -> Dict[str, LoopStats]:
+        """
+        Per stage since tracking was created: frames out, latency (frame age as it leaves the stage),
+        frames replaced before the next stage took them and thread CPU time. Capture runs in the feed,
+        so only its frames, drops and latency are known
+        """
+        return {stage: meter.snapshot() for stage, meter in self.stage_meters.items()}
+
     def _configure_tracking(self):
         self.rtsp_feed.start()
-        time.sleep(5)
-        ret, frame = self.rtsp_feed.read()
-        if not ret:
-            print("Failed to read from video source")
-            return
-        self.frame_h, self.frame_w = frame.shape[:2]
+        if isinstance(self.rtsp_feed, ProcessPipeline):
+            detections = self.rtsp_feed.wait_next(timeout=PIPELINE_START_TIMEOUT)
+            if detections is None:
+                print("Failed to read from video source")
+                return
+            self.frame_w, self.frame_h = detections.frame_size
+        else:
+            feed_frame = self.rtsp_feed.wait_next(timeout=5.0)
+            if feed_frame is None:
+                print("Failed to read from video source")
+                return
+            self.frame_h, self.frame_w = feed_frame.image.shape[:2]
+            self.detector = self.detector_factory()
         self.frame_center_x = self.frame_w / 2
         self.frame_center_y = self.frame_h / 2
         self.frame_area = self.frame_w * self.frame_h
-        self.detector = YOLO(MODEL_PATH)
-        class_names = self.detector.names
-        self.player_class_id = [k for k, v in class_names.items() if v == "player"][0]
 
-    def _tracking_loop(self, activate_tracking_event: threading.Event):
+    def _next_tracks(self, after_seq: int) -> Optional[TrackedFrame]:
+        """
+        Tracks on the next frame after after_seq, from players detected here or by the pipeline's
+        inference process. With detector_skipping, frames between detections are tracked by optical flow
+        """
+        if isinstance(self.rtsp_feed, ProcessPipeline):
+            detections = self.rtsp_feed.wait_next(after_seq, timeout=self.rtsp_feed.stale_after)
+            if detections is None:
+                return None
+            tracks = self.object_tracker.update(detections.boxes, detections.captured_at)
+            return TrackedFrame(detections.seq, detections.captured_at, detections.taken_at, tracks, True)
+
+        feed_frame = self.rtsp_feed.wait_next(after_seq, timeout=self.rtsp_feed.stale_after)
+        if feed_frame is None:
+            return None
+        taken_at = time.perf_counter()
+        image, transform = feed_frame.output(DETECT_OUTPUT), feed_frame.transform(DETECT_OUTPUT)
+        if not self._detection_due(feed_frame):
+            ids, boxes = self.box_flow.propagate(image, feed_frame.captured_at)
+            tracks = self.object_tracker.propagate(ids, transform.boxes_to_full(boxes), feed_frame.captured_at)
+            return TrackedFrame(feed_frame.seq, feed_frame.captured_at, taken_at, tracks, False)
+
+        # The view is into the feed's ring, which a slow detector outlasts - detect and anchor on the same pixels
+        image = image.copy()
+        boxes, _ = self.detector(image)
+        detect_s = time.perf_counter() - taken_at
+        self._detect_s = detect_s if self._detect_s is None else 0.8 * self._detect_s + 0.2 * detect_s
+        self._detected = (feed_frame.seq, feed_frame.captured_at)
+        tracks = self.object_tracker.update(transform.boxes_to_full(boxes), feed_frame.captured_at)
+        # Re-anchor the flow on every track, tentative ones too so the next detections can confirm them
+        followed = self.object_tracker.tracks(tentative=True)
+        self.box_flow.anchor(
+            image, feed_frame.captured_at, followed.ids, transform.boxes_to_output(followed.boxes),
+            followed.velocities / [transform.scale_x, transform.scale_y],
+        )
+        return TrackedFrame(feed_frame.seq, feed_frame.captured_at, taken_at, tracks, True)
+
+    def _detection_due(self, feed_frame: FeedFrame) -> bool:
+        """Whether to detect on feed_frame or carry the boxes over, adapting detect_every to the detector's cost"""
+        if self._last_frame is not None and feed_frame.seq > self._last_frame[0]:
+            interval = (feed_frame.captured_at - self._last_frame[1]) / (feed_frame.seq - self._last_frame[0])
+            self._frame_interval = (
+                interval if self._frame_interval is None else 0.9 * self._frame_interval + 0.1 * interval
+            )
+        self._last_frame = (feed_frame.seq, feed_frame.captured_at)
+        if not self.detector_skipping or self._detect_s is None or not self._frame_interval:
+            self.detect_every = 1
+            return True
+        self.detect_every = max(1, math.ceil(self._detect_s / (self.detect_share * self._frame_interval)))
+        detected_seq, detected_at = self._detected
+        return (
+            feed_frame.seq - detected_seq >= self.detect_every
+            or feed_frame.captured_at - detected_at >= self.max_detect_interval
+        )
+
+    def _inference_loop(self, activate_tracking_event: threading.Event):
+        """Inference stage: track the players on each newest frame and hand the tracks to the control stage"""
+        capture, inference = self.stage_meters[CAPTURE_STAGE], self.stage_meters[INFERENCE_STAGE]
+        last_seq = 0
+        while True:
+            activate_tracking_event.wait()
+            inference.pass_started()
+            # Each frame is tracked once - blocks until the decoder delivers a newer one
+            tracked = self._next_tracks(last_seq)
+            if tracked is None:
+                if not self.rtsp_feed.is_running:
+                    activate_tracking_event.clear()
+                    continue
+                print("Video feed stalled")
+                continue
+            if last_seq:
+                # Decoded while inference was busy, the feed only keeps the newest frame
+                capture.frames_dropped(tracked.seq - last_seq - 1)
+            capture.frame_processed(tracked.taken_at - tracked.captured_at)
+            last_seq = tracked.seq
+            self._targets.put(tracked)
+            inference.frame_processed(tracked.age())
+
+    def _control_loop(self, activate_tracking_event: threading.Event):
+        """Control stage: camera commands for the newest tracks, a slow camera only delays the next command"""
+        inference, control = self.stage_meters[INFERENCE_STAGE], self.stage_meters[CONTROL_STAGE]
+        last_seq = 0
         while True:
             activate_tracking_event.wait()
-            ret, frame = self.rtsp_feed.read()
-            if not ret:
-                activate_tracking_event.clear()
+            control.pass_started()
+            target = self._targets.wait_next(last_seq, timeout=self.rtsp_feed.stale_after)
+            if target is None:
+                # No new detections - the feed or the detector has stalled
+                if self.velocity_control:
+                    self._stop_camera()
                 continue
-            detection_results = self.detector(frame, conf=0.8, iou=0.4, verbose=False)
-
-            player_centroids = []
-            player_bbox_widths = []
-            for r in detection_results:
-                boxes = r.boxes.xyxy.cpu().numpy()  # Bounding boxes (x1, y1, x2, y2)
-                confs = r.boxes.conf.cpu().numpy()
-                class_ids = r.boxes.cls.cpu().numpy()
-
-                for idx, box in enumerate(boxes):
-                    conf = confs[idx]
-                    class_id = class_ids[idx]
-
-                    if class_id == self.player_class_id:
-                        x1, y1, x2, y2 = map(int, box)
-                        # Get centroid of the player's bounding box
-                        centroid_x = (x1 + x2) / 2
-                        centroid_y = (y1 + y2) / 2
-                        player_centroids.append((centroid_x, centroid_y))
-                        player_bbox_widths.append(x2 - x1)
-
-                if player_centroids:
-                    # Calculate the average centroid of all detected players
-                    avg_centroid_x = np.mean([c[0] for c in player_centroids])
-                    avg_centroid_y = np.mean([c[1] for c in player_centroids])
-
-                    # Calculate combined bounding box area
-                    centroid_array = np.array(player_centroids)
-                    min_coords = np.min(centroid_array, axis=0)
-                    max_coords = np.max(centroid_array, axis=0)
-                    total_area = (max_coords[0] - min_coords[0]) * (max_coords[1] - min_coords[1])
-
-                    # Calculate deviation from frame center
-                    delta_x = avg_centroid_x - self.frame_center_x
-                    delta_y = avg_centroid_y - self.frame_center_y
-
-                    # Move to correct for delta
-                    if abs(delta_x) > self.pan_dead_zone and abs(delta_y) > self.tilt_dead_zone:
-                        # Needs to be a composite correction
-                        self._move_camera(
-                            (delta_x*-1*self.pan_sensitivity, delta_y*self.tilt_sensitivity)
-                        )
-                    elif abs(delta_x) > self.pan_dead_zone:
-                        # Need to correct pan only
-                        self._move_camera(
-                            (delta_x*-1*self.pan_sensitivity,0)
-                        )
-                    elif abs(delta_y) > self.tilt_dead_zone:
-                        # Need to correct tilt only
-                        self._move_camera(
-                            (0,delta_y*self.tilt_sensitivity)
-                        )
-
-                    # Zoom to correct for under or overfill
-                    fill_ratio = total_area / self.frame_area
-                    if fill_ratio < self.zoom_in_threshold:
-                        # Need to zoom in
-                        self._zoom_camera(
-                            ZoomDirection.IN,
-                            max(1, int((fill_ratio - self.zoom_in_threshold) * self.zoom_sensitivity))
-                        )
-                    elif fill_ratio > self.zoom_out_threshold:
-                        # Need to zoom out
-                        self._zoom_camera(
-                            ZoomDirection.OUT,
-                            max(1, int((self.zoom_out_threshold - fill_ratio) * self.zoom_sensitivity))
-                        )
+            seq, tracked = target
+            inference.frames_dropped(seq - last_seq - 1)
+            last_seq = seq
+            if tracked.age() > self.rtsp_feed.stale_after:
+                continue  # Left over from before tracking was paused
+            self._steer(tracked.tracks)
+            control.frame_processed(tracked.age())
+
+    def _steer(self, tracks: Tracks):
+        """Camera commands that bring the tracked players to the frame center"""
+        player_centroids = []
+        player_bbox_widths = []
+        for box in tracks.boxes:  # Full frame (x1, y1, x2, y2)
+            x1, y1, x2, y2 = map(int, box)
+            # Get centroid of the player's bounding box
+            centroid_x = (x1 + x2) / 2
+            centroid_y = (y1 + y2) / 2
+            player_centroids.append((centroid_x, centroid_y))
+            player_bbox_widths.append(x2 - x1)
+
+        if player_centroids:
+            # Calculate the average centroid of all detected players
+            avg_centroid_x = np.mean([c[0] for c in player_centroids])
+            avg_centroid_y = np.mean([c[1] for c in player_centroids])
+
+            # Calculate combined bounding box area
+            centroid_array = np.array(player_centroids)
+            min_coords = np.min(centroid_array, axis=0)
+            max_coords = np.max(centroid_array, axis=0)
+            total_area = (max_coords[0] - min_coords[0]) * (max_coords[1] - min_coords[1])
+
+            # Calculate deviation from frame center
+            delta_x = avg_centroid_x - self.frame_center_x
+            delta_y = avg_centroid_y - self.frame_center_y
+
+            if self.velocity_control:
+                self._drive_camera(delta_x, delta_y, total_area / self.frame_area)
+                return
+
+            # Move to correct for delta
+            if abs(delta_x) > self.pan_dead_zone and abs(delta_y) > self.tilt_dead_zone:
+                # Needs to be a composite correction
+                self._move_camera(
+                    (delta_x*-1*self.pan_sensitivity, delta_y*self.tilt_sensitivity)
+                )
+            elif abs(delta_x) > self.pan_dead_zone:
+                # Need to correct pan only
+                self._move_camera(
+                    (delta_x*-1*self.pan_sensitivity,0)
+                )
+            elif abs(delta_y) > self.tilt_dead_zone:
+                # Need to correct tilt only
+                self._move_camera(
+                    (0,delta_y*self.tilt_sensitivity)
+                )
+
+            # Zoom to correct for under or overfill
+            fill_ratio = total_area / self.frame_area
+            if fill_ratio < self.zoom_in_threshold:
+                # Need to zoom in
+                self._zoom_camera(
+                    ZoomDirection.IN,
+                    max(1, int((fill_ratio - self.zoom_in_threshold) * self.zoom_sensitivity))
+                )
+            elif fill_ratio > self.zoom_out_threshold:
+                # Need to zoom out
+                self._zoom_camera(
+                    ZoomDirection.OUT,
+                    max(1, int((self.zoom_out_threshold - fill_ratio) * self.zoom_sensitivity))
+                )
+
+        if self.velocity_control and not player_centroids:
+            self._stop_camera()
 
     def _move_camera(self, amounts: Tuple[float, float]):
         """
@@ -148,7 +341,7 @@ class MotionTracker:
         amounts[1] - tilt direction and step size (negative is move up by amount)
         """
         if abs(amounts[0]) > 0 and abs(amounts[1]) > 0:
-            self.cam_control.move_composite(
+            send_command(self.cam_control, self.cam_control.move_composite,
                 pan_dir=-1 if amounts[0] < 0 else 1,
                 tilt_dir=-1 if amounts[1] < 0 else 1,
                 pan_amount=abs(amounts[0]),
@@ -157,28 +350,51 @@ class MotionTracker:
         else:
             if amounts[0] < 0:
                 # Move Right
-                self.cam_control.move_pan(-1, abs(amounts[0]))
+                send_command(self.cam_control, self.cam_control.move_pan, -1, abs(amounts[0]))
             elif amounts[0] > 0:
                 # Move Left
-                self.cam_control.move_pan(1, amounts[0])
+                send_command(self.cam_control, self.cam_control.move_pan, 1, amounts[0])
 
             elif amounts[1] < 0:
                 # Move Up
-                self.cam_control.move_tilt(-1, abs(amounts[1]))
+                send_command(self.cam_control, self.cam_control.move_tilt, -1, abs(amounts[1]))
             elif amounts[1] > 0:
                 # Move Down
-                self.cam_control.move_tilt(1, amounts[1])
+                send_command(self.cam_control, self.cam_control.move_tilt, 1, amounts[1])
+
+    def _drive_camera(self, delta_x: float, delta_y: float, fill_ratio: float):
+        """Velocity mode - camera speed proportional to the deviation from frame center"""
+        pan_velocity = proportional_velocity(
+            -delta_x / self.frame_center_x, self.pan_dead_zone / self.frame_center_x, self.velocity_gain
+        )
+        tilt_velocity = proportional_velocity(
+            delta_y / self.frame_center_y, self.tilt_dead_zone / self.frame_center_y, self.velocity_gain
+        )
+        send_command(self.cam_control, self.cam_control.start_pan_tilt, pan_velocity, tilt_velocity)
+
+        if fill_ratio < self.zoom_in_threshold:
+            zoom_velocity = (self.zoom_in_threshold - fill_ratio) * self.velocity_gain
+        elif fill_ratio > self.zoom_out_threshold:
+            zoom_velocity = (self.zoom_out_threshold - fill_ratio) * self.velocity_gain
+        else:
+            zoom_velocity = 0.0
+        send_command(self.cam_control, self.cam_control.start_zoom, zoom_velocity)
+
+    def _stop_camera(self):
+        send_command(self.cam_control, self.cam_control.stop_pan_tilt)
+        send_command(self.cam_control, self.cam_control.stop_zoom)
 
     def _zoom_camera(self, direction: ZoomDirection, amount: int):
         if direction == ZoomDirection.IN:
-            self.cam_control.move_zoom(1, amount)
+            send_command(self.cam_control, self.cam_control.move_zoom, 1, amount)
         else:
-            self.cam_control.move_zoom(-1, amount)
+            send_command(self.cam_control, self.cam_control.move_zoom, -1, amount)
 
     def start_tracking(self):
         def _tracking_thread(tracking_activation_event: threading.Event):
             self._configure_tracking()
-            self._tracking_loop(tracking_activation_event)
+            threading.Thread(target=self._control_loop, args=(tracking_activation_event,), daemon=True).start()
+            self._inference_loop(tracking_activation_event)
 
         if not self.track_thread_created:
             threading.Thread(
@@ -193,3 +409,5 @@ class MotionTracker:
     def stop_tracking(self):
         if self._activate_tracking.is_set():
             self._activate_tracking.clear()
+            if self.velocity_control:
+                self._stop_camera()
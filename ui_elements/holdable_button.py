@@ -8,10 +8,13 @@ class HoldableButton(ttk.Button):
     :timeout: the number of milliseconds between :command: calls
       if timeout is not supplied, this Button runs the function once on the DOWN click,
       unlike a normal Button, which runs on release
+    :release_command: the function to run when the Button is released,
+      e.g. stopping a continuous move started by :command:
     """
     def __init__(self, master=None, **kwargs):
         self.command = kwargs.pop('command', None)
         self.timeout = kwargs.pop('timeout', None)
+        self.release_command = kwargs.pop('release_command', None)
         ttk.Button.__init__(self, master, **kwargs)
         self.bind('<ButtonPress-1>', self.start)
         self.bind('<ButtonRelease-1>', self.stop)
@@ -24,4 +27,8 @@ class HoldableButton(ttk.Button):
                 self.timer = self.after(self.timeout, self.start)
 
     def stop(self, event=None):
-        self.after_cancel(self.timer)
+        if self.timer:
+            self.after_cancel(self.timer)
+            self.timer = ''
+        if self.release_command is not None:
+            self.release_command()